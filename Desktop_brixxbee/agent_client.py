@@ -0,0 +1,130 @@
+"""
+Streaming client for the LangGraph Brixbee agent (/api/ai/brixbee-chat).
+
+The backend answers { ..., "stream": true } requests with Server-Sent Events:
+"token" events carry answer text as it is generated, then a single "done"
+event carries the final answer and tool list (or an "error" event).
+Sentences are handed to the caller as soon as they are complete, so speech can
+start long before the agent has finished.
+
+A cancelled turn must not wait out the idle-read timeout: the caller gets the
+open response through on_response and calls abort_response() on it from the
+cancel path, which ends a read that is blocked in the socket at once.
+"""
+import json
+import socket
+
+import requests
+
+from speech_engine import SentenceSegmenter, split_sentences
+
+
+def iter_sse(lines):
+    """Parses Server-Sent Events from decoded lines. Yields (event, data) pairs."""
+    event, data = "message", []
+    for line in lines:
+        if line is None:
+            continue
+        line = line.rstrip("\r")
+        if line == "":
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+            continue
+        if line.startswith(":"):
+            continue  # Comment / keep-alive
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "event":
+            event = value
+        elif field == "data":
+            data.append(value)
+    if data:
+        yield event, "\n".join(data)
+
+
+def abort_response(resp):
+    """Ends resp from another thread. close() alone does not wake a read blocked in the socket; shutdown() does."""
+    sock = getattr(getattr(resp.raw, "_connection", None), "sock", None)
+    try:
+        if sock is not None:
+            sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass  # Already closed
+    resp.close()
+
+
+def stream_agent_chat(url, payload, on_sentence, timeout=(5, 30), post=requests.post, should_stop=None, on_response=None):
+    """
+    Sends payload to the agent in streaming mode and calls on_sentence() for each
+    completed sentence. Returns a dict with "answer", "toolsUsed", "spoken"
+    (True once any sentence was handed out) and "complete" (False if the stream
+    broke off before the "done" event: "answer" is then only what was streamed),
+    or None if nothing usable came back. timeout is (connect, idle-read) seconds. Older backends that reply with plain
+    JSON are handled too. should_stop() is checked between events; once it returns
+    True the stream is abandoned and None is returned. on_response(resp) is
+    called as soon as the response is open, so a canceller can abort_response() it.
+    """
+    resp = post(url, json=dict(payload, stream=True), stream=True, timeout=timeout,
+                headers={"Accept": "text/event-stream"})
+    if on_response:
+        on_response(resp)
+    with resp:
+        if resp.status_code != 200:
+            print(f"DEBUG: Agent stream returned status {resp.status_code}")
+            return None
+
+        if "text/event-stream" not in resp.headers.get("Content-Type", ""):
+            data = resp.json()
+            answer = data.get("answer", "")
+            if not answer:
+                return None
+            for sentence in split_sentences(answer):
+                on_sentence(sentence)
+            return {"answer": answer, "toolsUsed": data.get("toolsUsed", []), "spoken": True, "complete": True}
+
+        segmenter = SentenceSegmenter()
+        streamed = []
+        spoken = False
+        result = None
+        try:
+            for event, data in iter_sse(resp.iter_lines(decode_unicode=True)):
+                if should_stop and should_stop():
+                    print("DEBUG: Agent stream cancelled.")
+                    return None
+                payload = json.loads(data) if data else {}
+                if event == "token":
+                    text = payload.get("text", "")
+                    streamed.append(text)
+                    for sentence in segmenter.feed(text):
+                        on_sentence(sentence)
+                        spoken = True
+                elif event == "done":
+                    result = payload  # The server ends the stream right after; reading to the end keeps the connection reusable
+                elif event == "error":
+                    print(f"DEBUG: Agent stream error: {payload.get('details') or payload.get('error')}")
+        except (requests.RequestException, ValueError) as e:
+            if should_stop and should_stop():
+                print("DEBUG: Agent stream cancelled.")  # abort_response() ended the read
+                return None
+            # Connection dropped mid-answer: keep whatever was already spoken
+            print(f"DEBUG: Agent stream interrupted: {e}")
+
+        rest = segmenter.flush()
+        if rest:
+            on_sentence(rest)
+            spoken = True
+
+        answer = (result or {}).get("answer") or "".join(streamed).strip()
+        if not answer:
+            return None
+        if result is None:
+            # Error event or dropped connection: what was spoken stays spoken, but it is not an answer
+            return {"answer": answer, "toolsUsed": [], "spoken": spoken, "complete": False}
+        if not spoken:
+            # The model produced no streamable tokens (e.g. the answer came only in "done")
+            for sentence in split_sentences(answer):
+                on_sentence(sentence)
+            spoken = True
+        return {"answer": answer, "toolsUsed": result.get("toolsUsed", []), "spoken": spoken, "complete": True}
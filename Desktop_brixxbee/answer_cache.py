@@ -0,0 +1,201 @@
+"""
+Local cache of agent answers for questions students ask again and again
+("what is a cell", "define photosynthesis").
+
+Entries are keyed on the normalized question, the language, the interaction
+type and the textbook scope (the books the retrieved passages came from), so
+an English answer is never replayed in Tamil mode and a Science answer is never
+replayed for a Maths passage. Eviction is LRU with a TTL, the cache survives
+restarts as a JSON file, and an optional fuzzy match reuses answers for
+rephrasings with nearly the same content words in the same order.
+
+Questions with numbers or arithmetic ("what is 10 minus 3") are only ever
+matched exactly: "3 minus 10" shares every word but needs another answer, and
+the child cannot see that the wrong one was played back.
+"""
+import os
+import re
+import json
+import time
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 500
+TTL_SECONDS = 7 * 24 * 3600
+FUZZY_THRESHOLD = 0.8  # Jaccard similarity of content words in the same order; None disables fuzzy matching
+
+_WORD_RE = re.compile(r"[\w\u0B80-\u0BFF]+")
+# Dropped before matching: question framing carries no meaning for the answer
+FILLER_WORDS = {
+    "a", "an", "the", "please", "hey", "brixbee", "brix", "can", "could", "would", "you",
+    "tell", "me", "us", "explain", "define", "describe", "what", "whats", "is", "are",
+    "was", "were", "do", "does", "meant", "by", "meaning", "of", "about", "i", "want",
+    "to", "know", "give", "definition",
+}
+# Questions that lean on the conversation so far ("explain it again") are never cached
+CONTEXT_WORDS = {"it", "that", "this", "these", "those", "they", "them", "again", "more", "previous", "last"}
+# Numbers and operators: a question containing any of them (or a digit) is matched exactly, never fuzzily
+MATH_WORDS = {
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven", "twelve",
+    "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen", "twenty", "thirty",
+    "forty", "fifty", "sixty", "seventy", "eighty", "ninety", "hundred", "thousand", "lakh", "million",
+    "half", "quarter", "plus", "minus", "times", "multiplied", "multiply", "divided", "divide", "over",
+    "into", "add", "subtract", "sum", "difference", "product", "quotient", "remainder", "percent",
+    "squared", "cubed", "square", "cube", "root", "power", "equals", "greater", "less", "than",
+}
+_DIGIT_RE = re.compile(r"\d")
+
+
+def normalize_question(text):
+    """Lowercased words with punctuation removed."""
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+
+def content_words(text):
+    return [w for w in normalize_question(text).split() if w not in FILLER_WORDS]
+
+
+def is_cacheable(question):
+    words = normalize_question(question).split()
+    return bool(content_words(question)) and not any(w in CONTEXT_WORDS for w in words)
+
+
+def needs_exact_match(words):
+    return any(_DIGIT_RE.search(w) or w in MATH_WORDS for w in words)
+
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def ordered_similarity(a, b):
+    """Jaccard similarity of two word lists, or 0 if the words they share come in a different order."""
+    shared = set(a) & set(b)
+    if [w for w in a if w in shared] != [w for w in b if w in shared]:
+        return 0.0
+    return jaccard(a, b)
+
+
+class AnswerCache:
+    """Thread-safe LRU + TTL answer cache persisted to a JSON file."""
+
+    def __init__(self, path, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, fuzzy_threshold=FUZZY_THRESHOLD):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.fuzzy_threshold = fuzzy_threshold
+        self.entries = OrderedDict()  # key -> entry, least recently used first
+        self.counts = {"lookups": 0, "hits": 0, "fuzzy_hits": 0, "misses": 0, "expired": 0, "evictions": 0, "stores": 0}
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def make_key(question, tamil_mode, interaction_type, scope):
+        lang = "ta" if tamil_mode else "en"
+        return f"{lang}|{interaction_type}|{scope or ''}|{' '.join(content_words(question))}"
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"DEBUG: Ignoring unreadable answer cache {self.path} ({e})")
+            return
+        now = time.time()
+        for entry in data.get("entries", []):
+            if now - entry.get("created", 0) <= self.ttl:
+                self.entries[entry["key"]] = entry
+        print(f"DEBUG: Answer cache loaded ({len(self.entries)} answers).")
+
+    def save(self):
+        with self._lock:
+            data = {"entries": list(self.entries.values())}
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"DEBUG: Could not save answer cache: {e}")
+
+    def get(self, question, tamil_mode, interaction_type, scope=""):
+        """The cached answer for this question, or None."""
+        if not is_cacheable(question):
+            return None
+        key = self.make_key(question, tamil_mode, interaction_type, scope)
+        now = time.time()
+        with self._lock:
+            self.counts["lookups"] += 1
+            entry = self.entries.get(key)
+            fuzzy = False
+            if entry is None and self.fuzzy_threshold:
+                entry = self._fuzzy_lookup(key, now)
+                fuzzy = entry is not None
+            if entry is not None and now - entry["created"] > self.ttl:
+                del self.entries[entry["key"]]
+                self.counts["expired"] += 1
+                entry = None
+            if entry is None:
+                self.counts["misses"] += 1
+                return None
+            self.entries.move_to_end(entry["key"])
+            entry["hits"] += 1
+            entry["last_hit"] = now
+            self.counts["hits"] += 1
+            if fuzzy:
+                self.counts["fuzzy_hits"] += 1
+            return entry["answer"]
+
+    def _fuzzy_lookup(self, key, now):
+        """Best live entry in the same language/type/scope whose content words are close enough."""
+        prefix, _, words = key.rpartition("|")
+        words = words.split()
+        if needs_exact_match(words):
+            return None
+        best, best_score = None, self.fuzzy_threshold
+        for entry in self.entries.values():
+            if not entry["key"].startswith(prefix + "|") or now - entry["created"] > self.ttl:
+                continue
+            other = entry["key"].rpartition("|")[2].split()
+            if needs_exact_match(other):
+                continue
+            score = ordered_similarity(words, other)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def put(self, question, answer, tamil_mode, interaction_type, scope=""):
+        """Stores an answer and saves the cache to disk."""
+        if not answer or not is_cacheable(question):
+            return
+        key = self.make_key(question, tamil_mode, interaction_type, scope)
+        with self._lock:
+            self.entries[key] = {"key": key, "question": question, "answer": answer,
+                                 "created": time.time(), "hits": 0, "last_hit": None}
+            self.entries.move_to_end(key)
+            self.counts["stores"] += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counts["evictions"] += 1
+        self.save()
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+        self.save()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counts, entries=len(self.entries))
+        stats["hit_rate"] = round(stats["hits"] / stats["lookups"], 3) if stats["lookups"] else None
+        return stats
+
+    def format_stats(self):
+        s = self.stats()
+        rate = f"{s['hit_rate']:.0%}" if s["hit_rate"] is not None else "n/a"
+        return f"{s['entries']} answers, {s['hits']}/{s['lookups']} hits ({rate}, {s['fuzzy_hits']} fuzzy)"
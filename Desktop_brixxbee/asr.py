@@ -0,0 +1,167 @@
+"""
+Speech recognition backends for Brixbee.
+
+Every backend takes 16-bit mono samples and a language ("en" or "ta") and
+returns the transcript:
+
+    GoogleASR   - the original recognize_google path (needs internet)
+    WhisperASR  - faster-whisper on the CPU, fully offline, English and Tamil;
+                  partial transcripts are reported segment by segment
+    FallbackASR - tries one backend and, if it fails (not if it hears nothing),
+                  the next
+
+create_asr() reads BRIXBEE_ASR: "local" (the default; Whisper first, Google
+if Whisper cannot run or is not installed) or "google" (Google only, the old
+behaviour).
+
+Whisper only loads a model that is already on disk; it never downloads at
+startup, so a school without internet gets a clear message instead of a failed
+download. Fetch the model once while online:
+
+    python asr.py --download          (BRIXBEE_WHISPER_MODEL, default "small")
+
+It is stored in BRIXBEE_WHISPER_DIR (default: the Hugging Face cache); copy
+that folder to offline machines. BRIXBEE_WHISPER_MODEL may also be the path of
+a converted model folder. BRIXBEE_WHISPER_LOCAL_ONLY=0 restores downloading on
+first use.
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+
+# --- CONFIGURATION ---
+ASR_BACKEND = (os.getenv("BRIXBEE_ASR") or "local").lower()
+WHISPER_MODEL = os.getenv("BRIXBEE_WHISPER_MODEL") or "small"  # Multilingual; "base" is faster, "medium" better at Tamil
+WHISPER_COMPUTE_TYPE = os.getenv("BRIXBEE_WHISPER_COMPUTE") or "int8"
+WHISPER_THREADS = int(os.getenv("BRIXBEE_WHISPER_THREADS") or 0)  # 0 = library default
+WHISPER_DIR = os.getenv("BRIXBEE_WHISPER_DIR") or None  # Where models are stored; None = Hugging Face cache
+WHISPER_LOCAL_ONLY = (os.getenv("BRIXBEE_WHISPER_LOCAL_ONLY") or "1") != "0"  # Never download at startup
+GOOGLE_LANGUAGES = {"en": "en-IN", "ta": "ta-IN"}
+
+
+class ASRError(Exception):
+    """The backend could not run (network down, model missing); another backend may."""
+
+
+def to_float32(samples):
+    return np.asarray(samples, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+class GoogleASR:
+    name = "google"
+
+    def __init__(self):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, samples, sample_rate, language="en", on_partial=None):
+        audio = self.sr.AudioData(np.asarray(samples, dtype=np.int16).tobytes(), sample_rate, 2)
+        try:
+            return self.recognizer.recognize_google(audio, language=GOOGLE_LANGUAGES.get(language, language))
+        except self.sr.UnknownValueError:
+            return ""
+        except self.sr.RequestError as e:
+            raise ASRError(f"Google Speech error: {e}")
+
+
+class WhisperASR:
+    name = "whisper"
+    sample_rate = 16000
+
+    def __init__(self, model=WHISPER_MODEL, compute_type=WHISPER_COMPUTE_TYPE, cpu_threads=WHISPER_THREADS,
+                 download_root=WHISPER_DIR, local_files_only=WHISPER_LOCAL_ONLY):
+        from faster_whisper import WhisperModel
+        self.model_name = model
+        try:
+            self.model = WhisperModel(model, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads,
+                                      download_root=download_root, local_files_only=local_files_only)
+        except Exception as e:
+            if not local_files_only:
+                raise
+            raise ASRError(f"Whisper model '{model}' is not on this computer ({e}). "
+                           f"Run 'python asr.py --download' once while online.")
+
+    def transcribe(self, samples, sample_rate, language="en", on_partial=None):
+        audio = to_float32(samples)
+        if sample_rate != self.sample_rate:
+            duration = len(audio) / sample_rate
+            target = np.linspace(0, duration, int(duration * self.sample_rate), endpoint=False)
+            audio = np.interp(target, np.arange(len(audio)) / sample_rate, audio).astype(np.float32)
+        try:
+            # Greedy decoding: utterances are short, and beam search roughly doubles the time
+            segments, _ = self.model.transcribe(audio, language=language, beam_size=1,
+                                                condition_on_previous_text=False)
+            parts = []
+            for segment in segments:  # Decoded lazily, one segment at a time
+                parts.append(segment.text.strip())
+                if on_partial:
+                    on_partial(" ".join(parts))
+        except Exception as e:
+            raise ASRError(f"Whisper error: {e}")
+        return " ".join(p for p in parts if p)
+
+
+class FallbackASR:
+    """Uses the first backend that runs; an empty transcript is an answer, not a failure."""
+
+    def __init__(self, *backends):
+        self.backends = backends
+        self.name = "+".join(b.name for b in backends)
+
+    def transcribe(self, samples, sample_rate, language="en", on_partial=None):
+        errors = []
+        for backend in self.backends:
+            try:
+                return backend.transcribe(samples, sample_rate, language, on_partial=on_partial)
+            except ASRError as e:
+                print(f"DEBUG: {backend.name} recognition failed ({e}), trying next backend.")
+                errors.append(str(e))
+        raise ASRError("; ".join(errors))
+
+
+def _load(factory, label):
+    try:
+        return factory()
+    except ImportError as e:
+        print(f"WARNING: {label} unavailable ({e}).")
+    except Exception as e:
+        print(f"WARNING: Could not load {label} ({e}).")
+    return None
+
+
+def create_asr(choice=ASR_BACKEND):
+    """The recognizer configured by BRIXBEE_ASR."""
+    local = _load(WhisperASR, f"offline recognition (faster-whisper '{WHISPER_MODEL}')") if choice != "google" else None
+    google = _load(GoogleASR, "Google recognition")
+    backends = [b for b in (local, google) if b is not None]
+    if not backends:
+        raise RuntimeError("no speech recognition backend available")
+    asr = backends[0] if len(backends) == 1 else FallbackASR(*backends)
+    print(f"DEBUG: Speech recognition: {asr.name}")
+    return asr
+
+
+def download_model(model=WHISPER_MODEL, download_root=WHISPER_DIR):
+    """Fetches a Whisper model for offline use. Returns the folder it is in."""
+    from faster_whisper import download_model as fetch
+    return fetch(model, cache_dir=download_root)  # The same lookup WhisperModel does with download_root
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Brixbee speech recognition setup.")
+    parser.add_argument("--download", action="store_true", help="Download the Whisper model for offline use")
+    parser.add_argument("--model", default=WHISPER_MODEL)
+    args = parser.parse_args(argv)
+    if not args.download:
+        parser.print_help()
+        return 1
+    print(f"Downloading Whisper model '{args.model}'...")
+    print(f"✅ Whisper model ready in {download_model(args.model)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
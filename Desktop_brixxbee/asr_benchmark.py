@@ -0,0 +1,135 @@
+"""
+Speech recognition benchmark: real-time factor and word error rate.
+
+Expects a folder of clips, each WAV file next to a .txt file with the same name
+holding what was actually said:
+
+    clips/photosynthesis_1.wav
+    clips/photosynthesis_1.txt
+
+Usage:
+    python asr_benchmark.py clips/ [--backend whisper google] [--language ta] [--model base]
+
+Real-time factor (RTF) is processing time / audio duration; below 1.0 the
+backend is faster than the child speaks. WER is word-level edit distance over
+the total number of reference words.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from audio_input import read_wav, SAMPLE_RATE
+from asr import GoogleASR, WhisperASR, ASRError, WHISPER_MODEL
+
+_WORD_RE = re.compile(r"[\w\u0B80-\u0BFF]+")
+
+
+def words(text):
+    return _WORD_RE.findall((text or "").lower())
+
+
+def edit_distance(ref, hyp):
+    """Word-level Levenshtein distance."""
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1]
+
+
+def load_clips(folder):
+    clips = []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(".wav"):
+            continue
+        ref_path = os.path.join(folder, os.path.splitext(name)[0] + ".txt")
+        if not os.path.exists(ref_path):
+            print(f"⚠️ Skipping {name}: no reference transcript")
+            continue
+        with open(ref_path, 'r', encoding='utf-8') as f:
+            reference = f.read().strip()
+        clips.append((name, read_wav(os.path.join(folder, name), SAMPLE_RATE), reference))
+    return clips
+
+
+def run_backend(backend, clips, language):
+    rows = []
+    for name, samples, reference in clips:
+        duration = len(samples) / SAMPLE_RATE
+        first_partial = []
+        started = time.perf_counter()
+        try:
+            text = backend.transcribe(samples, SAMPLE_RATE, language,
+                                      on_partial=lambda t: first_partial or first_partial.append(time.perf_counter()))
+            failed = False
+        except ASRError as e:
+            print(f"❌ {backend.name} {name}: {e}")
+            text, failed = "", True
+        elapsed = time.perf_counter() - started
+        ref, hyp = words(reference), words(text)
+        rows.append({
+            "clip": name, "seconds": duration, "elapsed": elapsed, "rtf": elapsed / duration if duration else 0.0,
+            "first_partial": (first_partial[0] - started) if first_partial else None,
+            "errors": edit_distance(ref, hyp), "ref_words": len(ref), "failed": failed, "text": text,
+        })
+        print(f"{backend.name:8} {name}: {elapsed:.2f}s for {duration:.1f}s audio (RTF {rows[-1]['rtf']:.2f}) -> {text!r}")
+    return rows
+
+
+def summarize(name, rows):
+    ok = [r for r in rows if not r["failed"]]
+    if not ok:
+        print(f"{name}: all {len(rows)} clips failed")
+        return
+    rtf = np.array([r["rtf"] for r in ok])
+    latency = np.array([r["elapsed"] for r in ok])
+    wer = sum(r["errors"] for r in ok) / max(1, sum(r["ref_words"] for r in ok))
+    partials = [r["first_partial"] for r in ok if r["first_partial"] is not None]
+    line = (f"{name}: WER {wer:.1%}, RTF mean {rtf.mean():.2f} / max {rtf.max():.2f}, "
+            f"latency p50 {np.percentile(latency, 50):.2f}s / p95 {np.percentile(latency, 95):.2f}s")
+    if partials:
+        line += f", first partial p50 {np.percentile(partials, 50):.2f}s"
+    if len(ok) < len(rows):
+        line += f", {len(rows) - len(ok)} failed"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure ASR real-time factor and word error rate.")
+    parser.add_argument("folder", help="Folder of .wav clips with matching .txt transcripts")
+    parser.add_argument("--backend", nargs="+", choices=["whisper", "google"], default=["whisper", "google"])
+    parser.add_argument("--language", default="en", help="en or ta")
+    parser.add_argument("--model", default=WHISPER_MODEL, help="faster-whisper model size")
+    args = parser.parse_args()
+
+    clips = load_clips(args.folder)
+    if not clips:
+        print(f"❌ No clips with transcripts in {args.folder}")
+        sys.exit(1)
+    print(f"{len(clips)} clips, {sum(len(s) for _, s, _ in clips) / SAMPLE_RATE:.1f}s of audio\n")
+
+    results = {}
+    for name in args.backend:
+        try:
+            loaded = time.perf_counter()
+            backend = WhisperASR(args.model) if name == "whisper" else GoogleASR()
+            print(f"{name}: loaded in {time.perf_counter() - loaded:.1f}s")
+        except Exception as e:
+            print(f"❌ {name} unavailable: {e}")
+            continue
+        run_backend(backend, clips[:1], args.language)  # Warm-up, not counted
+        results[name] = run_backend(backend, clips, args.language)
+
+    print()
+    for name, rows in results.items():
+        summarize(name, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+Microphone capture for Brixbee.
+
+MicrophoneStream keeps a single 16 kHz input stream open for the life of the
+app and fans its 32 ms frames out to subscribers (the wake word engine, the
+utterance listener). A NoiseFloor follows the room's background level on every
+frame, so there is no per-turn calibration and no fixed energy threshold.
+
+VadSegmenter cuts utterances out of a frame stream: speech starts after a few
+loud frames, the frames just before that (pre-roll) are kept so the first
+syllable is not clipped, and the utterance ends after a short silence, so
+recognition can start as soon as the child stops talking.
+
+BargeInDetector listens while Brixbee itself is talking. The microphone hears
+the speakers too, so it learns how loud that echo is and only reports the
+child when something is clearly louder than it for a moment; listen() then
+stops the speech and keeps the child's words from the first syllable.
+
+Everything except MicrophoneStream's default source works on plain numpy
+frames, so it can be driven from WAV files:
+
+    python audio_input.py clip.wav      # prints the utterances found
+"""
+import sys
+import math
+import time
+import wave
+import queue
+import threading
+from collections import deque
+
+import numpy as np
+
+# --- CONFIGURATION ---
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512        # 32 ms; also the frame size Porcupine expects
+START_RATIO = 3.0         # Frame RMS above noise floor x this starts speech
+CONTINUE_RATIO = 2.0      # ...and above this keeps it going (hysteresis)
+MIN_SPEECH_RMS = 200.0    # Never treat anything quieter as speech, however quiet the room
+START_FRAMES = 3          # Consecutive loud frames needed to start an utterance (~100 ms)
+PRE_ROLL = 0.3            # Seconds of audio kept from before speech started
+END_SILENCE = 0.7         # Seconds of silence that end an utterance
+TAIL_KEEP = 0.15          # Seconds of that trailing silence kept in the utterance
+MAX_UTTERANCE = 10.0      # Seconds; same as the old phrase_time_limit
+BARGE_IN_RATIO = 2.5      # Louder than Brixbee's own echo x this counts as the child talking over it
+BARGE_IN_SECONDS = 0.25   # ...for this long
+BARGE_IN_GRACE = 0.8      # Seconds after speech starts used only to learn the echo level
+ECHO_DECAY = 0.995        # Per frame; the echo estimate halves in about 4 s of quiet
+
+
+def frame_rms(frame):
+    return float(np.sqrt(np.mean(frame.astype(np.float32) ** 2))) if len(frame) else 0.0
+
+
+def seconds_to_frames(seconds, sample_rate=SAMPLE_RATE, frame_length=FRAME_LENGTH):
+    return max(1, int(math.ceil(seconds * sample_rate / frame_length)))
+
+
+class NoiseFloor:
+    """
+    Running estimate of background RMS. Drops quickly when the room gets quieter
+    and rises slowly, and only very slowly while something speech-loud is going
+    on, so a child talking does not raise it but a fan switched on is learned
+    within about a minute.
+    """
+
+    def __init__(self, initial=None, fall=0.1, rise=0.01, rise_loud=0.0005, minimum=30.0):
+        self.level = initial
+        self.fall = fall
+        self.rise = rise
+        self.rise_loud = rise_loud
+        self.minimum = minimum
+
+    def update(self, rms):
+        if self.level is None:
+            self.level = max(rms, self.minimum)
+            return
+        if rms < self.level:
+            rate = self.fall
+        elif rms < self.threshold(START_RATIO):
+            rate = self.rise
+        else:
+            rate = self.rise_loud
+        self.level = max(self.minimum, self.level + rate * (rms - self.level))
+
+    def threshold(self, ratio):
+        return max((self.level or self.minimum) * ratio, MIN_SPEECH_RMS)
+
+
+class VadSegmenter:
+    """
+    Feed it frames; feed() returns an utterance (int16 array) when one ends.
+    With update_floor=False the noise floor is left to whoever owns it (the
+    MicrophoneStream); standalone (e.g. WAV files) the segmenter updates it.
+    """
+
+    def __init__(self, noise_floor=None, sample_rate=SAMPLE_RATE, frame_length=FRAME_LENGTH,
+                 pre_roll=PRE_ROLL, end_silence=END_SILENCE, max_seconds=MAX_UTTERANCE, update_floor=True):
+        self.noise_floor = noise_floor or NoiseFloor()
+        self.update_floor = update_floor
+        self.pre_roll = deque(maxlen=seconds_to_frames(pre_roll, sample_rate, frame_length))
+        self.end_frames = seconds_to_frames(end_silence, sample_rate, frame_length)
+        self.tail_frames = seconds_to_frames(TAIL_KEEP, sample_rate, frame_length)
+        self.max_frames = seconds_to_frames(max_seconds, sample_rate, frame_length)
+        self.frames_fed = 0
+        self.reset()
+
+    def reset(self):
+        self.pre_roll.clear()
+        self.frames = []
+        self.in_speech = False
+        self.start_frame = None
+        self.speech_run = 0
+        self.silence_run = 0
+
+    def feed(self, frame, rms=None):
+        rms = frame_rms(frame) if rms is None else rms
+        self.frames_fed += 1
+        if not self.in_speech:
+            loud = rms > self.noise_floor.threshold(START_RATIO)
+            if self.update_floor:
+                self.noise_floor.update(rms)
+            self.pre_roll.append(frame)
+            self.speech_run = self.speech_run + 1 if loud else 0
+            if self.speech_run >= START_FRAMES:
+                self.in_speech = True
+                self.frames = list(self.pre_roll)
+                self.start_frame = self.frames_fed - len(self.frames)
+                self.silence_run = 0
+            return None
+
+        self.frames.append(frame)
+        loud = rms > self.noise_floor.threshold(CONTINUE_RATIO)
+        self.silence_run = 0 if loud else self.silence_run + 1
+        if self.silence_run >= self.end_frames or len(self.frames) >= self.max_frames:
+            drop = max(0, self.silence_run - self.tail_frames)
+            utterance = np.concatenate(self.frames[:len(self.frames) - drop])
+            self.reset()
+            return utterance
+        return None
+
+    def flush(self):
+        """The utterance in progress when the input ends, if any."""
+        utterance = np.concatenate(self.frames) if self.in_speech and self.frames else None
+        self.reset()
+        return utterance
+
+
+class BargeInDetector:
+    """
+    Feed it frames while Brixbee is speaking; feed() returns True once the child
+    is talking over it. frames holds the audio since the speech started (from a
+    little before the child did), so it can be handed to a VadSegmenter.
+    """
+
+    def __init__(self, noise_floor=None, sample_rate=SAMPLE_RATE, frame_length=FRAME_LENGTH,
+                 ratio=BARGE_IN_RATIO, min_seconds=BARGE_IN_SECONDS, grace=BARGE_IN_GRACE):
+        self.noise_floor = noise_floor or NoiseFloor()
+        self.ratio = ratio
+        self.min_frames = seconds_to_frames(min_seconds, sample_rate, frame_length)
+        self.grace_frames = seconds_to_frames(grace, sample_rate, frame_length)
+        self.frames = deque(maxlen=seconds_to_frames(PRE_ROLL, sample_rate, frame_length) + self.min_frames)
+        self.reset()
+
+    def reset(self):
+        self.frames.clear()
+        self.echo = 0.0
+        self.seen = 0
+        self.loud_run = 0
+
+    def feed(self, frame, rms=None):
+        rms = frame_rms(frame) if rms is None else rms
+        self.frames.append(frame)
+        self.seen += 1
+        if self.seen <= self.grace_frames:
+            self.echo = max(self.echo, rms)
+            return False
+        loud = rms > max(self.echo * self.ratio, self.noise_floor.threshold(START_RATIO))
+        if loud:
+            self.loud_run += 1
+        else:
+            self.loud_run = 0
+            self.echo = max(rms, self.echo * ECHO_DECAY)  # Peak follower: echo comes and goes with each word
+        return self.loud_run >= self.min_frames
+
+
+class PyAudioFrames:
+    """Iterates fixed-size int16 frames from the default input device."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_length=FRAME_LENGTH):
+        import pyaudio
+        self.frame_length = frame_length
+        self.pa = pyaudio.PyAudio()
+        self.stream = self.pa.open(rate=sample_rate, channels=1, format=pyaudio.paInt16,
+                                   input=True, frames_per_buffer=frame_length)
+
+    def __iter__(self):
+        while self.stream is not None:
+            data = self.stream.read(self.frame_length, exception_on_overflow=False)
+            yield np.frombuffer(data, dtype=np.int16)
+
+    def close(self):
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+            self.pa.terminate()
+
+
+def read_wav(path, sample_rate=SAMPLE_RATE):
+    """Mono int16 samples of a WAV file at sample_rate (mixed down / resampled if needed)."""
+    with wave.open(path, 'rb') as w:
+        if w.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+        rate, channels = w.getframerate(), w.getnchannels()
+        samples = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate:
+        duration = len(samples) / rate
+        target = np.linspace(0, duration, int(duration * sample_rate), endpoint=False)
+        samples = np.interp(target, np.arange(len(samples)) / rate, samples)
+    return samples.astype(np.int16)
+
+
+class WavFrames:
+    """Frame source over a WAV file; realtime=True paces it like a microphone."""
+
+    def __init__(self, path, sample_rate=SAMPLE_RATE, frame_length=FRAME_LENGTH, realtime=False):
+        self.samples = read_wav(path, sample_rate)
+        self.frame_length = frame_length
+        self.frame_seconds = frame_length / sample_rate
+        self.realtime = realtime
+
+    def __iter__(self):
+        n = self.frame_length
+        for i in range(0, len(self.samples) - n + 1, n):
+            if self.realtime:
+                time.sleep(self.frame_seconds)
+            yield self.samples[i:i + n]
+
+
+def segment_wav(path, **options):
+    """Utterances found in a WAV file as (start_seconds, end_seconds, samples)."""
+    source = WavFrames(path)
+    segmenter = VadSegmenter(**options)
+    frame_s = source.frame_seconds
+    found = []
+    for frame in source:
+        start_frame = segmenter.start_frame
+        utterance = segmenter.feed(frame)
+        if utterance is None:
+            continue
+        start = (start_frame if start_frame is not None else segmenter.frames_fed) * frame_s
+        found.append((start, start + len(utterance) / SAMPLE_RATE, utterance))
+    start_frame = segmenter.start_frame
+    utterance = segmenter.flush()
+    if utterance is not None:
+        start = start_frame * frame_s
+        found.append((start, start + len(utterance) / SAMPLE_RATE, utterance))
+    return found
+
+
+class MicrophoneStream:
+    """
+    One always-open input stream shared by everything that listens.
+    subscribe() returns a queue receiving every frame from then on; listen()
+    returns the next utterance.
+    """
+
+    def __init__(self, source=None, sample_rate=SAMPLE_RATE, frame_length=FRAME_LENGTH):
+        self.sample_rate = sample_rate
+        self.frame_length = frame_length
+        self.source = source if source is not None else PyAudioFrames(sample_rate, frame_length)
+        self.noise_floor = NoiseFloor()
+        self.recent = deque(maxlen=seconds_to_frames(PRE_ROLL, sample_rate, frame_length))
+        self.frames_read = 0
+        self.dropped_frames = 0  # Frames a slow subscriber did not take in time
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self):
+        return self._running
+
+    def _run(self):
+        try:
+            for frame in self.source:
+                if not self._running:
+                    break
+                self.noise_floor.update(frame_rms(frame))
+                with self._lock:
+                    self.recent.append(frame)
+                    self.frames_read += 1
+                    for q in self._subscribers:
+                        try:
+                            q.put_nowait(frame)
+                        except queue.Full:
+                            self.dropped_frames += 1
+        except Exception as e:
+            print(f"DEBUG: Microphone stream stopped: {e}")
+        finally:
+            self._running = False
+
+    def subscribe(self, maxsize=400, with_recent=False):
+        """A queue of frames from now on (plus the pre-roll history if with_recent)."""
+        q = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            if with_recent:
+                for frame in self.recent:
+                    q.put_nowait(frame)
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def frames(self):
+        """Generator over every frame from now on (for consumers that want an iterable)."""
+        q = self.subscribe()
+        try:
+            while self._running or not q.empty():
+                try:
+                    yield q.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+        finally:
+            self.unsubscribe(q)
+
+    def listen(self, timeout=None, phrase_time_limit=MAX_UTTERANCE, is_muted=None, on_barge_in=None):
+        """
+        Next utterance as int16 samples, or None if nobody started speaking within
+        timeout seconds. While is_muted() is true (e.g. Brixbee is talking) audio is
+        ignored and the timeout does not run, unless on_barge_in is given: then the
+        child talking over the speech calls on_barge_in() (which should stop the
+        speech) and the utterance is captured from its start.
+        """
+        segmenter = VadSegmenter(self.noise_floor, self.sample_rate, self.frame_length,
+                                 max_seconds=phrase_time_limit, update_floor=False)
+        barge_in = BargeInDetector(self.noise_floor, self.sample_rate, self.frame_length) if on_barge_in else None
+        was_muted = interrupted = False
+        q = self.subscribe(with_recent=True)
+        deadline = time.time() + timeout if timeout else None
+        try:
+            while True:
+                try:
+                    frame = q.get(timeout=0.1)
+                except queue.Empty:
+                    frame = None
+                    if not self._running:
+                        return None
+                if is_muted and not interrupted and is_muted():
+                    if not was_muted:
+                        was_muted = True
+                        segmenter.reset()
+                        if barge_in:
+                            barge_in.reset()
+                    if deadline:
+                        deadline = time.time() + timeout
+                    if barge_in and frame is not None and barge_in.feed(frame):
+                        on_barge_in()
+                        interrupted = True  # Speech is stopping; stay unmuted for the rest of this utterance
+                        for buffered in barge_in.frames:  # The child's first words, heard over the speech
+                            segmenter.feed(buffered)
+                    continue
+                was_muted = False
+                if frame is not None:
+                    utterance = segmenter.feed(frame)
+                    if utterance is not None:
+                        return utterance
+                if deadline and not segmenter.in_speech and time.time() > deadline:
+                    return None
+        finally:
+            self.unsubscribe(q)
+
+    def close(self):
+        self._running = False
+        close = getattr(self.source, "close", None)
+        if close:
+            close()
+
+
+def open_microphone():
+    """A running MicrophoneStream, or None (with the reason printed) if no input device can be opened."""
+    try:
+        return MicrophoneStream()
+    except ImportError:
+        print("WARNING: PyAudio not installed. Using per-turn microphone capture.")
+    except Exception as e:
+        print(f"WARNING: Could not open a persistent microphone stream ({e}). Using per-turn capture.")
+    return None
+
+
+if __name__ == "__main__":
+    # Usage: python audio_input.py clip.wav [more.wav ...]
+    if len(sys.argv) < 2:
+        print("Usage: python audio_input.py clip.wav [more.wav ...]")
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        segments = segment_wav(path)
+        print(f"{path}: {len(segments)} utterance(s)")
+        for start, end, samples in segments:
+            print(f"  {start:6.2f}s - {end:6.2f}s  ({len(samples) / SAMPLE_RATE:.2f}s of audio)")
@@ -0,0 +1,205 @@
+"""
+Request layer for the brain model (OpenRouter chat completions).
+
+Three things every call to the brain goes through:
+
+  - Stable prefixes. Providers cache the longest prompt prefix they have seen
+    recently, so the system prompt has to be byte-identical from call to call.
+    Callers put everything that changes per request (vision data, memory
+    summary) after the history, so system prompt + history is a prefix of the
+    next request as well. Each request records whether its stable part agrees
+    with the previous one ("warm") or not ("cold"). Providers only cache prefixes
+    above a minimum length (around 1k tokens), so short sessions stay cold.
+  - One request per conversation at a time. Streams for the same conversation
+    are serialized, so a Guardian alert and a question cannot interleave
+    their history writes.
+  - Deduplication. A stream identical to one already in flight (same model,
+    messages and parameters) does not go to the provider again: it replays the
+    leader's text and then follows it live. If the leader stops before any
+    text, the follower makes its own request.
+
+Time to first token is recorded per warm/cold state in the shared RouteStats
+histograms, next to the provider's cached token count when it reports usage.
+"""
+import json
+import time
+import hashlib
+import threading
+
+from router import RouteStats
+
+DEFAULT_CONVERSATION = "main"
+FOLLOW_POLL = 0.1  # Seconds between should_stop() checks while following another request
+
+
+class _InFlight:
+    """Text of one streaming request as it arrives, for requests that follow it."""
+
+    def __init__(self):
+        self.parts = []
+        self.done = False
+        self.complete = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    def add(self, text):
+        with self._cond:
+            self.parts.append(text)
+            self._cond.notify_all()
+
+    def finish(self, complete, error=None):
+        with self._cond:
+            self.done, self.complete, self.error = True, complete, error
+            self._cond.notify_all()
+
+    def follow(self, should_stop=None):
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.parts) and not self.done:
+                    self._cond.wait(FOLLOW_POLL)
+                    if should_stop and should_stop():
+                        return
+                parts, done, error = self.parts[index:], self.done, self.error
+            for text in parts:
+                yield text
+            index += len(parts)
+            if done and index >= len(self.parts):
+                if error is not None:
+                    raise error
+                return
+
+
+class BrainClient:
+    def __init__(self, client, model, stats=None, tracer=None):
+        self.client = client
+        self.model = model
+        self.stats = stats or RouteStats()
+        self.tracer = tracer  # Records llm.ttft / llm.total spans for the current turn
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._conversations = {}  # conversation -> lock
+        self._prefixes = {}       # conversation -> stable messages of the last request
+        self.counts = {"requests": 0, "warm": 0, "deduped": 0, "waited": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def _conversation_lock(self, conversation):
+        with self._lock:
+            return self._conversations.setdefault(conversation, threading.Lock())
+
+    def _is_warm(self, conversation, stable):
+        """True if this request's stable messages and the previous request's agree up to the shorter one (a provider cache hit is possible)."""
+        with self._lock:
+            previous = self._prefixes.get(conversation)
+            self._prefixes[conversation] = stable
+        shorter = min(len(stable), len(previous or []))
+        return bool(previous) and stable[:shorter] == previous[:shorter]
+
+    def stream(self, messages, stable=1, conversation=DEFAULT_CONVERSATION, should_stop=None, model=None, **params):
+        """
+        Streams a chat completion and yields text as it arrives. The first stable
+        messages are the part that should be identical to the last request's
+        start (system prompt and history). should_stop() is checked per chunk;
+        closing the generator early also ends the provider request.
+        """
+        model = model or self.model
+        key = hashlib.sha1(json.dumps([model, messages, params], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        while True:
+            with self._lock:
+                request = self._inflight.get(key)
+                leading = request is None
+                if leading:
+                    request = self._inflight[key] = _InFlight()
+            if leading:
+                yield from self._lead(request, key, messages, stable, conversation, should_stop, model, params)
+                return
+            print("DEBUG: Brain request already in flight; following it.")
+            self._count("deduped")
+            heard = False
+            for text in request.follow(should_stop):
+                heard = True
+                yield text
+            if request.complete or heard or (should_stop and should_stop()):
+                return
+            # The request we followed stopped before saying anything: make our own
+
+    def _lead(self, request, key, messages, stable, conversation, should_stop, model, params):
+        lock = self._conversation_lock(conversation)
+        if not lock.acquire(blocking=False):
+            self._count("waited")
+            lock.acquire()
+        completion = None
+        complete = False
+        error = None
+        started = time.perf_counter()
+        try:
+            warm = self._is_warm(conversation, messages[:stable])
+            self._count("requests")
+            if warm:
+                self._count("warm")
+            first = None
+            completion = self.client.chat.completions.create(
+                model=model, messages=messages, stream=True, stream_options={"include_usage": True}, **params)
+            for chunk in completion:
+                if should_stop and should_stop():
+                    break
+                usage = getattr(chunk, "usage", None)
+                if usage:
+                    self._record_usage(usage)
+                if not chunk.choices or not hasattr(chunk.choices[0], "delta"):
+                    continue
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                if first is None:
+                    first = time.perf_counter() - started
+                    self.stats.record(f"brain.ttft.{'warm' if warm else 'cold'}", first)
+                    if self.tracer:
+                        self.tracer.record("llm.ttft", first, model=model, warm=warm)
+                    print(f"DEBUG: Brain first token after {first:.2f}s ({'warm' if warm else 'cold'} prefix)")
+                request.add(content)
+                yield content
+            else:
+                complete = True
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.tracer:
+                self.tracer.record("llm.total", time.perf_counter() - started, model=model, complete=complete)
+            if not complete and completion is not None and hasattr(completion, "close"):
+                completion.close()  # Drop the connection instead of reading tokens nobody will use
+            with self._lock:
+                self._inflight.pop(key, None)
+            request.finish(complete, error)
+            lock.release()
+
+    def complete(self, messages, model=None, **params):
+        """Non-streaming completion. Returns the text (may be empty)."""
+        self._count("requests")
+        started = time.perf_counter()
+        completion = self.client.chat.completions.create(model=model or self.model, messages=messages, stream=False, **params)
+        if self.tracer:
+            self.tracer.record("llm.complete", time.perf_counter() - started, model=model or self.model)
+        usage = getattr(completion, "usage", None)
+        if usage:
+            self._record_usage(usage)
+        return completion.choices[0].message.content or ""
+
+    def _record_usage(self, usage):
+        details = getattr(usage, "prompt_tokens_details", None)
+        self._count("prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+        self._count("cached_tokens", (getattr(details, "cached_tokens", 0) or 0) if details else 0)
+
+    def format_stats(self):
+        with self._lock:
+            c = dict(self.counts)
+        cached = f"{c['cached_tokens'] / c['prompt_tokens']:.0%}" if c["prompt_tokens"] else "n/a"
+        ttft = "; ".join(f"{state} {self.stats.histograms[f'brain.ttft.{state}'].format()}"
+                         for state in ("warm", "cold") if f"brain.ttft.{state}" in self.stats.histograms)
+        return (f"{c['requests']} requests ({c['warm']} warm prefix), {c['deduped']} deduplicated, "
+                f"{c['waited']} waited for the conversation, {cached} prompt tokens cached; "
+                f"first token {ttft or 'no data'}")
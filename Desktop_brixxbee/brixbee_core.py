@@ -0,0 +1,1246 @@
+"""
+Brixbee's conversation core, independent of the window.
+
+BrixbeeCore owns everything that is not drawing: speech in and out, the
+agents, the camera and Guardian mode. It runs one asyncio event loop on its
+own thread:
+
+  - voice_loop     listens for the wake word and follow-up questions
+  - guard_loop     checks camera frames and escalates to the vision model
+  - turn_worker    handles one turn at a time from a bounded priority queue
+                   (Guardian alerts first, then voice and typed messages)
+
+Because turns run one after another, memory and the other conversation
+state are only ever changed by one turn. Blocking work (HTTP,
+model calls, recognition, camera) runs on a worker pool via run_blocking();
+the calls made for a turn are tracked, so cancel_turn() can stop the turn and
+wait for its workers to notice turn_cancel before the next turn starts.
+
+Each turn carries a trace ID (tracing.py); the stages it passes through record
+latency spans, summarized with "python tracing.py".
+
+The core never touches Tk. It reports through a ui object with set_status(),
+log(), play_sound() and show_modes(); BrixbeeApp marshals those onto the Tk
+thread, and HeadlessUI just prints, so the core also runs without a window.
+"""
+import os
+import sys
+import time
+import asyncio
+import itertools
+import threading
+import contextvars
+import webbrowser
+from collections import namedtuple
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+import numpy as np
+import requests
+from openai import OpenAI
+from speech_engine import SpeechEngine, SentenceSegmenter, split_sentences, ENGLISH_VOICE, TAMIL_VOICE
+from agent_client import stream_agent_chat, abort_response
+from http_client import BackendClient
+from log_shipper import LogShipper
+from answer_cache import AnswerCache
+from audio_input import open_microphone
+from asr import create_asr
+from camera import CameraStream
+from guardian_gate import SceneGate, GUARD_SAMPLE_INTERVAL
+from image_prep import prepare_image, sharpest, find_page, VisionStats
+from wake_word import create_wake_engine
+from router import SpeculativeRouter, RouteStats, Route
+from conversation_memory import ConversationMemory
+from brain_client import BrainClient
+from tracing import Tracer, current_trace
+# Explicitly load from the directory of this script
+script_dir = os.path.dirname(os.path.abspath(__file__))
+try:
+    from dotenv import load_dotenv
+    env_path = os.path.join(script_dir, ".env")
+    if os.path.exists(env_path):
+        load_dotenv(env_path)
+    else:
+        print(f"WARNING: .env file not found at {env_path}")
+except ImportError:
+    print("WARNING: python-dotenv not installed. Environment variables must be set manually.")
+
+# --- CONFIGURATION ---
+# Load from .env with fallbacks
+VISION_API_KEY = os.getenv("VISION_API_KEY")
+VISION_MODEL = os.getenv("VISION_MODEL") or "google/gemini-2.0-flash-001" 
+
+BRAIN_API_KEY = os.getenv("BRAIN_API_KEY")
+BRAIN_MODEL = os.getenv("BRAIN_MODEL") or "google/gemini-2.0-flash-001"
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL") or "https://openrouter.ai/api/v1"  # Overridden by turn_benchmark.py's stub
+
+# Validate keys
+if not VISION_API_KEY or not BRAIN_API_KEY:
+    print("ERROR: API keys not found! Please check your .env file.")
+    print(f"VISION_API_KEY: {'[SET]' if VISION_API_KEY else '[MISSING]'}")
+    print(f"BRAIN_API_KEY: {'[SET]' if BRAIN_API_KEY else '[MISSING]'}")
+    # We'll allow it to continue to the traceback for now, or we could exit.
+    # But let's keep it informative.
+
+# Setup OpenRouter clients with headers
+headers = {
+    "HTTP-Referer": "http://localhost:5174",
+    "X-Title": "Brixbee AI Guardian",
+}
+
+# Clients
+try:
+    v_client = OpenAI(
+        base_url=OPENROUTER_BASE_URL, 
+        api_key=VISION_API_KEY or "missing_key",
+        default_headers=headers
+    )
+    b_client = OpenAI(
+        base_url=OPENROUTER_BASE_URL, 
+        api_key=BRAIN_API_KEY or "missing_key",
+        default_headers=headers
+    )
+except Exception as e:
+    print(f"Init Error: {e}")
+
+
+# Project Config
+WEBSITE_URL           = "http://localhost:3000/"
+AUTO_LOGIN_URL        = "http://localhost:3000/auto-login?name=BrixbeeStudent&role=student"
+BACKEND_BASE_URL      = os.getenv("BRIXBEE_BACKEND_URL") or "http://localhost:5001"
+PDF_CHAT_API_URL      = f"{BACKEND_BASE_URL}/api/ai/pdf-chat"  # Legacy fallback
+BRIXBEE_AGENT_URL     = f"{BACKEND_BASE_URL}/api/ai/brixbee-chat"  # LangGraph Agent
+LOG_API_URL           = f"{BACKEND_BASE_URL}/api/ai/log"
+LOG_BULK_API_URL      = f"{BACKEND_BASE_URL}/api/ai/log/bulk"
+LOG_SPOOL_PATH        = os.getenv("BRIXBEE_LOG_SPOOL") or os.path.join(script_dir, "interaction_log_spool.jsonl")  # Logs kept while the backend is down
+
+# Answer cache for repeated textbook questions
+ANSWER_CACHE_PATH     = os.getenv("BRIXBEE_ANSWER_CACHE") or os.path.join(script_dir, "answer_cache.json")
+ANSWER_CACHE_TTL_H    = float(os.getenv("BRIXBEE_ANSWER_CACHE_TTL_HOURS") or 168)
+ANSWER_CACHE_FUZZY    = (os.getenv("BRIXBEE_ANSWER_CACHE_FUZZY") or "1") != "0"  # Reuse answers for rephrased questions
+CACHED_INTERACTION_TYPES = ("teacher",)  # Assistant answers depend on time, weather and the student's profile
+
+# Reading: pick the sharpest of a burst instead of sending one (possibly blurred) frame
+READ_BURST_FRAMES     = int(os.getenv("BRIXBEE_READ_BURST") or 6)
+READ_MIN_SHARPNESS    = float(os.getenv("BRIXBEE_READ_MIN_SHARPNESS") or 60)  # Below this, ask the child to hold still once (0 = never)
+READ_CROP_PAGE        = (os.getenv("BRIXBEE_READ_CROP_PAGE") or "1") != "0"
+WEATHER_URL           = "https://wttr.in/Tamil%20Nadu?format=3"
+HTTP_RETRIES          = int(os.getenv("BRIXBEE_HTTP_RETRIES") or 2)  # Connection retries per backend call
+HTTP_BACKOFF          = float(os.getenv("BRIXBEE_HTTP_BACKOFF") or 0.3)  # Seconds, doubled on each retry
+AGENT_STREAMING       = (os.getenv("BRIXBEE_AGENT_STREAMING") or "1") != "0"  # Speak agent answers as they stream
+AGENT_CUT_SHORT_REPLY = "I'm sorry, I couldn't finish that answer. Please ask me again."
+# Speculative routing: the native model starts if the agent has said nothing after this many seconds
+AGENT_DEADLINES       = {
+    "teacher":   float(os.getenv("BRIXBEE_AGENT_DEADLINE_TEACHER") or 6.0),  # Textbook tools are worth waiting for
+    "assistant": float(os.getenv("BRIXBEE_AGENT_DEADLINE_ASSISTANT") or 3.0),
+}
+ROUTE_STATS_PATH      = os.getenv("BRIXBEE_ROUTE_STATS") or os.path.join(script_dir, "route_stats.json")
+MEMORY_SUMMARIZER     = os.getenv("BRIXBEE_MEMORY_SUMMARIZER") or "local"  # "brain": the brain model writes the running summary
+BARGE_IN              = (os.getenv("BRIXBEE_BARGE_IN") or "1") != "0"  # Talking over Brixbee interrupts it (live mode)
+# Brain system prompts are built once so every request starts with the same bytes (provider prefix caching)
+BRAIN_SYSTEM_PROMPTS = {
+    tamil: (
+        "You are Brixbee, a friendly AI companion for a blind child. "
+        + ("Speak in TAMIL ONLY. Use simple and warm Tamil language. " if tamil else "Speak in English. ")
+        + "Be very warm, supportive, and natural. Keep responses short (1-2 sentences). "
+        "CRITICAL: If the user asks for Safety or Guardian mode, say 'Activating safety mode now.'"
+    )
+    for tamil in (False, True)
+}
+WAKE_WORDS = ["hey brixbee", "hey bricks b", "hey bixby", "hey brix", "brixbee", "brix", "bixby"]
+
+# Subject keywords that trigger PDF Q&A
+SUBJECT_KEYWORDS = [
+    "math", "maths", "mathematics", "algebra", "geometry", "arithmetic",
+    "science", "physics", "chemistry", "biology",
+    "english", "grammar", "vocabulary", "poem", "prose",
+    "social", "history", "geography", "civics",
+    "explain", "what is", "define", "chapter", "lesson", "textbook",
+    "teach me", "tell me about", "how does", "why is", "who is", "where is",
+    "solve", "calculate", "equation"
+]
+
+# Website open keywords → use auto-login URL
+WEBSITE_OPEN_KEYWORDS = [
+    "ai website", "learning platform", "ai platform", "eduvoice",
+    "brixbee website", "learning website", "my website", "student dashboard",
+    "open website", "study platform"
+]
+
+# Local textbook search (index built by backend/data/extract_pdfs.py)
+TEXTBOOK_TOOLS_DIR = os.getenv("TEXTBOOK_TOOLS_DIR") or os.path.join(script_dir, "..", "backend", "data")
+TEXTBOOK_TEXT_DIR  = os.getenv("TEXTBOOK_TEXT_DIR") or os.path.join(TEXTBOOK_TOOLS_DIR, "temp_text")
+TEXTBOOK_TOP_K     = int(os.getenv("TEXTBOOK_TOP_K") or 4)
+sys.path.append(TEXTBOOK_TOOLS_DIR)
+try:
+    from search_index import SearchIndex
+except ImportError as e:
+    SearchIndex = None
+    print(f"WARNING: Textbook search unavailable ({e}). Subject questions will use the backend only.")
+try:
+    from embedding_index import EmbeddingIndex
+except ImportError as e:
+    EmbeddingIndex = None
+    print(f"WARNING: Semantic textbook search unavailable ({e}). Using keyword search only.")
+
+# Turn handling
+TURN_QUEUE_SIZE    = 4    # Turns waiting behind the current one; typed messages beyond this are refused
+WORKER_THREADS     = 8    # Blocking calls (HTTP, models, microphone, camera) run on this many threads
+TURN_DRAIN_TIMEOUT = 5.0  # Seconds a cancelled turn's blocking calls get to stop before the next turn starts
+SESSION_TIMEOUT    = 60   # Seconds of silence that end live conversation mode
+PRIORITY_GUARD     = 0    # Guardian alerts go ahead of waiting questions
+PRIORITY_USER      = 1
+
+# seq keeps the queue first-in first-out within a priority (and is never equal, so done is never compared)
+Turn = namedtuple("Turn", "priority seq source text done trace")
+# Blocking calls of the turn the caller belongs to; tasks a turn starts (the router's routes) inherit it
+turn_jobs = contextvars.ContextVar("brixbee_turn_jobs", default=None)
+
+
+class HeadlessUI:
+    """The ui interface BrixbeeCore reports to; this one has no window."""
+
+    def set_status(self, text, color, play_sound):
+        pass
+
+    def log(self, line):
+        print(line)
+
+    def play_sound(self, name):
+        pass
+
+    def show_modes(self, guard_mode, tamil_mode):
+        pass
+
+
+class BrixbeeCore:
+    def __init__(self, ui=None, voice=True):
+        self.ui = ui or HeadlessUI()
+        self.voice = voice        # False: no microphone, turns only come from submit_chat()
+        self.guard_mode = False
+        self.last_guard_check = 0
+        self.student_name = "BrixbeeStudent"  # Will be resolved by LangGraph agent
+        self.conversation_active = False
+        self.last_interaction_time = 0
+        self.tamil_mode = False
+        self.current_state = "IDLE"
+        self.textbook_index = None
+        self.embedding_index = None
+        self.textbook_index_lock = threading.Lock()
+        self.mic = None          # Persistent microphone stream, opened in voice_loop
+        self.asr = None          # Speech recognition backend, loaded in voice_loop
+        self.wake_engine = None  # Started in voice_loop once the speech engine exists
+        self.http = BackendClient(retries=HTTP_RETRIES, backoff=HTTP_BACKOFF)  # Pooled keep-alive connections for all HTTP calls
+        self.log_shipper = LogShipper(self.http, LOG_BULK_API_URL, LOG_SPOOL_PATH, legacy_url=LOG_API_URL)
+        self.answer_cache = AnswerCache(ANSWER_CACHE_PATH, ttl=ANSWER_CACHE_TTL_H * 3600,
+                                        fuzzy_threshold=None if not ANSWER_CACHE_FUZZY else 0.8)
+
+        self.tracer = Tracer()  # Latency spans per turn, written to a rotating JSONL file
+
+        # Speech Engine (renders the next sentence while the current one plays)
+        self.speech = SpeechEngine(
+            voice_for=lambda: TAMIL_VOICE if self.tamil_mode else ENGLISH_VOICE,
+            on_speaking=lambda: self.set_status("SPEAKING", "#2ECC71"),
+            on_idle=lambda: self.set_status("IDLE"),
+            on_trace=lambda tag, stage, seconds: self.tracer.record(stage, seconds, trace_id=tag),
+        )
+
+        # Camera: a capture thread owns the device (opened on demand, kept open in Guardian mode)
+        self.camera = CameraStream(keep_alive=lambda: self.guard_mode)
+        self.guard_gate = SceneGate()  # Decides which Guardian frames go to the vision model
+        self.vision_stats = VisionStats()
+        self.router = SpeculativeRouter(RouteStats(ROUTE_STATS_PATH))
+        self.brain = BrainClient(b_client, BRAIN_MODEL, self.router.stats, tracer=self.tracer)  # Shares the persisted latency histograms
+
+        # Event loop state (created on the core thread by main())
+        self.loop = None
+        self.turns = None
+        self.current_task = None
+        self.turn_cancel = threading.Event()  # Set to make the current turn's blocking calls stop early
+        self.agent_streams = set()  # Open agent stream responses, aborted by cancel_turn()
+        self.agent_streams_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="brixbee")
+        self.ready = threading.Event()
+        self._background = set()
+        self._seq = itertools.count()
+        self.barge_ins = 0
+
+        # One token-budgeted history for the native model and the agent; older turns are summarized off the turn's path
+        self.memory = ConversationMemory(summarize=self.summarize_with_brain if MEMORY_SUMMARIZER == "brain" else None,
+                                         run_later=self.executor.submit)
+        self.memory.pin("language", "English")
+
+    # --- Event loop ---
+
+    def start(self, startup_delay=0.0):
+        """Runs the core on its own thread. Returns once it accepts turns."""
+        self.thread = threading.Thread(target=lambda: asyncio.run(self.main(startup_delay)),
+                                       name="brixbee-core", daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    async def main(self, startup_delay=0.0):
+        self.loop = asyncio.get_running_loop()
+        self.turns = asyncio.PriorityQueue(maxsize=TURN_QUEUE_SIZE)
+        self.ready.set()
+        await asyncio.sleep(startup_delay)
+        loops = [self.turn_worker(), self.guard_loop()]
+        if self.voice:
+            loops.append(self.voice_loop())
+        await asyncio.gather(*loops)
+
+    async def run_blocking(self, fn, *args, **kwargs):
+        """
+        Runs a blocking call on the worker pool; calls made by a turn, or by tasks it
+        started, are tracked for cancel_turn(). The call sees the caller's context
+        (its current trace).
+        """
+        future = self.executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+        jobs = turn_jobs.get()
+        if jobs is not None:
+            jobs.add(future)
+            future.add_done_callback(lambda f: self.loop.call_soon_threadsafe(jobs.discard, f))
+        return await asyncio.wrap_future(future)
+
+    def _call(self, fn, *args):
+        """Runs fn(*args) on the core thread. Safe from any thread."""
+        if self.loop is None:
+            print("DEBUG: Core not running yet; request ignored.")
+            return
+        self.loop.call_soon_threadsafe(fn, *args)
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._background.add(task)  # Keep a reference until it finishes
+        task.add_done_callback(self._background.discard)
+
+    def _new_turn(self, source, text, priority, trace=None):
+        return Turn(priority, next(self._seq), source, text, self.loop.create_future(), trace)
+
+    async def submit(self, source, text, priority=PRIORITY_USER, trace=None):
+        """Queues a turn, waiting for room. Await turn.done to know when it was handled."""
+        turn = self._new_turn(source, text, priority, trace)
+        await self.turns.put(turn)
+        return turn
+
+    def _offer(self, source, text, priority=PRIORITY_USER):
+        turn = self._new_turn(source, text, priority)
+        try:
+            self.turns.put_nowait(turn)
+        except asyncio.QueueFull:
+            print(f"DEBUG: Turn queue full, refusing {source} turn: {text!r}")
+            turn.done.set_result(False)
+            self._spawn(self.say("I'm still working on your last question. Please ask me again in a moment."))
+
+    def submit_chat(self, text):
+        """Queues a typed message. Safe from any thread."""
+        self._call(self._offer, "chat", text)
+
+    def cancel_turn(self):
+        """Stops the turn in progress, if any. Safe from any thread."""
+        self.turn_cancel.set()
+        self.abort_agent_streams()
+        self._call(self._cancel_current)
+
+    def abort_agent_streams(self):
+        """Ends the agent streams in progress now instead of at their next event (or read timeout)."""
+        with self.agent_streams_lock:
+            streams = list(self.agent_streams)
+        for resp in streams:
+            abort_response(resp)
+
+    def _cancel_current(self):
+        if self.current_task is not None:
+            self.current_task.cancel()
+
+    def announce(self, text):
+        """Speaks text outside any turn (button feedback). Safe from any thread."""
+        self._call(lambda: self._spawn(self.say(text)))
+
+    async def turn_worker(self):
+        while True:
+            turn = await self.turns.get()
+            self.turn_cancel.clear()
+            jobs = set()
+            turn_jobs.set(jobs)  # Copied into the turn's task when it is created
+            task = asyncio.create_task(self.handle_turn(turn))
+            self.current_task = task
+            await asyncio.wait({task})
+            self.current_task = None
+            if task.cancelled():
+                print(f"DEBUG: {turn.source} turn cancelled.")
+                self.turn_cancel.set()
+                self.abort_agent_streams()
+                if jobs:
+                    # Workers check turn_cancel; don't let them touch the history while the next turn runs
+                    await asyncio.wait([asyncio.wrap_future(f) for f in jobs], timeout=TURN_DRAIN_TIMEOUT)
+            elif task.exception():
+                print(f"DEBUG: {turn.source} turn failed: {task.exception()!r}")
+            if not turn.done.done():
+                turn.done.set_result(not task.cancelled())
+
+    async def handle_turn(self, turn):
+        # Runs in its own task, so the trace set here is this turn's only
+        if turn.trace:
+            current_trace.set(turn.trace)
+        trace = turn.trace or self.tracer.begin(turn.source)
+        self.tracer.commit(trace, words=len(turn.text.split()))
+        with self.tracer.span("turn", source=turn.source):
+            if turn.source == "guard":
+                await self.handle_guard_alert(turn.text)
+            elif turn.source == "chat":
+                await self.handle_chat(turn.text)
+            else:
+                await self.handle_command(turn.text)
+
+    # --- Output ---
+
+    def speak(self, text):
+        """Logs text and queues it for speech. Waits while the speech queue is full, so not for the event loop."""
+        self.ui.log(f"Brixbee: {text}")
+        self.speech.say(text, tag=current_trace.get())
+
+    def speak_for_turn(self, text):
+        """speak() for a turn's worker threads: nothing more is said once the turn is cancelled."""
+        if not self.turn_cancel.is_set():
+            self.speak(text)
+
+    def barge_in(self):
+        """The child started talking over Brixbee: stop the speech and the turn behind it. Safe from any thread."""
+        print("DEBUG: Barge-in: stopping speech and generation.")
+        self.barge_ins += 1
+        self.speech.stop()
+        self.cancel_turn()
+        self.last_interaction_time = time.time()
+
+    async def say(self, text):
+        """speak() for coroutines."""
+        await self.run_blocking(self.speak, text)
+
+    def set_status(self, text, color="#D4AF37", play_sound=True):
+        self.current_state = text.upper()
+        self.ui.set_status(self.current_state, color, play_sound)
+
+    def set_guard_mode(self, on):
+        self.guard_mode = on
+        self.ui.show_modes(self.guard_mode, self.tamil_mode)
+
+    def set_tamil_mode(self, on):
+        self.tamil_mode = on
+        self.memory.pin("language", "Tamil" if on else "English")
+        self.ui.show_modes(self.guard_mode, self.tamil_mode)
+
+    def print_stats(self):
+        print(f"DEBUG: HTTP latency: {self.http.format_stats()}")
+        print(f"DEBUG: Interaction logs: {self.log_shipper.format_stats()}")
+        print(f"DEBUG: Answer cache: {self.answer_cache.format_stats()}")
+        print(f"DEBUG: Vision payloads: {self.vision_stats.format_stats()}")
+        print(f"DEBUG: Barge-ins: {self.barge_ins}")
+        print(f"DEBUG: Routes: {self.router.stats.format_stats()}")
+        print(f"DEBUG: Memory: {self.memory.format_stats()}")
+        print(f"DEBUG: Brain requests: {self.brain.format_stats()}")
+        if self.tracer.enabled:
+            print(f"DEBUG: Traces: {self.tracer.written} records in {self.tracer.path} (python tracing.py for percentiles)")
+        self.router.stats.save()
+
+    # --- Guardian ---
+
+    async def guard_loop(self):
+        """
+        Checks the latest camera frame locally about once a second and only asks
+        the vision model when the scene changed or a heartbeat is due. Alerts are
+        queued as turns ahead of waiting questions.
+        """
+        last_frame_id = 0
+        was_guarding = False
+        while True:
+            await asyncio.sleep(GUARD_SAMPLE_INTERVAL)
+            if self.guard_mode:
+                self.camera.acquire()
+                if not was_guarding:
+                    self.guard_gate.reset()
+                    was_guarding = True
+                frame, frame_id = self.camera.latest()
+                if frame is not None and frame_id != last_frame_id:
+                    last_frame_id = frame_id
+                    reason = await self.run_blocking(self.guard_gate.check, frame)
+                    if reason:
+                        print(f"DEBUG: Guardian escalating ({reason}, {self.guard_gate.last_scores})")
+                        self.last_guard_check = time.time()
+                        self.set_status("SEEING", "#9B59B6")
+                        img = await self.run_blocking(prepare_image, frame, "guard")
+                        prompt = "You are a Guardian AI. Image scan: 1. Hazards? 2. Emotion? Respond ONLY 'SAFE' if okay. Otherwise, 1 short sentence hazard/mood warning."
+                        raw_vision = await self.run_blocking(self.analyze_image, img, prompt)
+
+                        if raw_vision and "SAFE" not in raw_vision.upper():
+                            self.ui.play_sound("alert")
+                            await self.submit("guard", raw_vision, priority=PRIORITY_GUARD)
+            elif was_guarding:
+                was_guarding = False
+                self.camera.stop()  # Release the camera now rather than after the linger time
+                print(f"DEBUG: Guardian gate: {self.guard_gate.format_stats()}")
+
+    async def handle_guard_alert(self, raw_vision):
+        ans = await self.run_blocking(self.ask_ai, f"I am in Guardian mode and I noticed something: {raw_vision}. Tell the child gently.", vision_data=raw_vision)
+        await self.say(ans)
+
+    # --- Vision, agents and speech recognition (blocking; run on the worker pool) ---
+
+    def capture_image(self, profile="describe", region=None):
+        """
+        Takes a fresh frame from the capture thread (opening the camera if needed) and
+        prepares it for the vision model with the given image_prep profile.
+        """
+        self.set_status("SEEING", "#9B59B6")
+        with self.tracer.span("camera", profile=profile):
+            frame = self.camera.snapshot(timeout=3.0)
+        if frame is None:
+            print("DEBUG: No camera frame available.")
+            return None
+
+        return prepare_image(frame, profile, region)
+
+    def capture_page(self):
+        """
+        Reading: takes a burst of frames, keeps the sharpest and crops it to the page.
+        If even the best frame is blurred, asks the child to hold still and tries one
+        more burst instead of spending a vision call on an unreadable image.
+        """
+        self.set_status("SEEING", "#9B59B6")
+        best, best_score = None, -1.0
+        for attempt in range(2):
+            with self.tracer.span("camera", profile="read"):
+                frames = self.camera.burst(READ_BURST_FRAMES, timeout=3.0)
+            if not frames:
+                break
+            frame, score, scores = sharpest(frames)
+            print(f"DEBUG: Burst of {len(frames)} frames, sharpness {min(scores):.0f}-{max(scores):.0f} (first {scores[0]:.0f})")
+            if score > best_score:
+                best, best_score = frame, score
+            if best_score >= READ_MIN_SHARPNESS or attempt == 1:
+                break
+            self.speak_for_turn("Please hold the page still for a moment.")
+        if best is None:
+            print("DEBUG: No camera frame available.")
+            return None
+
+        region = find_page(best) if READ_CROP_PAGE else None
+        if region:
+            print(f"DEBUG: Page found, cropping to {tuple(round(v, 2) for v in region)}")
+        return prepare_image(best, "read", region)
+
+    def analyze_image(self, image, prompt):
+        """Vision Agent (Gemini): Processes pixels and describes them to the Brain."""
+        # Only play tingle if not already in thinking state
+        self.set_status("THINKING", "#F1C40F", play_sound=(self.current_state != "THINKING"))
+        try:
+            messages = [
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": prompt},
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": image.data_url
+                            }
+                        }
+                    ]
+                }
+            ]
+            
+            started = time.time()
+            with self.tracer.span("vision", profile=image.profile, kb=image.jpeg_bytes // 1024):
+                completion = v_client.chat.completions.create(
+                    model=VISION_MODEL,
+                    messages=messages,
+                    max_tokens=300
+                )
+            elapsed = time.time() - started
+            self.vision_stats.record(image, elapsed)
+            print(f"DEBUG: Vision request [{image.profile}] {image.width}x{image.height}, "
+                  f"{image.jpeg_bytes / 1024:.0f} KB (encode {image.encode_seconds * 1000:.0f} ms), "
+                  f"upload + answer {elapsed:.2f}s")
+            return completion.choices[0].message.content
+        except Exception as e:
+            err_msg = str(e)
+            print(f"Vision Agent Error: {err_msg}")
+            if "401" in err_msg:
+                return "My vision system is unauthorized. Please check the API key."
+            return "I am having trouble processing the image."
+
+    def load_textbook_indexes(self):
+        """Loads the keyword and semantic indexes once; a missing index is remembered as False."""
+        with self.textbook_index_lock:
+            if self.textbook_index is None:
+                try:
+                    self.textbook_index = SearchIndex.load(TEXTBOOK_TEXT_DIR) if SearchIndex else False
+                    if self.textbook_index:
+                        print(f"DEBUG: Loaded textbook index ({len(self.textbook_index)} passages).")
+                except Exception as e:
+                    print(f"DEBUG: Textbook index not loaded: {e}")
+                    self.textbook_index = False  # Don't retry on every question
+            if self.embedding_index is None:
+                try:
+                    self.embedding_index = EmbeddingIndex.load(TEXTBOOK_TEXT_DIR) if EmbeddingIndex else False
+                    if self.embedding_index:
+                        print(f"DEBUG: Loaded embedding index ({len(self.embedding_index)} passages).")
+                except Exception as e:
+                    print(f"DEBUG: Embedding index not loaded: {e}")
+                    self.embedding_index = False
+
+    def retrieve_passages(self, question, k=TEXTBOOK_TOP_K):
+        """
+        Returns the top-k textbook passages for a question.
+        Keyword (BM25) and semantic rankings are merged with reciprocal rank fusion,
+        so either index alone still works.
+        """
+        self.load_textbook_indexes()
+        rankings = []
+        if self.textbook_index:
+            rankings.append(self.textbook_index.search(question, k=k * 2))
+        if self.embedding_index:
+            rankings.append(self.embedding_index.search(question, k=k * 2))
+
+        fused = {}
+        for ranking in rankings:
+            for rank, p in enumerate(ranking):
+                key = (p["book"], p["text"])
+                entry = fused.setdefault(key, {"book": p["book"], "page": p["page"], "text": p["text"], "rrf": 0.0})
+                entry["rrf"] += 1.0 / (60 + rank)
+        best = sorted(fused.values(), key=lambda p: p["rrf"], reverse=True)[:k]
+        return [{"book": p["book"], "page": p["page"], "text": p["text"]} for p in best]
+
+    def format_passages(self, passages):
+        lines = []
+        for p in passages:
+            where = f"{p['book']} p.{p['page']}" if p.get("page") else p["book"]
+            lines.append(f"({where}) {p['text']}")
+        return "\n".join(lines)
+
+    def answer_scope(self, passages):
+        """Textbook scope for the answer cache: the books the retrieved passages came from."""
+        return ",".join(sorted({p["book"] for p in passages or []}))
+
+    def remember_agent_turn(self, question, answer, facts=None):
+        """Adds a finished exchange to memory (agent answers and cache replays)."""
+        self.memory.add_exchange(question, answer)
+        if facts:
+            self.memory.mark_facts_sent(facts)
+
+    def summarize_with_brain(self, summary_lines, messages):
+        """Memory summarizer that asks the brain model for a short running summary."""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        notes = self.brain.complete(
+            [
+                {"role": "system", "content": (
+                    "You keep notes for Brixbee, a tutor for a blind child. Merge the earlier notes and the new "
+                    "conversation into at most 60 words: topics covered, what the child understood or found hard, "
+                    "and anything they asked to come back to. Reply with the notes only.")},
+                {"role": "user", "content": f"Earlier notes: {' '.join(summary_lines) or 'none'}\n\nConversation:\n{transcript}"},
+            ],
+            max_tokens=120,
+            timeout=15.0,
+        ).strip()
+        if not notes:
+            raise ValueError("empty summary")
+        return [notes]
+
+    def ask_pdf_ai(self, question):
+        """Legacy PDF/Subject Teacher - kept as fallback only."""
+        self.set_status("THINKING", "#F1C40F", play_sound=(self.current_state != "THINKING"))
+        try:
+            # Send only the relevant passages instead of letting the backend attach a whole book
+            passages = self.retrieve_passages(question)
+            resp = self.http.post(
+                "pdf_chat",
+                PDF_CHAT_API_URL,
+                json={"question": question, "subject": question, "studentName": self.student_name, "passages": passages}
+            )
+            if resp.status_code == 200:
+                data = resp.json()
+                answer = data.get("answer", "")
+                return answer if answer else None
+            return None
+        except Exception as e:
+            print(f"DEBUG: PDF Chat API unreachable: {e}")
+            return None
+
+    def prepare_agent_message(self, message, vision_context=None, textbook_context=None):
+        """
+        Returns (message to send, message to remember, facts sent). Memory is only
+        changed once an answer was actually given, so a cancelled or failed request
+        leaves no trace.
+
+        The backend agent keeps its own thread per student, so pinned facts go with
+        the message only when they changed since the agent last answered.
+        """
+        facts = self.memory.unsent_facts()
+        # Append vision context to message if available
+        full_message = message
+        if vision_context:
+            full_message = f"{message} [Vision context: {vision_context}]"
+
+        # Facts and textbook passages go with this request only, never into the history
+        request_message = full_message
+        if facts:
+            request_message = f"{request_message} [Student facts: {facts}]"
+        if textbook_context:
+            request_message = f"{request_message} [Textbook passages: {textbook_context}]"
+        return request_message, full_message, facts
+
+    def ask_langgraph_agent_stream(self, message, interaction_type="assistant", vision_context=None, textbook_context=None,
+                                   on_sentence=None, cancel=None):
+        """
+        Streaming variant of ask_langgraph_agent: each sentence is spoken (or handed to
+        on_sentence) as soon as the agent produces it. Returns (answer, spoken): answer
+        is None if nothing came back, the stream broke off before the agent finished,
+        or cancel was set; spoken tells whether any sentence was already handed out,
+        in which case asking again would repeat it. Only finished answers are remembered.
+        """
+        self.set_status("THINKING", "#F1C40F", play_sound=(self.current_state != "THINKING"))
+        request_message, remembered, facts = self.prepare_agent_message(message, vision_context, textbook_context)
+        history = self.memory.messages()
+        speak = on_sentence or self.speak_for_turn
+        started = time.perf_counter()
+        first = []
+
+        def on_agent_sentence(text):
+            if not first:
+                first.append(True)
+                self.tracer.record("agent.first_sentence", time.perf_counter() - started)
+            speak(text)
+
+        opened = []
+
+        def on_response(resp):
+            opened.append(resp)
+            with self.agent_streams_lock:
+                self.agent_streams.add(resp)
+            if self.turn_cancel.is_set():
+                abort_response(resp)  # Cancelled while connecting
+
+        try:
+            print(f"DEBUG: Streaming from LangGraph Brixbee Agent... type={interaction_type}")
+            result = stream_agent_chat(
+                BRIXBEE_AGENT_URL,
+                {
+                    "message": request_message,
+                    "studentName": self.student_name,
+                    "interactionType": interaction_type,
+                    "history": history
+                },
+                on_sentence=on_agent_sentence,
+                timeout=self.http.timeouts["agent_stream"],
+                post=lambda url, **kwargs: self.http.post("agent_stream", url, **kwargs),
+                should_stop=lambda: self.turn_cancel.is_set() or (cancel is not None and cancel.is_set()),
+                on_response=on_response
+            )
+        except requests.ConnectionError:
+            raise  # Backend down: agent_route skips the plain request as well
+        except Exception as e:
+            print(f"DEBUG: LangGraph Agent stream unreachable: {e}")
+            result = None
+        finally:
+            with self.agent_streams_lock:
+                self.agent_streams.difference_update(opened)
+        complete = bool(result and result["complete"])
+        spoken = bool(first) or bool(result and result["spoken"])
+        self.tracer.record("agent.total", time.perf_counter() - started, streamed=True, answered=complete)
+
+        if not result:
+            return None, spoken
+        if not complete:
+            print(f"DEBUG: LangGraph Agent stream broke off after {len(result['answer'])} characters; not remembered.")
+            return None, spoken
+        if result["toolsUsed"]:
+            print(f"DEBUG: LangGraph tools used: {result['toolsUsed']}")
+        self.remember_agent_turn(remembered, result["answer"], facts)
+        return result["answer"], spoken
+
+    def ask_langgraph_agent(self, message, interaction_type="assistant", vision_context=None, textbook_context=None, cancel=None):
+        """
+        PRIMARY AI method: Routes ALL messages through the LangGraph Brixbee Agent.
+        The agent automatically:
+          - Fetches the student's profile from the website database
+          - Searches textbooks for subject questions
+          - Syncs learning progress back to the website
+          - Logs the interaction for teacher review
+        Falls back to native AI if the backend is unreachable. An answer that arrives
+        after cancel was set is discarded.
+        """
+        self.set_status("THINKING", "#F1C40F", play_sound=(self.current_state != "THINKING"))
+        request_message, remembered, facts = self.prepare_agent_message(message, vision_context, textbook_context)
+
+        try:
+            print(f"DEBUG: Calling LangGraph Brixbee Agent... type={interaction_type}")
+            with self.tracer.span("agent.total", streamed=False):
+                resp = self.http.post(
+                    "agent",
+                    BRIXBEE_AGENT_URL,
+                    json={
+                        "message": request_message,
+                        "studentName": self.student_name,
+                        "interactionType": interaction_type,
+                        "history": self.memory.messages()
+                    }
+                )
+            if resp.status_code == 200:
+                data = resp.json()
+                answer = data.get("answer", "")
+                tools_used = data.get("toolsUsed", [])
+                if tools_used:
+                    print(f"DEBUG: LangGraph tools used: {tools_used}")
+
+                if answer and (self.turn_cancel.is_set() or (cancel is not None and cancel.is_set())):
+                    print("DEBUG: LangGraph Agent answered after being cancelled; discarded.")
+                    return None
+                if answer:
+                    # Add to agent history
+                    self.remember_agent_turn(remembered, answer, facts)
+                    return answer
+
+            print(f"DEBUG: LangGraph Agent returned status {resp.status_code}")
+            return None  # Fall back to native AI
+
+        except Exception as e:
+            print(f"DEBUG: LangGraph Agent unreachable: {e}. Falling back to native AI.")
+            return None  # Fall back to native AI
+
+    def ask_ai(self, question, model_type="teacher", vision_data=None, on_sentence=None, cancel=None):
+        """
+        Brain Agent: The lead orchestrator (Supports GPT-4o Audio with fallback).
+        Sentences are spoken (or handed to on_sentence) as they stream. If cancel is set
+        (another route answered first) or the turn is cancelled (barge-in), it stops,
+        leaves memory and the interaction log alone and returns None.
+        """
+        self.set_status("THINKING", "#F1C40F", play_sound=(self.current_state != "THINKING"))
+        speak = on_sentence or self.speak_for_turn
+        stopped = lambda: self.turn_cancel.is_set() or (cancel is not None and cancel.is_set())
+
+        try:
+            # The system prompt is fixed per language and the history only grows at the end, so
+            # both stay a cacheable prefix; what changes per request goes after the history
+            history = self.memory.messages()
+            messages = [{"role": "system", "content": BRAIN_SYSTEM_PROMPTS[bool(self.tamil_mode)]}] + history
+            context = self.memory.context_text()
+            if vision_data:
+                context = f"{context}\n[VISION DATA]: {vision_data}." if context else f"[VISION DATA]: {vision_data}."
+            if context:
+                messages.append({"role": "system", "content": context})
+            if question:
+                messages.append({"role": "user", "content": question})
+
+            # Attempt the call with high robustness
+            try:
+                print(f"DEBUG: Calling {BRAIN_MODEL}...")
+                
+                # Check if we are using the audio preview model
+                is_audio_model = "audio" in BRAIN_MODEL.lower()
+                
+                # We'll try to get text back primarily for the local TTS
+                extra_params = {}
+                if is_audio_model:
+                    extra_params = {
+                        "modalities": ["text", "audio"],
+                        "audio": {"voice": "alloy", "format": "wav"}
+                    }
+
+                response_text = ""
+                
+                # Stream sentence by sentence: each one is synthesized while the previous plays
+                segmenter = SentenceSegmenter()
+                with closing(self.brain.stream(messages, stable=1 + len(history), should_stop=stopped,
+                                               max_tokens=300, timeout=25.0, **extra_params)) as tokens:
+                    for content in tokens:
+                        response_text += content
+                        for sentence in segmenter.feed(content):
+                            speak(sentence)
+                if stopped():
+                    print("DEBUG: Brain generation cancelled.")
+
+                # Speak remaining
+                remainder = segmenter.flush()
+                if remainder and not stopped():
+                    speak(remainder)
+                
+            except Exception as inner_e:
+                print(f"DEBUG: Primary model failed ({inner_e}). Falling back to gpt-4o standard...")
+                response_text = self.brain.complete(messages, model="google/gemini-2.0-flash-001", max_tokens=300, timeout=15.0)
+                if not stopped():
+                    speak(response_text)
+
+            print(f"DEBUG: Brain response processed.")
+            if stopped():
+                return None  # Another route answered or the child talked over it: not an exchange to remember
+
+            if not response_text:
+                response_text = "I'm listening. Could you repeat that?"
+
+            self.memory.add_exchange(question, response_text)
+
+            # Store in DB (batched in the background)
+            self.log_shipper.log(question or "Speech", response_text, model_type)
+
+            return response_text
+        except Exception as e:
+            err_msg = str(e)
+            print(f"Brain Agent Error: {err_msg}")
+            if "401" in err_msg:
+                return "I am sorry, my brain is not authorized right now. Please check the API key."
+            if "429" in err_msg:
+                return "I'm a bit overwhelmed right now. My API limit has been reached. Please try again in a few minutes."
+            return "I missed that, could you say it again?"
+
+    def recognize(self, samples, sample_rate):
+        """Transcribes 16-bit mono samples in the current language. Returns lowercase text or ""."""
+        if self.asr is None:
+            return ""
+        language = "ta" if getattr(self, 'tamil_mode', False) else "en"
+        try:
+            print(f"DEBUG: Recognizing {language} with {self.asr.name}...")
+            with self.tracer.span("asr", engine=self.asr.name, language=language):
+                query = self.asr.transcribe(samples, sample_rate, language,
+                                            on_partial=lambda text: print(f"DEBUG: Partial: {text}"))
+        except Exception as e:
+            print(f"DEBUG: recognize error: {e}")
+            return ""
+        if not query:
+            print("DEBUG: Speech was unintelligible.")
+            return ""
+        print(f"DEBUG: Recognized: {query}")
+        return query.lower()
+
+    def get_audio(self, timeout=7):
+        if self.mic and self.mic.running:
+            # Shared always-open stream: no reopening or recalibrating per turn, and
+            # recognition starts as soon as the voice activity detector hears the end
+            if self.current_task is None:  # Also listening while a turn runs (barge-in); keep its status
+                self.set_status("LISTENING", "#3498DB")
+            samples = self.mic.listen(timeout=timeout, phrase_time_limit=10, is_muted=self.speech.is_busy,
+                                      on_barge_in=self.barge_in if BARGE_IN else None)
+            if samples is None:
+                return ""
+            self.trace_capture(len(samples) / self.mic.sample_rate)
+            return self.recognize(samples, self.mic.sample_rate)
+
+        r = sr.Recognizer()
+        with sr.Microphone() as source:
+            r.energy_threshold = 300 # Slightly more sensitive
+            try:
+                self.set_status("LISTENING", "#3498DB")
+                # Reduced duration for faster response (0.5 -> 0.2)
+                r.adjust_for_ambient_noise(source, duration=0.2)
+                audio = r.listen(source, timeout=timeout, phrase_time_limit=10)
+            except Exception as e:
+                print(f"DEBUG: get_audio error: {e}")
+                return ""
+        self.trace_capture(len(audio.frame_data) / (audio.sample_width * audio.sample_rate))
+        return self.recognize(np.frombuffer(audio.get_raw_data(convert_width=2), dtype=np.int16), audio.sample_rate)
+
+    def trace_capture(self, seconds):
+        """The child just finished an utterance of this length: the turn's clock starts now."""
+        self.tracer.record("capture", seconds)
+        self.tracer.restart_clock()
+
+    def listen_for_wake(self):
+        """
+        Waits (locally, no network) for "Hey Brix Bee", then transcribes only the
+        speech that followed it. Returns "hey brixbee <command>" so run_logic's
+        wake word handling applies unchanged, or "" if nothing was heard.
+        """
+        if not self.wake_engine.wait_for_wake(timeout=1.0):
+            return ""
+        print("DEBUG: Wake word detected locally.")
+        self.set_status("LISTENING", "#3498DB")
+        pcm = self.wake_engine.capture_command()
+        command = ""
+        if pcm:
+            self.trace_capture(len(pcm) / 2 / self.wake_engine.sample_rate)
+            command = self.recognize(np.frombuffer(pcm, dtype=np.int16), self.wake_engine.sample_rate)
+        return f"hey brixbee {command}".strip()
+
+
+    # --- Turns ---
+
+    async def voice_loop(self):
+        """Listens for the wake word (and, in live mode, for follow-ups) and queues what was said."""
+        await self.say("I am ready for a live chat. Just say Hey Brixbee to start.")
+        try:
+            self.asr = await self.run_blocking(create_asr)  # Loads the offline model once, before the first turn
+        except Exception as e:
+            print(f"ERROR: {e}")
+        self.mic = await self.run_blocking(open_microphone)
+        # Local wake word; muted while Brixbee talks (it says "Hey Brixbee" itself) and during live chat
+        self.wake_engine = await self.run_blocking(create_wake_engine, self.mic,
+                                                   is_muted=lambda: self.speech.is_busy() or self.conversation_active)
+
+        while True:
+            trace = self.tracer.begin("voice")  # Kept only if what is heard becomes a turn
+            # If we are in an active conversation, listen without needing the wake word
+            if self.conversation_active:
+                # If silent for more than 60 seconds, end live mode
+                if self.current_task is None and time.time() - self.last_interaction_time > SESSION_TIMEOUT:
+                    self.conversation_active = False
+                    self.tracer.discard(trace)
+                    await self.say("I'll go to sleep now. Just say Hey Brixbee if you need me again!")
+                    self.print_stats()
+                    continue
+
+                query = await self.run_blocking(self.get_audio, timeout=12)  # Longer listening window for live mode
+            elif self.wake_engine:
+                query = await self.run_blocking(self.listen_for_wake)
+            else:
+                self.set_status("IDLE")
+                query = await self.run_blocking(self.get_audio)
+
+            if not query:
+                self.tracer.discard(trace)
+                continue
+
+            # Detect wake word
+            is_wake = any(w in query for w in WAKE_WORDS)
+            if not (is_wake or self.conversation_active):
+                self.tracer.discard(trace)
+                continue
+
+            print(f"DEBUG: Wake word detected or conversation active (query: {query})")
+            self.last_interaction_time = time.time()
+
+            # Activate live mode
+            if not self.conversation_active:
+                self.conversation_active = True
+
+            user_msg = query
+            if is_wake:
+                for w in WAKE_WORDS:
+                    if user_msg.startswith(w):
+                        user_msg = user_msg.replace(w, "", 1).strip()
+                        break
+
+            if self.current_task is not None:
+                # A new question while the last one is still being answered replaces it
+                self.cancel_turn()
+            await self.submit("voice", user_msg, trace=trace)
+            await asyncio.sleep(0.1)
+
+    async def handle_chat(self, msg):
+        """A message typed into the chat box."""
+        self.memory.observe(msg)
+        self.conversation_active = True
+        self.last_interaction_time = time.time()
+
+        # Simple command routing for chat too
+        if any(k in msg.lower() for k in ["guard", "guardian", "safety", "watch me"]):
+            if any(x in msg.lower() for x in ["stop", "off", "deactivate"]):
+                self.set_guard_mode(False)
+                await self.say("Safety mode deactivated.")
+            else:
+                self.set_guard_mode(True)
+                await self.say("Safety mode activated!")
+            return
+
+        ans = await self.run_blocking(self.ask_ai, msg)
+        await self.say(ans)
+
+    async def handle_command(self, user_msg):
+        """A spoken request (wake word already removed)."""
+        self.memory.observe(user_msg)
+        # Handle Goodbye/Exit
+        if any(x in user_msg for x in ["goodbye", "stop", "exit", "go to sleep", "shut down"]):
+            await self.say("Goodbye! I will be waiting.")
+            self.conversation_active = False
+            self.print_stats()
+            self.memory.clear()
+            return
+
+        # Command Routing
+        vision_words = ["see", "look", "describe", "read", "color", "what is this", "what am i holding", "vision", "camera"]
+        search_words = ["where is", "find my", "locate"]
+
+        # 1. Handle Object Search (Multi-Agent Flow)
+        if any(k in user_msg for k in search_words):
+            target = user_msg.split("is")[-1].strip() if "is" in user_msg else user_msg.split("my")[-1].strip()
+            await self.say(f"Looking for your {target}. Hold on.")
+            img = await self.run_blocking(self.capture_image, "search")
+            if img:
+                # Agent 1 (Vision) gets raw data
+                prompt = f"Identify the location of the {target} relative to the center. Be brief."
+                raw_vision = await self.run_blocking(self.analyze_image, img, prompt)
+
+                if raw_vision:
+                    # Agent 2 (Brain) creates a warm response for the child
+                    ans = await self.run_blocking(self.ask_ai, f"I found the {target}. Tell the child where it is based on this data: {raw_vision}", vision_data=raw_vision)
+                    await self.say(ans)
+                else:
+                    await self.say(f"I'm sorry, I couldn't find the {target}. Could you move the camera around?")
+            else:
+                await self.say("I couldn't access the camera. Please make sure it is connected.")
+            return
+
+        # 2. Handle General Vision (Multi-Agent Flow)
+        if any(k in user_msg for k in vision_words):
+            await self.say("Let me take a look.")
+            if "read" in user_msg:
+                img = await self.run_blocking(self.capture_page)
+            else:
+                img = await self.run_blocking(self.capture_image, "describe")
+            if img:
+                v_prompt = "Describe exactly what is in front of the camera."
+                if "read" in user_msg: v_prompt = "Transcribe all text visible in this image."
+
+                raw_vision = await self.run_blocking(self.analyze_image, img, v_prompt)
+
+                if raw_vision:
+                    # Brain Agent interprets the vision data for the blind student
+                    ans = await self.run_blocking(self.ask_ai, f"Explain what I am seeing in simple words. Vision report: {raw_vision}", vision_data=raw_vision)
+                    await self.say(ans)
+                else:
+                    await self.say("I'm sorry, I couldn't process the image. Please try again.")
+            else:
+                await self.say("I couldn't access the camera. Please make sure it is connected.")
+            return
+
+        # 3. Handle Weather
+        if "weather" in user_msg:
+            await self.say("Checking the weather in Tamil Nadu for you.")
+            try:
+                # Simple free weather service (no key needed for basic info)
+                resp = await self.run_blocking(self.http.get, "weather", WEATHER_URL)
+                if resp.status_code == 200:
+                    await self.say(f"The weather is {resp.text}")
+                else:
+                    await self.say("I couldn't reach the weather service right now.")
+            except Exception:
+                await self.say("I'm unable to check the weather at the moment.")
+            return
+
+        # 4. Handle Guard/Safety Mode (Enhanced robust matching)
+        safety_keywords = ["guard", "guardian", "safety", "watch me", "watch over me", "protection"]
+        if any(k in user_msg for k in safety_keywords):
+            if any(x in user_msg for x in ["stop", "off", "deactivate", "disable", "shut down", "go away"]):
+                self.set_guard_mode(False)
+                msg = "Safety mode deactivated. Turning off the camera." if not self.tamil_mode else "பாதுகாப்பு முறை அணைக்கப்பட்டது. கேமரா அணைக்கப்பட்டது."
+                await self.say(msg)
+            else:
+                self.set_guard_mode(True)
+                msg = "Safety mode activated! Turning on the camera to watch over you." if not self.tamil_mode else "பாதுகாப்பு முறை செயல்படுத்தப்பட்டது! நான் உங்களை கவனிக்கிறேன்."
+                await self.say(msg)
+            return
+
+        # 5. Handle Language Switching
+        if "tamil" in user_msg or "தமிழ்" in user_msg:
+            self.set_tamil_mode(True)
+            await self.say("வணக்கம்! நான் இப்போது தமிழில் பேசுவேன். நான் உங்களுக்கு எப்படி உதவட்டும்?")
+            return
+
+        if "english" in user_msg:
+            self.set_tamil_mode(False)
+            await self.say("I will speak in English now. How can I help you?")
+            return
+
+        if "open" in user_msg:
+            # 1. Check for AI/learning platform keywords → auto-login
+            if any(x in user_msg for x in WEBSITE_OPEN_KEYWORDS):
+                await self.say("Opening your student dashboard and logging you in automatically.")
+                await self.run_blocking(webbrowser.open, AUTO_LOGIN_URL)
+                return
+
+            # 2. Check for brixbee website (generic)
+            if any(x in user_msg for x in ["brixbee", "specially", "notes", "project", "website"]):
+                await self.say("Opening EduVoice for you. You will be logged in automatically.")
+                await self.run_blocking(webbrowser.open, AUTO_LOGIN_URL)
+                return
+
+            # 3. Check for common sites
+            sites = {
+                "youtube": "https://www.youtube.com",
+                "amazon":  "https://www.amazon.in",
+                "flipkart": "https://www.flipkart.com",
+                "google":  "https://www.google.com",
+                "facebook": "https://www.facebook.com"
+            }
+
+            for site_name, url in sites.items():
+                if site_name in user_msg:
+                    await self.say(f"Opening {site_name} for you.")
+                    await self.run_blocking(webbrowser.open, url)
+                    return
+
+        # If just the wake word without a query, wait for them to speak
+        if not user_msg:
+            await self.say("Yes? I'm listening.")
+            return
+
+        # --- LangGraph Brixbee Agent (PRIMARY routing for all questions) ---
+        # Determine interaction type for logging
+        is_subject_q = any(k in user_msg for k in SUBJECT_KEYWORDS)
+        interaction_type = "teacher" if is_subject_q else "assistant"
+
+        textbook_context = None
+        passages = []
+        if is_subject_q:
+            with self.tracer.span("retrieval"):
+                passages = await self.run_blocking(self.retrieve_passages, user_msg)
+            if passages:
+                textbook_context = self.format_passages(passages)
+                self.memory.pin("book", passages[0]["book"])
+
+        use_cache = interaction_type in CACHED_INTERACTION_TYPES
+        scope = self.answer_scope(passages)
+        if use_cache:
+            cached = self.answer_cache.get(user_msg, self.tamil_mode, interaction_type, scope)
+            if cached:
+                print(f"DEBUG: Answer cache hit ({self.answer_cache.format_stats()})")
+                await self.say(cached)
+                self.remember_agent_turn(user_msg, cached)
+                self.log_shipper.log(user_msg, cached, interaction_type)
+                return
+
+        # Agent first; the native model starts if the agent is silent past its deadline
+        # (or fails), and whichever speaks first answers
+        deadline = AGENT_DEADLINES.get(interaction_type, AGENT_DEADLINES["assistant"])
+        print(f"DEBUG: Routing to LangGraph Brixbee Agent (type={interaction_type}, native after {deadline:g}s)...")
+        routing_started = time.perf_counter()
+        route, answer = await self.router.race([
+            Route("agent", 0.0, lambda on_sentence, cancel: self.agent_route(user_msg, interaction_type, textbook_context, on_sentence, cancel)),
+            Route("native", deadline, lambda on_sentence, cancel: self.ask_ai(user_msg, model_type=interaction_type, on_sentence=on_sentence, cancel=cancel)),
+        ], self.run_blocking, self.speak_for_turn)
+        self.tracer.record("route", time.perf_counter() - routing_started, winner=route or "none", type=interaction_type)
+        if route == "agent" and answer and use_cache:
+            # agent_route only returns finished answers; one that broke off mid-stream was heard but is never replayed
+            await self.run_blocking(self.answer_cache.put, user_msg, answer, self.tamil_mode, interaction_type, scope)
+        if route is None:
+            await self.say("I'm sorry, I couldn't find an answer just now. Could you ask me again?")
+
+    def agent_route(self, user_msg, interaction_type, textbook_context, on_sentence, cancel):
+        """
+        The LangGraph agent as a route: streamed if possible, else the plain request.
+        Returns only a finished answer (the stream's "done" event or the plain reply),
+        or None. A stream that broke off after speaking is not asked again (the agent's
+        thread would get the message twice and the child would hear the start twice);
+        the child is told the answer was cut short instead. If the backend cannot be
+        reached at all, the plain request is skipped too and the next route takes over.
+        """
+        answer, spoken = None, False
+        if AGENT_STREAMING:
+            # Spoken sentence by sentence while the agent is still generating
+            try:
+                answer, spoken = self.ask_langgraph_agent_stream(user_msg, interaction_type=interaction_type,
+                                                                 textbook_context=textbook_context,
+                                                                 on_sentence=on_sentence, cancel=cancel)
+            except requests.ConnectionError as e:
+                print(f"DEBUG: LangGraph Agent unreachable, not retrying without streaming: {e}")
+                return None
+        if spoken and not answer:
+            if not cancel.is_set() and not self.turn_cancel.is_set():
+                on_sentence(AGENT_CUT_SHORT_REPLY)
+            return None
+        if not answer and not cancel.is_set():
+            answer = self.ask_langgraph_agent(user_msg, interaction_type=interaction_type, textbook_context=textbook_context, cancel=cancel)
+            if answer:
+                for sentence in split_sentences(answer):
+                    on_sentence(sentence)
+        return answer
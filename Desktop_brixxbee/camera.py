@@ -0,0 +1,151 @@
+"""
+Camera capture for Brixbee.
+
+CameraStream owns the webcam. A capture thread reads frames into a back
+buffer and swaps it with the front buffer under a lock, so the latest frame is
+always ready: the preview, vision questions and Guardian mode copy it out
+without touching the device or waiting on the camera.
+
+The device is opened on first use and released once nobody has used it for
+CAMERA_LINGER seconds (and keep_alive() is false), so a follow-up "what is
+this?" does not pay the open/warm-up cost again. A missing camera is retried
+MAX_OPEN_FAILURES times, then the thread gives up until the next acquire().
+"""
+import os
+import time
+import threading
+
+import cv2
+
+# --- CONFIGURATION ---
+CAMERA_INDEX = int(os.getenv("BRIXBEE_CAMERA_INDEX") or 0)
+CAMERA_LINGER = float(os.getenv("BRIXBEE_CAMERA_LINGER") or 120)  # Seconds the camera stays open after last use
+WARMUP_FRAMES = 5  # Frames discarded after opening while auto-exposure settles
+MAX_OPEN_FAILURES = int(os.getenv("BRIXBEE_CAMERA_MAX_OPEN_FAILURES") or 5)  # Consecutive failed opens before giving up
+
+
+class CameraStream:
+    def __init__(self, index=CAMERA_INDEX, linger=CAMERA_LINGER, keep_alive=None):
+        self.index = index
+        self.linger = linger
+        self.keep_alive = keep_alive or (lambda: False)
+        self._front = None        # Latest complete frame (preallocated once the size is known)
+        self._back = None         # Frame being captured
+        self.frame_id = 0         # Increments with every new frame
+        self.frame_time = 0.0
+        self.last_used = 0.0
+        self.opened_at = None
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def acquire(self):
+        """Makes sure the capture thread is running and marks the camera as in use."""
+        self.last_used = time.time()
+        with self._lock:
+            # The thread only exits after clearing _thread under this lock, so a
+            # running thread sees the cleared flag and keeps going
+            self._stop.clear()
+            if self.running:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        print("DEBUG: Activating camera hardware...")
+        cap = cv2.VideoCapture(self.index)
+        self.opened_at = time.time()
+        discarded = 0
+        open_failures = 0
+        try:
+            while True:
+                with self._lock:
+                    idle = not self.keep_alive() and time.time() - self.last_used > self.linger
+                    if self._stop.is_set() or idle or open_failures >= MAX_OPEN_FAILURES:
+                        if open_failures >= MAX_OPEN_FAILURES:
+                            print(f"DEBUG: Camera {self.index} failed to open {open_failures} times; giving up.")
+                        self._thread = None  # acquire() from now on starts a fresh thread
+                        break
+                if not cap.isOpened():
+                    self.failures += 1
+                    open_failures += 1
+                    time.sleep(1.0)
+                    cap.release()
+                    cap = cv2.VideoCapture(self.index)  # Reconnect (e.g. USB camera replugged)
+                    continue
+                open_failures = 0
+                ok, frame = cap.read(self._back) if self._back is not None else cap.read()
+                if not ok or frame is None:
+                    self.failures += 1
+                    time.sleep(0.05)
+                    continue
+                if discarded < WARMUP_FRAMES:
+                    discarded += 1
+                    continue
+                # cap.read() filled the old front buffer in place once sizes match,
+                # so after the first two frames nothing is allocated per frame
+                with self._lock:
+                    self._front, self._back = frame, self._front
+                    self.frame_id += 1
+                    self.frame_time = time.time()
+                    self._new_frame.notify_all()
+        finally:
+            cap.release()
+            with self._lock:
+                if self._thread in (None, threading.current_thread()):  # Not if a new thread already took over
+                    self._front = self._back = None
+                self._new_frame.notify_all()
+            print("DEBUG: Released camera hardware.")
+
+    def latest(self):
+        """(copy of the latest frame, frame_id), or (None, 0) if there is none yet. Never waits."""
+        with self._lock:
+            if self._front is None:
+                return None, 0
+            return self._front.copy(), self.frame_id
+
+    def snapshot(self, timeout=3.0, newer_than=None):
+        """
+        A copy of a frame captured after this call (or after frame newer_than),
+        opening the camera if needed. None if no frame arrives within timeout.
+        """
+        self.acquire()
+        with self._lock:
+            wanted = self.frame_id if newer_than is None else newer_than
+            if not self._new_frame.wait_for(lambda: self.frame_id > wanted and self._front is not None, timeout):
+                return None
+            return self._front.copy()
+
+    def next_frame(self, newer_than=0, timeout=0.5):
+        """
+        (copy, frame_id) of the first frame after newer_than, or (None, newer_than)
+        on timeout. Unlike snapshot() it neither opens the camera nor keeps it open.
+        """
+        with self._lock:
+            if not self._new_frame.wait_for(lambda: self.frame_id > newer_than and self._front is not None, timeout):
+                return None, newer_than
+            return self._front.copy(), self.frame_id
+
+    def burst(self, count, timeout=3.0):
+        """Up to count consecutive new frames (copies), waiting at most timeout seconds in total."""
+        deadline = time.time() + timeout
+        frames, last_id = [], None
+        while len(frames) < count:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            frame = self.snapshot(timeout=remaining, newer_than=last_id)
+            if frame is None:
+                break
+            frames.append(frame)
+            last_id = self.frame_id
+        return frames
@@ -0,0 +1,216 @@
+"""
+Token-budgeted conversation memory shared by the native model and the agent.
+
+The native path used to keep the last 10 messages and the agent path its own
+last 8, so one long answer could double the prompt and older context vanished
+all at once. ConversationMemory keeps a single history with three parts:
+
+  - pinned facts   the student's name, language, current chapter and book;
+                   always sent, replaced rather than appended
+  - summary        a few lines about the turns that no longer fit
+  - recent turns   verbatim user/assistant pairs within the token budget
+
+When the recent turns go over budget the oldest pairs are evicted to a pending
+list and folded into the summary by compact(). The default summarizer is local
+and extractive (what the child asked, the first sentence of the answer); a
+model-written summary can be plugged in, and compaction can be handed to a
+thread so it never delays an answer. The summary has its own budget and drops
+its oldest lines, so the prompt size levels off however long the session runs.
+
+Token counts are estimates (about four characters per token for English, more
+for Tamil script), which is close enough for a budget.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# --- CONFIGURATION ---
+MEMORY_TOKEN_BUDGET = int(os.getenv("BRIXBEE_MEMORY_TOKENS") or 900)           # Recent turns, verbatim
+SUMMARY_TOKEN_BUDGET = int(os.getenv("BRIXBEE_MEMORY_SUMMARY_TOKENS") or 200)  # Running summary of older turns
+MIN_RECENT_MESSAGES = 2   # The last exchange is always kept verbatim, even over budget
+MESSAGE_OVERHEAD = 4      # Tokens a chat message costs beyond its text (role, separators)
+SUMMARY_QUESTION_WORDS = 14
+SUMMARY_ANSWER_WORDS = 22
+
+NAME_PATTERN = re.compile(r"\bmy name is ([A-Za-z\u0B80-\u0BFF]+)", re.IGNORECASE)
+CHAPTER_PATTERN = re.compile(r"\b(chapter|lesson|unit)\s+(\d+|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve)\b", re.IGNORECASE)
+
+
+def estimate_tokens(text):
+    """Rough token count: ~4 ASCII characters per token; other scripts split much finer."""
+    if not text:
+        return 0
+    non_ascii = sum(1 for c in text if ord(c) > 127)
+    return (len(text) - non_ascii) // 4 + non_ascii // 2 + 1
+
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+def _clip_words(text, limit):
+    words = text.split()
+    return " ".join(words[:limit]) + (" ..." if len(words) > limit else "")
+
+
+def extractive_summary(summary_lines, messages):
+    """Default summarizer: one line per evicted exchange. Returns the new summary lines."""
+    lines = list(summary_lines)
+    question = None
+    for m in messages:
+        if m["role"] == "user":
+            question = m["content"]
+            continue
+        first = re.split(r"(?<=[.!?])\s+", m["content"].strip(), maxsplit=1)[0]
+        answer = _clip_words(first, SUMMARY_ANSWER_WORDS)
+        if question:
+            lines.append(f"Asked: {_clip_words(question, SUMMARY_QUESTION_WORDS)} -> {answer}")
+        else:
+            lines.append(f"Brixbee said: {answer}")
+        question = None
+    if question:
+        lines.append(f"Asked: {_clip_words(question, SUMMARY_QUESTION_WORDS)}")
+    return lines
+
+
+class ConversationMemory:
+    """
+    summarize(summary_lines, messages) -> summary lines folds evicted messages into
+    the summary; run_later(fn) runs compaction elsewhere (e.g. executor.submit),
+    or compaction happens inline when it is None.
+    """
+
+    def __init__(self, budget=MEMORY_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET, summarize=None, run_later=None):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.summarize = summarize or extractive_summary
+        self.run_later = run_later
+        self.pins = OrderedDict()
+        self.turns = []
+        self.pending = []
+        self.summary = []
+        self.evicted = 0
+        self.compactions = 0
+        self._facts_sent = None
+        self._compacting = False
+        self._epoch = 0  # Bumped by clear(), so a compaction already running does not bring the old summary back
+        self._lock = threading.Lock()
+
+    # --- Facts ---
+
+    def pin(self, key, value):
+        """Sets a fact that is always sent (None removes it)."""
+        with self._lock:
+            if value is None:
+                self.pins.pop(key, None)
+            else:
+                self.pins[key] = str(value)
+
+    def observe(self, text):
+        """Pins facts the child states: their name, the chapter they are on."""
+        match = NAME_PATTERN.search(text or "")
+        if match:
+            self.pin("student name", match.group(1).capitalize())
+        match = CHAPTER_PATTERN.search(text or "")
+        if match:
+            self.pin("chapter", f"{match.group(1).lower()} {match.group(2)}")
+
+    def facts_text(self):
+        with self._lock:
+            return "; ".join(f"{k}: {v}" for k, v in self.pins.items())
+
+    def unsent_facts(self):
+        """The facts text if it changed since mark_facts_sent(), else None."""
+        facts = self.facts_text()
+        return facts if facts and facts != self._facts_sent else None
+
+    def mark_facts_sent(self, facts):
+        self._facts_sent = facts
+
+    # --- Turns ---
+
+    def add_exchange(self, question, answer):
+        """Records a finished exchange (question may be empty) and enforces the budget."""
+        with self._lock:
+            if question:
+                self.turns.append({"role": "user", "content": question})
+            self.turns.append({"role": "assistant", "content": answer})
+            total = sum(message_tokens(m) for m in self.turns)
+            while total > self.budget and len(self.turns) > MIN_RECENT_MESSAGES:
+                # Evict whole exchanges, so no answer is kept without its question
+                cut = 2 if self.turns[0]["role"] == "user" and len(self.turns) > MIN_RECENT_MESSAGES + 1 else 1
+                for m in self.turns[:cut]:
+                    total -= message_tokens(m)
+                    self.pending.append(m)
+                del self.turns[:cut]
+                self.evicted += cut
+            due = bool(self.pending) and not self._compacting
+            if due:
+                self._compacting = True
+        if due:
+            if self.run_later:
+                self.run_later(self.compact)
+            else:
+                self.compact()
+
+    def compact(self):
+        """Folds evicted messages into the summary and trims it to its budget."""
+        while True:
+            with self._lock:
+                batch = list(self.pending)
+                summary = list(self.summary)
+                epoch = self._epoch
+                if not batch:
+                    self._compacting = False
+                    return
+            try:
+                summary = self.summarize(summary, batch)
+            except Exception as e:
+                print(f"DEBUG: Memory summarizer failed ({e}); using the extractive summary.")
+                summary = extractive_summary(summary, batch)
+            while len(summary) > 1 and sum(estimate_tokens(line) for line in summary) > self.summary_budget:
+                summary.pop(0)
+            with self._lock:
+                if epoch != self._epoch:
+                    continue
+                self.summary = summary
+                del self.pending[:len(batch)]
+                self.compactions += 1
+
+    def clear(self):
+        """Forgets the conversation (goodbye); pinned facts stay."""
+        with self._lock:
+            self.turns = []
+            self.pending = []
+            self.summary = []
+            self._facts_sent = None
+            self._epoch += 1
+
+    # --- Prompts ---
+
+    def context_text(self):
+        """Pinned facts and summary as text for a system prompt ("" when there are none)."""
+        with self._lock:
+            parts = []
+            if self.pins:
+                parts.append("[KNOWN FACTS]: " + "; ".join(f"{k}: {v}" for k, v in self.pins.items()) + ".")
+            if self.summary:
+                parts.append("[EARLIER IN THIS SESSION]: " + " | ".join(self.summary))
+            return "\n".join(parts)
+
+    def messages(self):
+        """The recent turns, verbatim, as chat messages."""
+        with self._lock:
+            return list(self.turns)
+
+    def tokens(self):
+        with self._lock:
+            return (sum(message_tokens(m) for m in self.turns),
+                    sum(estimate_tokens(line) for line in self.summary),
+                    sum(estimate_tokens(f"{k}: {v}") for k, v in self.pins.items()))
+
+    def format_stats(self):
+        turns, summary, pins = self.tokens()
+        return (f"~{turns + summary + pins} tokens (turns {turns}/{self.budget}, summary {summary}/{self.summary_budget}, "
+                f"facts {pins}), {len(self.turns)} messages kept, {self.evicted} evicted, {self.compactions} compactions")
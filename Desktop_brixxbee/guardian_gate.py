@@ -0,0 +1,177 @@
+"""
+Local pre-filter for Guardian mode.
+
+Instead of sending a photo to the vision model every 15 seconds, guard_loop
+checks the latest camera frame about once a second with SceneGate, which works
+on a tiny blurred grayscale copy of the frame:
+
+  - pixel difference against the scene the vision model last saw
+    (how much of the picture changed, and by how much)
+  - grayscale histogram distance (lighting changes, lights off, camera covered)
+  - optionally OpenCV's built-in HOG person detector, so someone stepping
+    into view is escalated even when they cover little of the frame
+
+A frame is escalated to the vision model only when the scene changed
+meaningfully, or when a heartbeat is due so a slow change is still seen.
+Real events are reacted to within about a second; an unchanged room costs no
+API calls.
+
+Each escalation becomes the new reference scene, so a room with someone
+moving around keeps "changing". A token bucket therefore caps escalations at
+the old rate on average (one per 15 seconds) with a small burst: a large
+change (most of the picture, lights off, a person appearing) may follow the
+previous call after GUARD_MIN_INTERVAL while tokens last, ordinary motion
+waits the full GUARD_BUDGET_INTERVAL.
+"""
+import os
+import time
+
+import cv2
+import numpy as np
+
+# --- CONFIGURATION ---
+GUARD_SAMPLE_INTERVAL = float(os.getenv("BRIXBEE_GUARD_SAMPLE_INTERVAL") or 1.0)  # Seconds between local checks
+GUARD_HEARTBEAT = float(os.getenv("BRIXBEE_GUARD_HEARTBEAT") or 120)  # Escalate at least this often anyway
+GUARD_MIN_INTERVAL = float(os.getenv("BRIXBEE_GUARD_MIN_INTERVAL") or 5)  # Floor between calls, large changes only
+GUARD_BUDGET_INTERVAL = float(os.getenv("BRIXBEE_GUARD_BUDGET_INTERVAL") or 15)  # One vision call earned per this many seconds
+GUARD_BURST = int(os.getenv("BRIXBEE_GUARD_BURST") or 3)  # Calls that may be saved up for a busy moment
+GUARD_PERSON_DETECTOR = (os.getenv("BRIXBEE_GUARD_PERSON") or "0") == "1"
+BASELINE_INTERVAL = 15  # The old fixed scan period, used to count API calls saved
+
+SMALL_SIZE = (64, 48)
+PIXEL_DELTA = 25          # Gray levels a pixel must change by to count as changed
+CHANGED_FRACTION = 0.12   # Share of changed pixels that counts as a scene change
+HIST_DISTANCE = 0.25      # Bhattacharyya distance that counts as a lighting change
+LARGE_CHANGED_FRACTION = 0.4  # Changed share that counts as a large scene change
+LARGE_HIST_DISTANCE = 0.5     # Histogram distance that counts as a large lighting change (lights off, camera covered)
+
+
+def shrink(frame):
+    """Tiny blurred grayscale version of a BGR frame: cheap to compare, insensitive to sensor noise."""
+    small = cv2.resize(frame, SMALL_SIZE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    return cv2.GaussianBlur(gray, (3, 3), 0)
+
+
+def histogram(gray):
+    hist = cv2.calcHist([gray], [0], None, [32], [0, 256])
+    return cv2.normalize(hist, hist).flatten()
+
+
+class PersonDetector:
+    """OpenCV's HOG pedestrian detector; no model download needed."""
+
+    def __init__(self, width=320):
+        self.width = width
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def count(self, frame):
+        scale = self.width / frame.shape[1]
+        small = cv2.resize(frame, (self.width, int(frame.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+        rects, _ = self.hog.detectMultiScale(small, winStride=(8, 8), padding=(8, 8), scale=1.05)
+        return len(rects)
+
+
+class SceneGate:
+    """Decides which Guardian frames are worth a vision model call."""
+
+    def __init__(self, heartbeat=GUARD_HEARTBEAT, min_interval=GUARD_MIN_INTERVAL, budget_interval=GUARD_BUDGET_INTERVAL,
+                 burst=GUARD_BURST, person_detector=GUARD_PERSON_DETECTOR):
+        self.heartbeat = heartbeat
+        self.min_interval = min_interval
+        self.budget_interval = budget_interval
+        self.burst = burst
+        self.person_detector = None
+        if person_detector:
+            try:
+                self.person_detector = PersonDetector()
+            except Exception as e:
+                print(f"DEBUG: Person detector unavailable ({e}); using frame differencing only.")
+        self.reset()
+
+    def reset(self):
+        """Forgets the reference scene and starts new counters (Guardian switched on)."""
+        self.reference = None
+        self.reference_hist = None
+        self.reference_people = 0
+        self.last_escalation = 0.0
+        self.tokens = float(self.burst)
+        self.last_refill = None
+        self.first_check = None
+        self.last_check = None
+        self.evaluated = 0
+        self.escalated = 0
+        self.reasons = {}
+        self.last_scores = {}
+
+    def check(self, frame, now=None):
+        """Returns the reason to escalate this frame ("first", "change", "light", "person", "heartbeat") or None."""
+        now = time.time() if now is None else now
+        self.evaluated += 1
+        if self.first_check is None:
+            self.first_check = now
+        self.last_check = now
+        self._refill(now)
+        gray = shrink(frame)
+        hist = histogram(gray)
+
+        reason, large = None, False
+        if self.reference is None:
+            reason = "first"
+        else:
+            changed = float(np.mean(cv2.absdiff(gray, self.reference) > PIXEL_DELTA))
+            light = float(cv2.compareHist(self.reference_hist, hist, cv2.HISTCMP_BHATTACHARYYA))
+            self.last_scores = {"changed": round(changed, 3), "hist": round(light, 3)}
+            if changed >= CHANGED_FRACTION:
+                reason, large = "change", changed >= LARGE_CHANGED_FRACTION
+            elif light >= HIST_DISTANCE:
+                reason, large = "light", light >= LARGE_HIST_DISTANCE
+            elif now - self.last_escalation >= self.heartbeat:
+                reason = "heartbeat"
+
+        people = None
+        if self.person_detector is not None and (reason is None or reason == "heartbeat"):
+            # Only when the cheap checks are quiet: someone small entering the frame
+            people = self.person_detector.count(frame)
+            if people > self.reference_people:
+                reason, large = "person", True
+
+        if reason is None:
+            return None
+        if reason not in ("first", "heartbeat"):
+            # Changed again soon after a call; the next check will catch it if it persists
+            if self.tokens < 1 or now - self.last_escalation < (self.min_interval if large else self.budget_interval):
+                return None
+        if reason != "first":
+            self.tokens = max(0.0, self.tokens - 1)
+
+        self.reference, self.reference_hist = gray, hist
+        if people is not None:
+            self.reference_people = people
+        self.last_escalation = now
+        self.escalated += 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        return reason
+
+    def _refill(self, now):
+        if self.last_refill is not None and self.budget_interval > 0:
+            self.tokens = min(float(self.burst), self.tokens + (now - self.last_refill) / self.budget_interval)
+        self.last_refill = now
+
+    def stats(self):
+        elapsed = (self.last_check - self.first_check) if self.first_check is not None else 0.0
+        baseline = int(elapsed // BASELINE_INTERVAL) + 1 if self.evaluated else 0  # Calls the fixed 15 s scan would have made
+        return {
+            "evaluated": self.evaluated,
+            "escalated": self.escalated,
+            "reasons": dict(self.reasons),
+            "baseline_calls": baseline,
+            "calls_saved": max(0, baseline - self.escalated),
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        reasons = ", ".join(f"{k} {v}" for k, v in sorted(s["reasons"].items())) or "none"
+        return (f"{s['evaluated']} frames checked, {s['escalated']} sent to vision ({reasons}), "
+                f"{s['calls_saved']} of {s['baseline_calls']} calls saved")
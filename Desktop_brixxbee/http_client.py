@@ -0,0 +1,143 @@
+"""
+Shared HTTP layer for every desktop-to-backend call.
+
+One requests.Session keeps connections alive and pooled, urllib3 retries
+connection failures with exponential backoff, each named endpoint has its own
+(connect, read) timeout, and every call's latency is recorded so slow
+endpoints show up in stats().
+
+Endpoints in NO_RETRY_ENDPOINTS go through a second pooled session without
+retries: the agent is one route of a race, and while the backend is down the
+next route should start at once instead of after the backoff.
+"""
+import time
+import threading
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds per endpoint name
+DEFAULT_TIMEOUTS = {
+    "agent":        (3.05, 30),
+    "agent_stream": (3.05, 30),   # Read timeout is the longest gap between streamed events
+    "pdf_chat":     (3.05, 20),
+    "log":          (1, 2),
+    "log_bulk":     (1, 5),
+    "weather":      (2, 3),
+}
+FALLBACK_TIMEOUT = (3.05, 10)
+NO_RETRY_ENDPOINTS = frozenset({"agent", "agent_stream"})
+LATENCY_SAMPLES = 500  # Recent calls kept per endpoint for percentiles
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.last_status = None
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def summary(self):
+        samples = list(self.latencies)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "last_status": self.last_status,
+            "p50_ms": _ms(percentile(samples, 50)),
+            "p95_ms": _ms(percentile(samples, 95)),
+            "max_ms": _ms(max(samples) if samples else None),
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+class BackendClient:
+    """
+    Pooled, keep-alive HTTP client. Calls are made by endpoint name so timeouts
+    and metrics are tracked per endpoint:
+
+        client.post("agent", url, json=payload)
+    """
+
+    def __init__(self, retries=2, backoff=0.3, pool_size=8, timeouts=None, no_retry=NO_RETRY_ENDPOINTS):
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.no_retry = frozenset(no_retry)
+        self.session = requests.Session()
+        # Connection errors are retried for every method (the request never reached the server).
+        # Read errors are never retried so a slow answer is not generated twice; 5xx only for GET.
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            backoff_factor=backoff,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.direct = requests.Session()
+        direct = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.direct.mount("http://", direct)
+        self.direct.mount("https://", direct)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def request(self, name, method, url, timeout=None, **kwargs):
+        """
+        Sends a request and records its latency under name. For stream=True the
+        latency is time to response headers (the body is consumed by the caller).
+        """
+        started = time.perf_counter()
+        status = None
+        try:
+            session = self.direct if name in self.no_retry else self.session
+            resp = session.request(method, url, timeout=timeout or self.timeouts.get(name, FALLBACK_TIMEOUT), **kwargs)
+            status = resp.status_code
+            return resp
+        finally:
+            self._record(name, time.perf_counter() - started, status)
+
+    def post(self, name, url, **kwargs):
+        return self.request(name, "POST", url, **kwargs)
+
+    def get(self, name, url, **kwargs):
+        return self.request(name, "GET", url, **kwargs)
+
+    def _record(self, name, elapsed, status):
+        with self._lock:
+            stats = self._stats.setdefault(name, EndpointStats())
+            stats.calls += 1
+            stats.last_status = status
+            stats.latencies.append(elapsed)
+            if status is None or status >= 400:
+                stats.errors += 1
+
+    def stats(self):
+        """Per-endpoint call counts, error counts and latency percentiles."""
+        with self._lock:
+            return {name: s.summary() for name, s in self._stats.items()}
+
+    def format_stats(self):
+        lines = []
+        for name, s in sorted(self.stats().items()):
+            lines.append(f"{name}: {s['calls']} calls, {s['errors']} errors, p50 {s['p50_ms']} ms, p95 {s['p95_ms']} ms")
+        return "; ".join(lines) or "no backend calls yet"
+
+    def close(self):
+        self.session.close()
+        self.direct.close()
@@ -0,0 +1,159 @@
+"""
+Image preparation for vision requests.
+
+A camera frame is much bigger than the vision model needs for most tasks.
+Each task has a profile that caps the longest side and sets the JPEG quality:
+reading text keeps fine detail, while Guardian scans and object search send
+small frames. Frames can be cropped to a region first; cropping is a view, not
+a copy. The JPEG buffer is base64-encoded straight from the encoder's output.
+
+For reading, a burst of frames is scored locally with sharpness() (variance
+of the Laplacian) and only the sharpest goes to the vision model; find_page()
+crops it to the page when one stands out from the background.
+
+VisionStats records payload size, encode time and request time per profile.
+"""
+import os
+import time
+import base64
+import threading
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# max_side: longest side in pixels (None keeps the camera resolution); quality: JPEG 1-100
+PROFILES = {
+    "read":     {"max_side": 1600, "quality": 88},  # Text: small print needs the pixels
+    "describe": {"max_side": 1024, "quality": 80},
+    "search":   {"max_side": 640,  "quality": 72},
+    "guard":    {"max_side": 512,  "quality": 65},
+}
+DEFAULT_PROFILE = "describe"
+
+# Per-profile overrides, e.g. BRIXBEE_IMAGE_READ_MAX_SIDE=2048, BRIXBEE_IMAGE_GUARD_QUALITY=55
+for _name, _profile in PROFILES.items():
+    _side = os.getenv(f"BRIXBEE_IMAGE_{_name.upper()}_MAX_SIDE")
+    _quality = os.getenv(f"BRIXBEE_IMAGE_{_name.upper()}_QUALITY")
+    if _side:
+        _profile["max_side"] = int(_side) or None
+    if _quality:
+        _profile["quality"] = int(_quality)
+
+SHARPNESS_WIDTH = 640     # Frames are scored at this width so the score does not depend on the camera
+PAGE_MIN_AREA = 0.2       # A page outline must cover at least this share of the frame
+PAGE_MARGIN = 0.02        # Padding around the detected page, as a share of the frame
+
+PreparedImage = namedtuple("PreparedImage", "data_url profile width height jpeg_bytes encode_seconds")
+
+
+def crop_region(frame, region):
+    """
+    View of frame inside region: (x, y, w, h) in pixels, or in fractions of the
+    frame when all values are <= 1.
+    """
+    if region is None:
+        return frame
+    height, width = frame.shape[:2]
+    x, y, w, h = region
+    if all(0 <= v <= 1 for v in region):
+        x, y, w, h = x * width, y * height, w * width, h * height
+    x0, y0 = max(0, int(x)), max(0, int(y))
+    x1, y1 = min(width, int(x + w)), min(height, int(y + h))
+    if x1 - x0 < 8 or y1 - y0 < 8:
+        return frame  # Degenerate region: send the whole frame rather than nothing
+    return frame[y0:y1, x0:x1]
+
+
+def _gray(frame, width):
+    if frame.shape[1] > width:
+        frame = cv2.resize(frame, (width, int(frame.shape[0] * width / frame.shape[1])), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+
+
+def sharpness(frame):
+    """Variance of the Laplacian: high for crisp edges, low for motion blur or bad focus."""
+    return float(cv2.Laplacian(_gray(frame, SHARPNESS_WIDTH), cv2.CV_32F).var())
+
+
+def sharpest(frames):
+    """(best frame, its score, all scores) for a burst of frames."""
+    scores = [sharpness(f) for f in frames]
+    best = int(np.argmax(scores))
+    return frames[best], scores[best], scores
+
+
+def find_page(frame):
+    """
+    Fractional (x, y, w, h) of the largest four-cornered outline in the frame
+    (a page, book or worksheet), or None if there is no clear one.
+    """
+    gray = cv2.GaussianBlur(_gray(frame, SHARPNESS_WIDTH), (5, 5), 0)
+    height, width = gray.shape
+    edges = cv2.dilate(cv2.Canny(gray, 50, 150), None)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    best = None
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < PAGE_MIN_AREA * width * height or (best is not None and area <= best[0]):
+            continue
+        outline = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(outline) == 4:
+            best = (area, cv2.boundingRect(outline))
+    if best is None:
+        return None
+    x, y, w, h = best[1]
+    if w * h > 0.95 * width * height:
+        return None  # Outline is the frame itself: nothing to crop
+    return (max(0.0, x / width - PAGE_MARGIN), max(0.0, y / height - PAGE_MARGIN),
+            min(1.0, w / width + 2 * PAGE_MARGIN), min(1.0, h / height + 2 * PAGE_MARGIN))
+
+
+def prepare_image(frame, profile=DEFAULT_PROFILE, region=None):
+    """Crops, downscales and JPEG-encodes a BGR frame. Returns a PreparedImage."""
+    settings = PROFILES.get(profile) or PROFILES[DEFAULT_PROFILE]
+    started = time.perf_counter()
+    image = crop_region(frame, region)
+    height, width = image.shape[:2]
+    max_side = settings["max_side"]
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        width, height = max(1, int(width * scale)), max(1, int(height * scale))
+        image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, settings["quality"]])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    encoded = base64.b64encode(buffer.data).decode('ascii')  # buffer.data: no intermediate bytes copy
+    return PreparedImage(
+        data_url="data:image/jpeg;base64," + encoded,
+        profile=profile,
+        width=width,
+        height=height,
+        jpeg_bytes=buffer.size,
+        encode_seconds=time.perf_counter() - started,
+    )
+
+
+class VisionStats:
+    """Payload size, encode time and request time per profile."""
+
+    def __init__(self):
+        self.profiles = {}
+        self._lock = threading.Lock()
+
+    def record(self, image, request_seconds):
+        with self._lock:
+            s = self.profiles.setdefault(image.profile, {"requests": 0, "bytes": 0, "encode_s": 0.0, "request_s": 0.0})
+            s["requests"] += 1
+            s["bytes"] += image.jpeg_bytes
+            s["encode_s"] += image.encode_seconds
+            s["request_s"] += request_seconds
+
+    def format_stats(self):
+        with self._lock:
+            parts = []
+            for name, s in sorted(self.profiles.items()):
+                n = s["requests"]
+                parts.append(f"{name}: {n} requests, avg {s['bytes'] / n / 1024:.0f} KB, "
+                             f"encode {s['encode_s'] / n * 1000:.0f} ms, request {s['request_s'] / n:.2f} s")
+        return "; ".join(parts) or "no vision requests yet"
@@ -0,0 +1,264 @@
+"""
+Background shipper for Brixbee interaction logs (the teacher dashboard data).
+
+log() only puts a record on a bounded in-memory queue, so answering is never
+held up by logging. One worker thread sends records in batches to
+/api/ai/log/bulk, either when a batch is full or when the oldest queued record
+has waited flush_interval seconds.
+
+Batches that cannot be delivered are appended to a JSONL spool file and resent
+once the backend answers again, including after an app restart. Every record
+carries a client-generated id, so a batch that is resent after a timeout is
+not stored twice.
+"""
+import os
+import json
+import time
+import uuid
+import queue
+import atexit
+import datetime
+import threading
+
+BATCH_SIZE = 20
+FLUSH_INTERVAL = 2.0       # Seconds the oldest queued record may wait before a send
+MAX_QUEUE = 1000           # Records held in memory; beyond this new records are dropped
+MAX_SPOOL_RECORDS = 5000   # Oldest spooled records are dropped past this
+RETRY_MIN = 2.0            # Seconds before retrying a down backend, doubled up to RETRY_MAX
+RETRY_MAX = 60.0
+
+
+def _spool_key(record):
+    return json.dumps(record, sort_keys=True, ensure_ascii=False)
+
+
+class LogShipper:
+    """
+    Batches interaction logs and ships them from a single background thread.
+
+        shipper = LogShipper(http, LOG_BULK_API_URL, spool_path, legacy_url=LOG_API_URL)
+        shipper.log(question, answer, "teacher")
+    """
+
+    def __init__(self, http, bulk_url, spool_path, legacy_url=None,
+                 batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_queue=MAX_QUEUE):
+        self.http = http
+        self.bulk_url = bulk_url
+        self.legacy_url = legacy_url  # Single-record endpoint for backends without /log/bulk
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.bulk_supported = True
+        self.counts = {"sent": 0, "dropped": 0, "failed_sends": 0}
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._spool_lock = threading.Lock()
+        self._retry_at = 0.0
+        self._retry_delay = RETRY_MIN
+        self._stopping = threading.Event()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+        pending = self._spool_count()
+        if pending:
+            print(f"DEBUG: {pending} interaction logs waiting in spool, will resend.")
+
+    def log(self, query, response, interaction_type="assistant"):
+        """Queues one interaction. Never blocks; drops the record if the queue is full."""
+        record = {
+            "id": uuid.uuid4().hex,
+            "query": query,
+            "response": response,
+            "type": interaction_type,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self._count("dropped")
+
+    def stats(self):
+        """Queued (in memory), spooled (on disk), sent and dropped record counts."""
+        with self._lock:
+            stats = dict(self.counts)
+        stats["queued"] = self.queue.qsize()
+        stats["spooled"] = self._spool_count()
+        stats["last_error"] = self.last_error
+        return stats
+
+    def format_stats(self):
+        s = self.stats()
+        return f"{s['queued']} queued, {s['spooled']} spooled, {s['sent']} sent, {s['dropped']} dropped"
+
+    def close(self, timeout=3.0):
+        """Sends (or spools) everything still queued. Called automatically at exit."""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._worker.join(timeout)
+
+    # --- Worker ---
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.counts[key] += n
+
+    def _next_batch(self):
+        """Waits for the first record, then collects until the batch is full or flush_interval passes."""
+        try:
+            batch = [self.queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size and not self._stopping.is_set():
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=min(remaining, 0.5)))
+            except queue.Empty:
+                pass
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if batch:
+                undelivered = batch if time.time() < self._retry_at else self._send(batch)
+                if undelivered:
+                    self._spool(undelivered)
+            if time.time() >= self._retry_at:
+                self._drain_spool()
+        # Shutting down: one last attempt, anything undelivered goes to the spool
+        rest = []
+        while True:
+            try:
+                rest.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        for i in range(0, len(rest), self.batch_size):
+            chunk = rest[i:i + self.batch_size]
+            undelivered = chunk if time.time() < self._retry_at else self._send(chunk)
+            if undelivered:
+                self._spool(undelivered)
+
+    def _send(self, records):
+        """
+        Ships records. Returns the ones the backend has not accepted ([] when all
+        were). One by one (legacy endpoint) the records sent before a failure are
+        stored already, so only the rest is returned.
+        """
+        delivered = 0
+        try:
+            if self.bulk_supported:
+                resp = self.http.post("log_bulk", self.bulk_url, json={"records": records})
+                if resp.status_code == 404 and self.legacy_url:
+                    print("DEBUG: Backend has no bulk log endpoint; sending logs one by one.")
+                    self.bulk_supported = False
+                else:
+                    resp.raise_for_status()
+            if not self.bulk_supported:
+                for record in records:
+                    self.http.post("log", self.legacy_url, json={
+                        "query": record["query"], "response": record["response"], "type": record["type"]
+                    }).raise_for_status()
+                    delivered += 1
+            else:
+                delivered = len(records)
+        except Exception as e:
+            self.last_error = str(e)
+            self._count("failed_sends")
+            self._count("sent", delivered)
+            self._retry_at = time.time() + self._retry_delay
+            self._retry_delay = min(self._retry_delay * 2, RETRY_MAX)
+            return records[delivered:]
+        self._count("sent", len(records))
+        self._retry_delay = RETRY_MIN
+        return []
+
+    # --- Spool ---
+
+    def _spool(self, records):
+        with self._spool_lock:
+            try:
+                with open(self.spool_path, 'a', encoding='utf-8') as f:
+                    for record in records:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                print(f"DEBUG: Could not spool interaction logs: {e}")
+                self._count("dropped", len(records))
+                return
+            self._trim_spool()
+
+    def _read_spool(self):
+        if not os.path.exists(self.spool_path):
+            return []
+        records = []
+        with open(self.spool_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # Torn last line from a crash mid-write
+        return records
+
+    def _write_spool(self, records):
+        if not records:
+            if os.path.exists(self.spool_path):
+                os.remove(self.spool_path)
+            return
+        tmp_path = self.spool_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.spool_path)
+
+    def _trim_spool(self):
+        records = self._read_spool()
+        excess = len(records) - MAX_SPOOL_RECORDS
+        if excess > 0:
+            self._write_spool(records[excess:])
+            self._count("dropped", excess)
+
+    def _spool_count(self):
+        with self._spool_lock:
+            try:
+                with open(self.spool_path, 'rb') as f:
+                    return sum(1 for _ in f)
+            except OSError:
+                return 0
+
+    def _drain_spool(self):
+        """
+        Resends spooled records oldest first; stops at the first failure. The lock is
+        only held to read and rewrite the file, never during a send, so stats() on the
+        event loop does not wait for a slow backend.
+        """
+        with self._spool_lock:
+            try:
+                records = self._read_spool()
+            except OSError:
+                return
+        if not records:
+            return
+        delivered = set()
+        for i in range(0, len(records), self.batch_size):
+            chunk = records[i:i + self.batch_size]
+            undelivered = self._send(chunk)
+            delivered.update(_spool_key(r) for r in chunk[:len(chunk) - len(undelivered)])
+            if undelivered:
+                break
+        if not delivered:
+            return
+        with self._spool_lock:
+            # Re-read: records may have been spooled (or trimmed) while sending
+            try:
+                current = self._read_spool()
+                self._write_spool([r for r in current if _spool_key(r) not in delivered])
+            except OSError as e:
+                print(f"DEBUG: Could not rewrite the interaction log spool: {e}")
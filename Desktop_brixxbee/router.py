@@ -0,0 +1,227 @@
+"""
+Speculative answer routing with latency budgets.
+
+A question used to go to the LangGraph agent first and only reach the native
+model once the agent had failed, so a slow or unreachable backend kept the
+child waiting for up to 30 seconds. SpeculativeRouter.race() starts the first
+route at once and each later route as soon as its deadline passes without a
+first sentence (or immediately once every running route has failed). The first
+route to produce a sentence is spoken; the others are told to stop through
+their cancel event and whatever they produce is dropped.
+
+RouteStats keeps latency histograms per route (time to first sentence and to
+the full answer, measured from the route's start) and for the turn as a whole
+(time until the child heard something), plus win/loss counts. They are saved
+to a JSON file so deadlines can be tuned from real sessions.
+"""
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import namedtuple
+
+# --- CONFIGURATION ---
+BUCKETS = (0.25, 0.5, 1, 1.5, 2, 3, 4, 6, 8, 12, 20, 30)  # Upper bounds in seconds; one more bucket for anything slower
+TURN_BUDGET = float(os.getenv("BRIXBEE_TURN_BUDGET") or 25)  # Give up on a turn with nothing to say after this long
+LOSER_GRACE = 2.0  # Seconds to let cancelled routes wind down before the turn moves on
+
+# name; start_after: seconds after the race starts; run(on_sentence, cancel) -> answer or None
+Route = namedtuple("Route", "name start_after run")
+
+
+class LatencyHistogram:
+    def __init__(self, counts=None):
+        self.counts = list(counts) if counts else [0] * (len(BUCKETS) + 1)
+
+    def add(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (inf past the last bucket), or None if empty."""
+        if not self.total:
+            return None
+        rank = q / 100.0 * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+    def format(self):
+        if not self.total:
+            return "no data"
+        return "/".join(f"{self.percentile(q):g}" for q in (50, 90, 99)) + f"s p50/p90/p99 (n={self.total})"
+
+
+class RouteStats:
+    """Latency histograms and outcome counts (won, lost, failed, not_started) per route, persisted across sessions."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.histograms = {}  # "agent.first", "agent.total", "turn.first", ...
+        self.outcomes = {}    # route -> {outcome: count}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("buckets") != list(BUCKETS):
+                print("DEBUG: Route stats were recorded with other buckets; starting fresh.")
+                return
+            self.histograms = {k: LatencyHistogram(v) for k, v in data.get("histograms", {}).items()}
+            self.outcomes = data.get("outcomes", {})
+        except Exception as e:
+            print(f"DEBUG: Could not load route stats: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "buckets": list(BUCKETS),
+                "histograms": {k: h.counts for k, h in self.histograms.items()},
+                "outcomes": self.outcomes,
+            }
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"DEBUG: Could not save route stats: {e}")
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.histograms.setdefault(name, LatencyHistogram()).add(seconds)
+
+    def count(self, route, outcome):
+        with self._lock:
+            counts = self.outcomes.setdefault(route, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def format_stats(self):
+        with self._lock:
+            parts = [f"{name} {h.format()}" for name, h in sorted(self.histograms.items())]
+            for route, counts in sorted(self.outcomes.items()):
+                parts.append(f"{route} " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+        return "; ".join(parts) or "no routed turns yet"
+
+
+class SpeculativeRouter:
+    def __init__(self, stats=None, budget=TURN_BUDGET):
+        self.stats = stats or RouteStats()
+        self.budget = budget
+
+    async def race(self, routes, run_blocking, speak):
+        """
+        Runs routes (in order of preference) under the deadline policy and speaks
+        the winner's sentences with speak(). Returns (route name, answer), or
+        (None, None) if no route said anything within the budget.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        lock = threading.Lock()
+        winner = []
+        won = asyncio.Event()
+        cancels = {r.name: threading.Event() for r in routes}
+        route_started = {}
+        tasks = {}
+        failed = set()
+        waiting = list(routes)
+
+        def on_sentence_for(name):
+            def on_sentence(text):
+                with lock:
+                    if not winner:
+                        winner.append(name)
+                        now = time.perf_counter()
+                        self.stats.record(f"{name}.first", now - route_started[name])
+                        self.stats.record("turn.first", now - started)
+                        for other, cancel in cancels.items():
+                            if other != name:
+                                cancel.set()
+                        loop.call_soon_threadsafe(won.set)
+                    if winner[0] != name:
+                        return  # Lost the race: never heard
+                speak(text)
+            return on_sentence
+
+        def attempt(route):
+            try:
+                answer = route.run(on_sentence_for(route.name), cancels[route.name])
+            except Exception as e:
+                print(f"DEBUG: Route '{route.name}' failed: {e}")
+                answer = None
+            if not answer and not cancels[route.name].is_set():
+                failed.add(route.name)
+            return answer
+
+        def start(route):
+            route_started[route.name] = time.perf_counter()
+            print(f"DEBUG: Route '{route.name}' started at {route_started[route.name] - started:.2f}s")
+            tasks[route.name] = asyncio.ensure_future(run_blocking(attempt, route))
+
+        start(waiting.pop(0))
+        try:
+            while not won.is_set():
+                running = [t for t in tasks.values() if not t.done()]
+                now = time.perf_counter()
+                if not running:
+                    if not waiting:
+                        break  # Every route failed
+                    start(waiting.pop(0))  # Don't wait for the deadline when nothing is running
+                    continue
+                next_start = started + waiting[0].start_after if waiting else None
+                if next_start is not None and now >= next_start:
+                    start(waiting.pop(0))
+                    continue
+                wake_at = min(next_start, started + self.budget) if next_start else started + self.budget
+                if now >= wake_at:
+                    break  # Over budget
+                won_wait = asyncio.ensure_future(won.wait())
+                await asyncio.wait(running + [won_wait], timeout=wake_at - now, return_when=asyncio.FIRST_COMPLETED)
+                won_wait.cancel()
+
+            name = winner[0] if winner else None
+            answer = None
+            if name:
+                answer = await tasks[name]
+                self.stats.record(f"{name}.total", time.perf_counter() - route_started[name])
+            for cancel in cancels.values():
+                if name is None:
+                    cancel.set()  # Out of budget: stop everything
+            for route in routes:
+                if route.name == name:
+                    self.stats.count(route.name, "won")
+                elif route.name not in tasks:
+                    self.stats.count(route.name, "not_started")
+                elif route.name in failed or name is None:
+                    self.stats.count(route.name, "failed")
+                else:
+                    self.stats.count(route.name, "lost")
+            losers = [t for n, t in tasks.items() if n != name and not t.done()]
+            if losers:
+                await asyncio.wait(losers, timeout=LOSER_GRACE)
+            print(f"DEBUG: Routing: {name or 'no route'} answered after {time.perf_counter() - started:.2f}s")
+            return name, answer
+        except asyncio.CancelledError:
+            # The turn was cancelled (barge-in): stop every route, not only the one being awaited
+            for cancel in cancels.values():
+                cancel.set()
+            for task in tasks.values():
+                task.cancel()
+            raise
@@ -7,6 +7,9 @@ brew install portaudio
 echo "--- Installing Python Dependencies ---"
 pip3 install -r requirements.txt
 
+echo "--- Downloading the offline speech model (one time; Brixbee never downloads it at startup) ---"
+python3 asr.py --download
+
 echo "--- Brixbee is ready! ---"
 echo "To run Brixbee, use: python3 main.py"
 echo "Brixbee is now powered by DeepSeek v3.1 via OpenRouter!"
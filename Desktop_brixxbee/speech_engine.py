@@ -0,0 +1,350 @@
+"""
+Streaming speech for Brixbee.
+
+SentenceSegmenter turns a stream of LLM text chunks into whole sentences as soon
+as each one is complete (English and Tamil punctuation, abbreviation-aware).
+
+SpeechEngine runs two threads: a synthesis thread renders queued sentences to
+audio files and a playback thread plays them back-to-back. While sentence N is
+playing, sentence N+1 is already being rendered, so there is no silent gap
+between sentences.
+
+The queue is bounded: once MAX_PENDING sentences are waiting, say() blocks
+until one has been spoken, so a fast producer (a streaming answer) is held
+back instead of queueing minutes of speech.
+
+stop() cuts speech off mid-sentence (barge-in): the playing sentence is
+killed, and everything queued or being rendered is dropped.
+
+Sentences can carry a tag (the turn's trace ID); on_trace(tag, stage, seconds)
+is called with how long each one took to render ("tts.synth") and to play
+("tts.play").
+"""
+import os
+import re
+import sys
+import time
+import queue
+import shutil
+import tempfile
+import threading
+import subprocess
+import itertools
+
+# --- CONFIGURATION ---
+ENGLISH_VOICE = os.getenv("BRIXBEE_ENGLISH_VOICE") or "Samantha"
+TAMIL_VOICE = os.getenv("BRIXBEE_TAMIL_VOICE") or "Lekha"  # Standard high-quality Tamil voice on macOS
+LOOKAHEAD = 2  # Sentences rendered ahead of the one playing
+MAX_PENDING = int(os.getenv("BRIXBEE_SPEECH_MAX_PENDING") or 12)  # say() waits while this many sentences are queued
+
+# Sentence enders: Latin and full-width marks, ellipsis, and the danda some models emit in Tamil text.
+# Latin marks only end a sentence when followed by whitespace, so "3.14" and "e.g.x" are safe.
+_SPACED_END = re.compile(r"[.!?…]+[\"'”’)\]]*(?=\s)")
+_HARD_END = re.compile(r"[。！？।॥]+[\"'”’)\]]*|\n+")
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "st", "sr", "jr", "vs", "etc", "eg", "ie", "fig",
+    "approx", "dept", "govt", "ltd", "sq", "km", "cm", "mm", "kg", "std",
+}
+_WORD_BEFORE = re.compile(r"([^\W\d_]+)\.?$")
+
+
+def _is_abbreviation(text):
+    """True when text (ending just before a '.') ends in an abbreviation or a single initial."""
+    words = text.split()
+    if not words:
+        return False
+    last = words[-1].replace(".", "").lower()
+    if last in ABBREVIATIONS:
+        return True
+    match = _WORD_BEFORE.search(words[-1])
+    return bool(match) and len(match.group(1)) == 1 and match.group(1).isupper()
+
+
+class SentenceSegmenter:
+    """Incrementally splits streamed text into sentences."""
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, chunk):
+        """Adds a chunk and returns the sentences it completed (possibly none)."""
+        self.buffer += chunk
+        sentences = []
+        while True:
+            end = self._find_end()
+            if end is None:
+                break
+            sentence = self.buffer[:end].strip()
+            self.buffer = self.buffer[end:].lstrip()
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def flush(self):
+        """Returns whatever is left once the stream ends."""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return rest or None
+
+    def _find_end(self):
+        candidates = []
+        for match in _SPACED_END.finditer(self.buffer):
+            if match.group().startswith(".") and len(match.group()) == 1 and _is_abbreviation(self.buffer[:match.start()]):
+                continue
+            candidates.append(match.end())
+            break
+        hard = _HARD_END.search(self.buffer)
+        if hard:
+            candidates.append(hard.end())
+        return min(candidates) if candidates else None
+
+
+def split_sentences(text):
+    """Splits a complete text into sentences."""
+    segmenter = SentenceSegmenter()
+    sentences = segmenter.feed(text)
+    rest = segmenter.flush()
+    if rest:
+        sentences.append(rest)
+    return sentences
+
+
+def clean_for_speech(text):
+    """Removes markdown and characters the voices read out literally."""
+    for ch in ("*", "_", "#", "`", '"'):
+        text = text.replace(ch, "")
+    return text.replace("\n", " ").strip()
+
+
+class SaySynthesizer:
+    """macOS 'say' rendered to an AIFF file, played with 'afplay'."""
+
+    extension = ".aiff"
+
+    @staticmethod
+    def available():
+        return sys.platform == "darwin" and shutil.which("say") is not None
+
+    def render(self, text, voice, path):
+        result = subprocess.run(["say", "-v", voice, "-o", path, text], capture_output=True)
+        if result.returncode != 0:
+            # Voice not installed: fall back to the system default voice
+            subprocess.run(["say", "-o", path, text], check=True, capture_output=True)
+
+    def play_command(self, path):
+        return ["afplay", path]
+
+
+class Pyttsx3Synthesizer:
+    """Cross-platform fallback using pyttsx3 to render WAV files."""
+
+    extension = ".wav"
+
+    def __init__(self):
+        import pyttsx3
+        self.engine = pyttsx3.init()
+        self.voices = {v.name: v.id for v in self.engine.getProperty("voices")}
+
+    @staticmethod
+    def available():
+        try:
+            import pyttsx3  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def render(self, text, voice, path):
+        if voice in self.voices:
+            self.engine.setProperty("voice", self.voices[voice])
+        self.engine.save_to_file(text, path)
+        self.engine.runAndWait()
+
+    def play_command(self, path):
+        if sys.platform == "darwin":
+            return ["afplay", path]
+        if sys.platform.startswith("linux"):
+            return ["aplay", "-q", path]
+        return None  # Windows: played with winsound
+
+
+def default_synthesizer():
+    if SaySynthesizer.available():
+        return SaySynthesizer()
+    if Pyttsx3Synthesizer.available():
+        return Pyttsx3Synthesizer()
+    return None
+
+
+class SpeechEngine:
+    """
+    Pipelined text-to-speech.
+    say() segments text into sentences; a synthesis thread renders them while a
+    playback thread plays the previous one. Callbacks report when speech starts
+    and when everything queued has been spoken.
+    """
+
+    def __init__(self, voice_for=None, on_speaking=None, on_idle=None, synthesizer=None, max_pending=MAX_PENDING,
+                 on_trace=None):
+        self.voice_for = voice_for or (lambda: ENGLISH_VOICE)
+        self.on_speaking = on_speaking
+        self.on_idle = on_idle
+        self.on_trace = on_trace
+        self.synth = synthesizer or default_synthesizer()
+        self.text_queue = queue.Queue()
+        self.audio_queue = queue.Queue(maxsize=LOOKAHEAD)
+        self.workdir = tempfile.mkdtemp(prefix="brixbee_tts_")
+        self._counter = itertools.count()
+        self._pending = 0  # Sentences queued but not yet finished playing
+        self._pending_lock = threading.Lock()
+        self._room = threading.Condition(self._pending_lock)
+        self.max_pending = max_pending
+        self.speaking = False
+        self._generation = 0   # Bumped by stop(); sentences from an older generation are dropped
+        self._player = None    # Playback process of the sentence playing now
+        self._player_lock = threading.Lock()
+        if self.synth is None:
+            print("DEBUG: No speech synthesizer available; speech will only be logged.")
+        threading.Thread(target=self._synth_worker, daemon=True).start()
+        threading.Thread(target=self._play_worker, daemon=True).start()
+        print(f"DEBUG: Speech engine ready ({type(self.synth).__name__ if self.synth else 'none'}).")
+
+    def say(self, text, tag=None):
+        """
+        Queues text for speech, one sentence at a time. Blocks while the queue is
+        full; if stop() is called meanwhile, the rest of the text is dropped.
+        """
+        with self._room:
+            generation = self._generation  # Before waiting: a stop() during the wait must drop this text
+        for sentence in split_sentences(text or ""):
+            sentence = clean_for_speech(sentence)
+            if not sentence:
+                continue
+            with self._room:
+                self._room.wait_for(lambda: self._pending < self.max_pending or self._generation != generation)
+                if self._generation != generation:
+                    return
+                self._pending += 1
+            self.text_queue.put((generation, sentence, tag))
+
+    def stop(self):
+        """Stops speaking now and drops everything queued. Safe from any thread."""
+        with self._room:
+            self._generation += 1
+            self._room.notify_all()  # say() calls waiting for room give up
+        dropped = 0
+        for q in (self.text_queue, self.audio_queue):
+            while True:
+                try:
+                    item = q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    continue
+                path = item[2] if len(item) == 4 else None
+                if path and os.path.exists(path):
+                    os.remove(path)
+                dropped += 1
+                self._finish_one()
+        with self._player_lock:
+            if self._player is not None and self._player.poll() is None:
+                self._player.terminate()  # The play worker finishes the sentence as usual
+        print(f"DEBUG: Speech stopped ({dropped} queued sentence(s) dropped).")
+
+    def is_busy(self):
+        with self._pending_lock:
+            return self._pending > 0
+
+    def _finish_one(self):
+        with self._pending_lock:
+            self._pending -= 1
+            idle = self._pending == 0
+            self._room.notify_all()
+        if idle:
+            self.speaking = False
+            if self.on_idle:
+                self.on_idle()
+
+    def _trace(self, tag, stage, seconds):
+        if self.on_trace:
+            try:
+                self.on_trace(tag, stage, seconds)
+            except Exception as e:
+                print(f"DEBUG: Speech trace failed: {e}")
+
+    def _current(self, generation):
+        with self._pending_lock:
+            return generation == self._generation
+
+    def _synth_worker(self):
+        while True:
+            item = self.text_queue.get()
+            if item is None:
+                break
+            generation, sentence, tag = item
+            path = None
+            if self.synth:
+                path = os.path.join(self.workdir, f"utt_{next(self._counter)}{self.synth.extension}")
+                started = time.perf_counter()
+                try:
+                    self.synth.render(sentence, self.voice_for(), path)
+                except Exception as e:
+                    print(f"DEBUG: Speech synthesis failed: {e}")
+                    path = None
+                self._trace(tag, "tts.synth", time.perf_counter() - started)
+            if not self._current(generation):
+                # stop() was called while this sentence was rendering
+                if path and os.path.exists(path):
+                    os.remove(path)
+                self._finish_one()
+                continue
+            # Blocks while LOOKAHEAD sentences are already waiting to play
+            self.audio_queue.put((generation, sentence, path, tag))
+
+    def _play_worker(self):
+        while True:
+            generation, sentence, path, tag = self.audio_queue.get()
+            if not self._current(generation):
+                if path and os.path.exists(path):
+                    os.remove(path)
+                self._finish_one()
+                continue
+            if not self.speaking:
+                self.speaking = True
+                if self.on_speaking:
+                    self.on_speaking()
+            started = time.perf_counter()
+            try:
+                if path and os.path.exists(path):
+                    self._play(path, generation)
+                else:
+                    print(f"DEBUG: (not spoken) {sentence}")
+                self._trace(tag, "tts.play", time.perf_counter() - started)
+            except Exception as e:
+                print(f"DEBUG: Speech playback failed: {e}")
+            finally:
+                if path and os.path.exists(path):
+                    os.remove(path)
+                self._finish_one()
+
+    def _play(self, path, generation):
+        command = self.synth.play_command(path)
+        if command:
+            with self._player_lock:
+                if not self._current(generation):
+                    return  # stop() came just before playback started
+                self._player = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self._player.wait()
+            with self._player_lock:
+                self._player = None
+        else:  # Not interruptible by stop(); only the rest of the queue is dropped
+            import winsound
+            winsound.PlaySound(path, winsound.SND_FILENAME)
+
+    def wait_until_idle(self, timeout=None):
+        """Blocks until everything queued has been spoken (or timeout seconds pass)."""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.is_busy():
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
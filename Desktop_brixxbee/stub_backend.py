@@ -0,0 +1,254 @@
+"""
+Local stand-in for the EduVoice backend, for trying the desktop client without
+Node, MongoDB or API keys.
+
+Serves the /api/ai/* endpoints Brixbee uses. /api/ai/brixbee-chat answers both
+plain JSON and { "stream": true } requests (Server-Sent Events, one token per
+word with a configurable delay), so streaming and fallback paths can be tested.
+
+It also stands in for OpenRouter: /api/v1/chat/completions speaks the OpenAI
+chat format, streamed or not, for the brain and vision models (point
+OPENROUTER_BASE_URL at http://127.0.0.1:<port>/api/v1). Requests with an image
+get the vision answer. The usage it reports counts the prompt prefix shared
+with the previous request as cached, like a provider prefix cache.
+
+Failure injection, for the agent and the model endpoints alike:
+  --fail-rate   share of requests answered with HTTP 500
+  --drop-rate   share of streams cut off after the first few tokens
+  --jitter      random extra delay before the first token, up to this many seconds
+
+Usage:
+    python stub_backend.py [--port 5001] [--token-delay 0.05] [--first-token-delay 0.5]
+                           [--brain-first-token-delay 0.3] [--fail-rate 0.1] [--drop-rate 0.05] [--jitter 0.5]
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_ANSWER = ("Photosynthesis is how green plants make their own food. "
+                  "They use sunlight, water and air to do it. Isn't that amazing, friend?")
+DEFAULT_BRAIN_ANSWER = "That is a great question! Let us find out together, step by step."
+DEFAULT_VISION_ANSWER = "A page of a science textbook with a diagram of a green leaf and two paragraphs of text."
+DROP_AFTER_TOKENS = 3  # A dropped stream ends after this many tokens
+
+
+class StubBackend:
+    """Configuration and recorded requests shared by the handler threads."""
+
+    def __init__(self, answer=DEFAULT_ANSWER, token_delay=0.05, first_token_delay=0.5,
+                 brain_answer=DEFAULT_BRAIN_ANSWER, vision_answer=DEFAULT_VISION_ANSWER,
+                 brain_token_delay=None, brain_first_token_delay=None,
+                 fail_rate=0.0, drop_rate=0.0, jitter=0.0, seed=None):
+        self.answer = answer
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.brain_answer = brain_answer
+        self.vision_answer = vision_answer
+        self.brain_token_delay = token_delay if brain_token_delay is None else brain_token_delay
+        self.brain_first_token_delay = first_token_delay if brain_first_token_delay is None else brain_first_token_delay
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.requests = []
+        self.injected = {"failed": 0, "dropped": 0}
+        self.last_prompt = ""
+        self.lock = threading.Lock()
+
+    def record(self, path, body):
+        with self.lock:
+            self.requests.append((path, body))
+
+    def roll(self, kind, rate):
+        """True (and counted) with probability rate."""
+        with self.lock:
+            hit = rate > 0 and self.random.random() < rate
+            if hit:
+                self.injected[kind] += 1
+            return hit
+
+    def first_delay(self, base):
+        with self.lock:
+            return base + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def usage(self, messages, completion):
+        """Token counts (about 4 characters per token); the prefix shared with the previous prompt counts as cached."""
+        prompt = json.dumps(messages, sort_keys=True)
+        with self.lock:
+            shared = 0
+            for a, b in zip(prompt, self.last_prompt):
+                if a != b:
+                    break
+                shared += 1
+            self.last_prompt = prompt
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(completion) // 4
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": shared // 4}}
+
+
+def make_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # Headers and body are separate writes; avoid delayed-ACK stalls on keep-alive
+
+        def handle(self):
+            try:
+                super().handle()
+            except (ConnectionResetError, BrokenPipeError):
+                pass  # Client hung up (e.g. a cancelled request)
+
+        def log_message(self, fmt, *args):
+            print(f"DEBUG: stub {self.command} {self.path} -> {args[1] if len(args) > 1 else ''}")
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            return json.loads(raw or b"{}")
+
+        def _send_json(self, data, status=200):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_chunk(self, text):
+            chunk = text.encode("utf-8")
+            self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+
+        def _send_event(self, event, data):
+            self._send_chunk(f"event: {event}\ndata: {json.dumps(data)}\n\n")
+
+        def _start_stream(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+        def _end_stream(self):
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _drop(self):
+            """Ends the response mid-stream, like a backend that died."""
+            self.close_connection = True
+            self.wfile.flush()
+
+        def _stream_answer(self, answer):
+            self._start_stream()
+            time.sleep(stub.first_delay(stub.first_token_delay))
+            drop = stub.roll("dropped", stub.drop_rate)
+            words = answer.split(" ")
+            for i, word in enumerate(words):
+                if drop and i == DROP_AFTER_TOKENS:
+                    return self._drop()
+                self._send_event("token", {"text": word + (" " if i < len(words) - 1 else "")})
+                time.sleep(stub.token_delay)
+            self._send_event("done", {"answer": answer, "toolsUsed": [], "threadId": "brixbee_stub", "turnCount": 1})
+            self._end_stream()
+
+        def _chat_completion(self, body):
+            """OpenAI-style /chat/completions for the brain and vision models."""
+            messages = body.get("messages") or []
+            has_image = any(isinstance(m.get("content"), list) and
+                            any(part.get("type") == "image_url" for part in m["content"]) for m in messages)
+            answer = stub.vision_answer if has_image else stub.brain_answer
+            usage = stub.usage(messages, answer)
+            model = body.get("model", "stub")
+            if not body.get("stream"):
+                time.sleep(stub.first_delay(stub.brain_first_token_delay) + stub.brain_token_delay * len(answer.split()))
+                return self._send_json({
+                    "id": "stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+
+            def chunk(delta, finish=None, **extra):
+                data = {"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}] if delta is not None else []}
+                self._send_chunk(f"data: {json.dumps(dict(data, **extra))}\n\n")
+
+            self._start_stream()
+            time.sleep(stub.first_delay(stub.brain_first_token_delay))
+            drop = stub.roll("dropped", stub.drop_rate)
+            words = answer.split(" ")
+            for i, word in enumerate(words):
+                if drop and i == DROP_AFTER_TOKENS:
+                    return self._drop()
+                chunk({"role": "assistant", "content": word + (" " if i < len(words) - 1 else "")} if i == 0 else
+                      {"content": word + (" " if i < len(words) - 1 else "")})
+                time.sleep(stub.brain_token_delay)
+            chunk({}, "stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                chunk(None, usage=usage)
+            self._send_chunk("data: [DONE]\n\n")
+            self._end_stream()
+
+        def do_POST(self):
+            try:
+                body = self._read_json()
+            except ValueError:
+                return self._send_json({"error": "invalid JSON"}, status=400)
+            stub.record(self.path, body)
+
+            model_call = self.path.endswith("/chat/completions")
+            if (model_call or self.path in ("/api/ai/brixbee-chat", "/api/ai/pdf-chat")) and stub.roll("failed", stub.fail_rate):
+                return self._send_json({"error": {"message": "Injected failure", "code": 500}}, status=500)
+            if model_call:
+                return self._chat_completion(body)
+            if self.path == "/api/ai/brixbee-chat":
+                if not body.get("message"):
+                    return self._send_json({"error": "Message is required"}, status=400)
+                if body.get("stream"):
+                    return self._stream_answer(stub.answer)
+                time.sleep(stub.first_token_delay + stub.token_delay * len(stub.answer.split()))
+                return self._send_json({"answer": stub.answer, "toolsUsed": [], "threadId": "brixbee_stub", "turnCount": 1})
+            if self.path == "/api/ai/pdf-chat":
+                return self._send_json({"answer": stub.answer, "sourceBook": None})
+            if self.path == "/api/ai/log":
+                return self._send_json({"success": True})
+            if self.path == "/api/ai/log/bulk":
+                records = body.get("records") or []
+                return self._send_json({"success": True, "received": len(records), "stored": len(records), "skipped": 0})
+            self._send_json({"error": "not found"}, status=404)
+
+    return Handler
+
+
+def serve(port=5001, host="127.0.0.1", **config):
+    """Starts the stub in a background thread. Returns (server, stub)."""
+    stub = StubBackend(**config)
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stub
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in EduVoice backend for the Brixbee desktop app.")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--token-delay", type=float, default=0.05)
+    parser.add_argument("--first-token-delay", type=float, default=0.5)
+    parser.add_argument("--brain-token-delay", type=float, help="Model endpoint; default: --token-delay")
+    parser.add_argument("--brain-first-token-delay", type=float, help="Model endpoint; default: --first-token-delay")
+    parser.add_argument("--answer", default=DEFAULT_ANSWER)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    args = parser.parse_args()
+    server, _ = serve(args.port, answer=args.answer, token_delay=args.token_delay,
+                      first_token_delay=args.first_token_delay, brain_token_delay=args.brain_token_delay,
+                      brain_first_token_delay=args.brain_first_token_delay, fail_rate=args.fail_rate,
+                      drop_rate=args.drop_rate, jitter=args.jitter)
+    print(f"DEBUG: Stub backend on http://127.0.0.1:{args.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_cache import AnswerCache
+
+
+def make_cache(tmp_path):
+    return AnswerCache(str(tmp_path / "answer_cache.json"), fuzzy_threshold=0.8)
+
+
+def test_swapped_operands_never_share_an_answer(tmp_path):
+    cache = make_cache(tmp_path)
+    pairs = [("what is 10 minus 3", "what is 3 minus 10"),
+             ("solve 12 divided by 4", "solve 4 divided by 12"),
+             ("what is ten minus three", "what is three minus ten")]
+    for asked, swapped in pairs:
+        cache.put(asked, f"answer to {asked}", False, "chat")
+        assert cache.get(swapped, False, "chat") is None
+        assert cache.get(asked, False, "chat") == f"answer to {asked}"
+    assert cache.counts["fuzzy_hits"] == 0
+
+
+def test_math_questions_are_not_fuzzy_matched(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("what is 10 minus 3", "7", False, "chat")
+    assert cache.get("what is 10 minus 3 please", False, "chat") == "7"  # filler words only: same key
+    assert cache.get("what is 10 minus 3 in maths", False, "chat") is None
+
+
+def test_reordered_words_miss(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("why does the dog chase the cat", "dog answer", False, "chat")
+    assert cache.get("why does the cat chase the dog", False, "chat") is None
+
+
+def test_same_order_rephrasing_still_hits(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("how do green plants make food", "photosynthesis", False, "chat")
+    assert cache.get("how do green plants make their food", False, "chat") == "photosynthesis"
+    assert cache.counts["fuzzy_hits"] == 1
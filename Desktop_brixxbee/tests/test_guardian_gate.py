@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guardian_gate import SceneGate
+
+
+def frame(level):
+    return np.full((480, 640, 3), level, dtype=np.uint8)
+
+
+def half_lit(left):
+    # Alternating halves: half the picture changes on every check, motion that never settles
+    img = frame(40)
+    if left:
+        img[:, :320] = 220
+    else:
+        img[:, 320:] = 220
+    return img
+
+
+def test_continuous_motion_stays_within_budget():
+    gate = SceneGate(heartbeat=120, min_interval=5, budget_interval=15, burst=3, person_detector=False)
+    minutes = 10
+    for second in range(minutes * 60):
+        gate.check(half_lit(second % 2), now=1000.0 + second)
+    # First frame, the saved-up burst, then one call per 15 s at most
+    assert gate.escalated <= 1 + 3 + minutes * 60 // 15
+    assert gate.escalated > minutes * 60 // 15 // 2
+
+
+def test_large_change_uses_burst_after_min_interval():
+    gate = SceneGate(heartbeat=120, min_interval=5, budget_interval=15, burst=3, person_detector=False)
+    assert gate.check(frame(40), now=0.0) == "first"
+    assert gate.check(half_lit(True), now=2.0) is None
+    assert gate.check(half_lit(True), now=5.0) == "change"
+    assert gate.check(half_lit(False), now=10.0) == "change"
+
+
+def test_quiet_room_costs_nothing_but_heartbeats():
+    gate = SceneGate(heartbeat=120, min_interval=5, budget_interval=15, burst=3, person_detector=False)
+    for second in range(600):
+        gate.check(frame(100), now=float(second))
+    assert gate.reasons == {"first": 1, "heartbeat": 4}
@@ -0,0 +1,216 @@
+"""
+Latency tracing for Brixbee turns.
+
+Every turn gets a trace ID. The stages it goes through record spans with
+their duration: capture (the child's utterance), asr, retrieval, route, agent
+and llm (time to first token and total), camera, vision, and tts.synth /
+tts.play per sentence. turn.first_audio measures from the end of the child's
+speech (or the typed message) to the start of the first sentence played back.
+
+The current trace travels in a context variable. Asyncio tasks inherit it,
+and run_blocking() copies it to the worker threads. Speech sentences carry
+their trace as a tag, because they are played after the turn has returned.
+
+A voice trace begins before listening, and most listens hear nothing. Spans
+are therefore held in memory until the trace is committed (it became a turn)
+or discarded. After the commit they are written as they come. Records are
+JSON lines in a rotating file (BRIXBEE_TRACE_PATH, default traces.jsonl
+next to this script). A background thread writes them, so no turn waits
+on the disk.
+
+    python tracing.py            p50/p95/p99 per stage over all trace files
+    python tracing.py --hours 2  only the last two hours
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import queue
+import logging
+import argparse
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import OrderedDict
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+
+# --- CONFIGURATION ---
+TRACE_PATH = os.getenv("BRIXBEE_TRACE_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces.jsonl")
+TRACE_MAX_BYTES = int(os.getenv("BRIXBEE_TRACE_MAX_BYTES") or 5 * 1024 * 1024)
+TRACE_BACKUPS = int(os.getenv("BRIXBEE_TRACE_BACKUPS") or 3)
+TRACING = (os.getenv("BRIXBEE_TRACE") or "1") != "0"
+OPEN_TRACES = 64  # Traces remembered for late spans (speech still playing after the turn returned)
+
+current_trace = contextvars.ContextVar("brixbee_trace", default=None)
+
+
+class Tracer:
+    def __init__(self, path=TRACE_PATH, enabled=TRACING):
+        self.enabled = enabled
+        self.path = path
+        self.written = 0
+        self._traces = OrderedDict()  # trace id -> {"t0", "source", "committed", "spans", "heard"}
+        self._lock = threading.Lock()
+        self._logger = None
+        if enabled:
+            handler = RotatingFileHandler(path, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            records = queue.Queue()
+            self._listener = QueueListener(records, handler)
+            self._listener.start()
+            self._logger = logging.getLogger("brixbee.trace")
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            self._logger.addHandler(QueueHandler(records))
+
+    # --- Traces ---
+
+    def begin(self, source):
+        """Starts a trace and makes it current in this context. Returns its ID."""
+        trace_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._traces[trace_id] = {"t0": time.time(), "source": source, "committed": False, "spans": [], "heard": False}
+            while len(self._traces) > OPEN_TRACES:
+                self._traces.popitem(last=False)
+        current_trace.set(trace_id)
+        return trace_id
+
+    def restart_clock(self, trace_id=None):
+        """Moves the trace's reference time to now (the child just stopped talking)."""
+        with self._lock:
+            trace = self._traces.get(trace_id or current_trace.get())
+            if trace:
+                trace["t0"] = time.time()
+
+    def commit(self, trace_id, **attrs):
+        """The trace became a turn: writes what it recorded so far; later spans are written directly."""
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if not trace or trace["committed"]:
+                return
+            trace["committed"] = True
+            spans, trace["spans"] = trace["spans"], []
+        self._write(dict({"type": "turn", "trace": trace_id, "source": trace["source"], "ts": round(trace["t0"], 3)}, **attrs))
+        for span in spans:
+            self._write(span)
+
+    def discard(self, trace_id):
+        with self._lock:
+            self._traces.pop(trace_id, None)
+
+    # --- Spans ---
+
+    def record(self, name, seconds, trace_id=None, end=None, **attrs):
+        """Records a span that ended at end (default now) and lasted seconds."""
+        if not self.enabled:
+            return
+        trace_id = trace_id or current_trace.get()
+        end = time.time() if end is None else end
+        span = dict({"type": "span", "trace": trace_id, "span": name, "ts": round(end - seconds, 3),
+                     "ms": round(seconds * 1000, 1)}, **attrs)
+        first_audio = None
+        with self._lock:
+            trace = self._traces.get(trace_id)
+            if trace and name == "tts.play" and not trace["heard"]:
+                trace["heard"] = True
+                first_audio = dict(span, span="turn.first_audio", ts=round(trace["t0"], 3),
+                                   ms=round(max(0.0, end - seconds - trace["t0"]) * 1000, 1))
+            if trace and not trace["committed"]:
+                trace["spans"].append(span)
+                if first_audio:
+                    trace["spans"].append(first_audio)
+                return
+        self._write(span)
+        if first_audio:
+            self._write(first_audio)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Times the block as a span of the current trace; failures are marked with ok: false."""
+        started = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            extra = {} if ok else {"ok": False}
+            self.record(name, time.perf_counter() - started, **dict(attrs, **extra))
+
+    def _write(self, record):
+        if self._logger is None:
+            return
+        self._logger.info(json.dumps(record, ensure_ascii=False))
+        self.written += 1
+
+    def close(self):
+        if self._logger is not None:
+            self._listener.stop()
+
+
+# --- Summary ---
+
+def read_records(path=TRACE_PATH, since=None):
+    """Records from the trace file and its rotated backups, oldest file first."""
+    paths = [f"{path}.{i}" for i in range(TRACE_BACKUPS, 0, -1)] + [path]
+    for p in paths:
+        if not os.path.exists(p):
+            continue
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by a crash
+                if since is None or record.get("ts", 0) >= since:
+                    yield record
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(records):
+    """{stage: (count, p50, p95, p99, failures)} in milliseconds."""
+    stages, failures = {}, {}
+    for record in records:
+        if record.get("type") != "span":
+            continue
+        stages.setdefault(record["span"], []).append(record["ms"])
+        if record.get("ok") is False:
+            failures[record["span"]] = failures.get(record["span"], 0) + 1
+    summary = {}
+    for name, values in stages.items():
+        values.sort()
+        summary[name] = (len(values), percentile(values, 50), percentile(values, 95), percentile(values, 99),
+                         failures.get(name, 0))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Latency per stage from Brixbee traces.")
+    parser.add_argument("--path", default=TRACE_PATH)
+    parser.add_argument("--hours", type=float, help="Only traces from the last this many hours")
+    args = parser.parse_args(argv)
+
+    records = list(read_records(args.path, time.time() - args.hours * 3600 if args.hours else None))
+    summary = summarize(records)
+    if not summary:
+        print(f"No spans in {args.path}")
+        return 1
+    turns = sum(1 for r in records if r.get("type") == "turn")
+    print(f"{turns} turns, {sum(s[0] for s in summary.values())} spans from {args.path}")
+    print(f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'failed':>8}")
+    for name in sorted(summary):
+        count, p50, p95, p99, failed = summary[name]
+        print(f"{name:<22}{count:>7}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}{failed:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,368 @@
+"""
+Headless benchmark and replay harness for the Brixbee turn pipeline.
+
+Runs BrixbeeCore without a window, microphone, camera or network:
+
+  - stub_backend.py serves both the /api/ai/* endpoints and an
+    OpenRouter-compatible /api/v1/chat/completions on a free local port.
+    It injects latency, jitter, HTTP 500s and dropped streams as configured.
+  - Camera frames come from image files, or from a synthetic page.
+  - Speech is "played" by a stub synthesizer that waits as long as the
+    sentence would take to say (--speech-rate words per second, 0 = instant).
+  - Turns come from a script. Each line is a JSON object:
+        {"text": "what is photosynthesis", "source": "voice", "audio": "clips/q1.wav", "image": "page.jpg"}
+    "text" is the transcript. "audio" is a 16-bit WAV, transcribed with
+    offline Whisper when it is installed and replaced by "text" when it is
+    not. "image" is what the camera sees for that turn. "source" is "voice"
+    (default) or "chat". Relative paths are resolved against the script's
+    folder. Without --script a built-in mix of questions, a page to read and
+    small talk is used.
+
+A turn fails when it times out, when Brixbee apologises, or when it reached
+the stub but never spoke one of the stub's answers in full (a dropped stream
+that nothing recovered from).
+
+Every run writes its traces, route stats, answer cache and logs to a fresh
+temporary folder. The report has throughput, latency percentiles per turn
+(queue to answer and queue to last word spoken) and per stage (from the
+traces), route outcomes, and the failures the stub injected.
+
+Usage:
+    python turn_benchmark.py [--script turns.jsonl] [--repeat 3] [--fail-rate 0.1] [--drop-rate 0.05]
+                             [--first-token-delay 0.8] [--brain-first-token-delay 0.4] [--jitter 0.5]
+                             [--speech-rate 0] [--json report.json] [--verbose]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+
+import cv2
+import numpy as np
+
+import stub_backend
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SCRIPT = [
+    {"text": "hey brixbee what is photosynthesis"},
+    {"text": "explain the water cycle"},
+    {"text": "how are you today"},
+    {"text": "read this page for me"},
+    {"text": "tell me a fun fact about elephants", "source": "chat"},
+    {"text": "define a prime number"},
+    {"text": "what am i holding"},
+    {"text": "thank you brixbee"},
+]
+# Replies that mean the turn did not get a real answer
+FAILURE_REPLIES = ("I'm sorry, I couldn't", "I couldn't", "I am having trouble", "I am sorry, my brain", "I missed that")
+TURN_TIMEOUT = 60.0
+
+
+def synthetic_page(width=1280, height=720, seed=0):
+    """A dark desk with a white page of 'text' lines: sharp enough to read and easy to find."""
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), 40, np.uint8)
+    x0, y0, x1, y1 = width // 4, height // 8, width * 3 // 4, height * 7 // 8
+    frame[y0:y1, x0:x1] = 235
+    for y in range(y0 + 30, y1 - 30, 22):
+        x = x0 + 30
+        while x < x1 - 60:
+            w = int(rng.integers(20, 70))
+            cv2.rectangle(frame, (x, y), (min(x + w, x1 - 30), y + 8), (20, 20, 20), -1)
+            x += w + 12
+    return frame
+
+
+class ImageCamera:
+    """CameraStream's interface over a still image; every read is a 'new' frame."""
+
+    def __init__(self, frame=None):
+        self.frame = synthetic_page() if frame is None else frame
+        self.frame_id = 0
+        self.running = False
+
+    def show(self, frame):
+        self.frame = frame
+
+    def acquire(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def _next(self):
+        self.frame_id += 1
+        return self.frame.copy()
+
+    def latest(self):
+        return (self.frame.copy(), self.frame_id) if self.running else (None, 0)
+
+    def snapshot(self, timeout=3.0, newer_than=None):
+        self.acquire()
+        return self._next()
+
+    def next_frame(self, newer_than=0, timeout=0.5):
+        return self._next(), self.frame_id
+
+    def burst(self, count, timeout=3.0):
+        self.acquire()
+        return [self._next() for _ in range(count)]
+
+
+class StubSynthesizer:
+    """Renders nothing; 'playing' a sentence takes as long as saying it at words_per_second."""
+    extension = ".txt"
+
+    def __init__(self, words_per_second=0.0):
+        self.words_per_second = words_per_second
+
+    def render(self, text, voice, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def play_command(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            words = len(f.read().split())
+        seconds = words / self.words_per_second if self.words_per_second else 0.0
+        return [sys.executable, "-c", f"import time; time.sleep({seconds:.3f})"]
+
+
+class RecordingUI:
+    """HeadlessUI that also keeps what Brixbee said, per trace."""
+
+    def __init__(self, current_trace):
+        self.current_trace = current_trace
+        self.replies = {}
+
+    def set_status(self, text, color, play_sound):
+        pass
+
+    def log(self, line):
+        print(line)
+        if line.startswith("Brixbee: "):
+            self.replies.setdefault(self.current_trace.get(), []).append(line[len("Brixbee: "):])
+
+    def play_sound(self, name):
+        pass
+
+    def show_modes(self, guard_mode, tamil_mode):
+        pass
+
+
+def load_script(path):
+    folder = os.path.dirname(os.path.abspath(path))
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            item = json.loads(line)
+            if "text" not in item and "audio" not in item:
+                raise ValueError(f"{path}:{number}: needs \"text\" or \"audio\"")
+            for key in ("audio", "image"):
+                if item.get(key) and not os.path.isabs(item[key]):
+                    item[key] = os.path.join(folder, item[key])
+            items.append(item)
+    return items
+
+
+def load_whisper():
+    """Offline recognizer for scripted audio, or None (transcripts are used instead). Never downloads a model."""
+    try:
+        from asr import WhisperASR
+        return WhisperASR(local_files_only=True)
+    except Exception as e:
+        print(f"WARNING: Offline recognition unavailable ({e}); scripted transcripts replace audio.")
+        return None
+
+
+def normalize(text):
+    return " ".join(text.split())
+
+
+def answered_in_full(replies, stub):
+    """True if what was spoken contains one of the stub's answers from start to end."""
+    spoken = normalize(" ".join(replies))
+    return any(normalize(answer) in spoken for answer in (stub.answer, stub.brain_answer, stub.vision_answer))
+
+
+async def replay_turn(core, stub, item, audio, timeout):
+    """Queues one scripted turn the way voice_loop or the chat box would. Returns its timings and outcome."""
+    source = item.get("source", "voice")
+    trace = core.tracer.begin(source)
+    text = item.get("text", "")
+    if audio is not None:
+        samples, rate = audio
+        core.trace_capture(len(samples) / rate)
+        if core.asr is not None:
+            text = await core.run_blocking(core.recognize, samples, rate) or text
+    else:
+        core.tracer.restart_clock()
+    requests_before, injected_before = len(stub.requests), dict(stub.injected)
+    queued = time.perf_counter()
+    turn = await core.submit(source, text.lower() if source == "voice" else text, trace=trace)
+    try:
+        handled = await asyncio.wait_for(asyncio.shield(turn.done), timeout)
+    except asyncio.TimeoutError:
+        core.cancel_turn()
+        return {"text": text, "source": source, "ok": False, "timeout": True,
+                "injected": {kind: stub.injected[kind] - injected_before[kind] for kind in stub.injected}}
+    answered = time.perf_counter() - queued
+    await asyncio.get_running_loop().run_in_executor(None, core.speech.wait_until_idle, timeout)
+    spoken = time.perf_counter() - queued
+    replies = core.ui.replies.pop(trace, [])
+    injected = {kind: stub.injected[kind] - injected_before[kind] for kind in stub.injected}
+    used_stub = len(stub.requests) > requests_before  # Local commands and cache hits never reach it
+    ok = (bool(handled) and bool(replies) and not any(r.startswith(FAILURE_REPLIES) for r in replies)
+          and (not used_stub or answered_in_full(replies, stub)))
+    return {"text": text, "source": source, "ok": ok, "answered": answered, "spoken": spoken,
+            "replies": replies, "injected": injected}
+
+
+def configure_environment(workdir, stub_url):
+    """Points the core at the stub and the temporary folder. Must run before brixbee_core is imported."""
+    os.environ.update({
+        "OPENROUTER_BASE_URL": f"{stub_url}/api/v1",
+        "BRIXBEE_BACKEND_URL": stub_url,
+        "VISION_API_KEY": "stub",
+        "BRAIN_API_KEY": "stub",
+        "BRIXBEE_TRACE_PATH": os.path.join(workdir, "traces.jsonl"),
+        "BRIXBEE_ROUTE_STATS": os.path.join(workdir, "route_stats.json"),
+        "BRIXBEE_ANSWER_CACHE": os.path.join(workdir, "answer_cache.json"),
+        "BRIXBEE_LOG_SPOOL": os.path.join(workdir, "interaction_log_spool.jsonl"),
+        "BRIXBEE_HTTP_RETRIES": os.environ.get("BRIXBEE_HTTP_RETRIES", "0"),  # Injected failures should show, not be retried away
+    })
+
+
+def run(items, args, workdir):
+    server, stub = stub_backend.serve(
+        0, token_delay=args.token_delay, first_token_delay=args.first_token_delay,
+        brain_token_delay=args.brain_token_delay, brain_first_token_delay=args.brain_first_token_delay,
+        fail_rate=args.fail_rate, drop_rate=args.drop_rate, jitter=args.jitter, seed=args.seed)
+    configure_environment(workdir, f"http://127.0.0.1:{server.server_address[1]}")
+
+    # Imported only now: these modules read their configuration from the environment on import
+    from brixbee_core import BrixbeeCore
+    from tracing import current_trace
+
+    core = BrixbeeCore(ui=RecordingUI(current_trace), voice=False)
+    core.camera = ImageCamera()
+    core.speech.synth = StubSynthesizer(args.speech_rate)
+    if any(item.get("audio") for item in items):
+        core.asr = load_whisper()
+    core.start()
+
+    from audio_input import read_wav, SAMPLE_RATE
+    frames = {}
+    audio = {}
+    for item in items:
+        if item.get("image") and item["image"] not in frames:
+            frame = cv2.imread(item["image"])
+            if frame is None:
+                raise ValueError(f"Cannot read image {item['image']}")
+            frames[item["image"]] = frame
+        if item.get("audio") and item["audio"] not in audio:
+            audio[item["audio"]] = (read_wav(item["audio"], SAMPLE_RATE), SAMPLE_RATE)
+
+    async def session():
+        results = []
+        for round_number in range(args.warmup + args.repeat):
+            for item in items:
+                core.camera.show(frames[item["image"]] if item.get("image") else synthetic_page())
+                result = await replay_turn(core, stub, item, audio.get(item.get("audio")), args.turn_timeout)
+                if round_number >= args.warmup:
+                    results.append(result)
+        return results
+
+    started = time.perf_counter()
+    results = asyncio.run_coroutine_threadsafe(session(), core.loop).result()
+    wall = time.perf_counter() - started
+    core.print_stats()
+    core.tracer.close()
+    server.shutdown()
+    return results, wall, core, stub
+
+
+def report(results, wall, core, stub, trace_path):
+    from tracing import read_records, summarize, percentile
+
+    ok = [r for r in results if r["ok"] and not r.get("timeout")]
+    lines = [f"{len(results)} turns in {wall:.1f}s: {len(results) / wall * 60:.1f} turns/min, "
+             f"{len(results) - len(ok)} failed or timed out"]
+    for key, label in (("answered", "queued -> handled"), ("spoken", "queued -> last word")):
+        values = sorted(r[key] for r in ok if key in r)
+        if values:
+            lines.append(f"{label:<20} p50 {percentile(values, 50):.2f}s  p95 {percentile(values, 95):.2f}s  "
+                         f"p99 {percentile(values, 99):.2f}s")
+    stages = summarize(read_records(trace_path))
+    lines.append(f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'failed':>8}")
+    for name in sorted(stages):
+        count, p50, p95, p99, failed = stages[name]
+        lines.append(f"{name:<22}{count:>7}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}{failed:>8}")
+    lines.append(f"Routes: {core.router.stats.format_stats()}")
+    lines.append(f"Brain: {core.brain.format_stats()}")
+    lines.append(f"Injected: {stub.injected['failed']} HTTP 500s, {stub.injected['dropped']} dropped streams "
+                 f"over {len(stub.requests)} stub requests")
+    hit = [r for r in results if any(r.get("injected", {}).values())]
+    if hit:
+        lines.append(f"Turns hit by an injected failure: {len(hit)}, still answered in full: {sum(r['ok'] for r in hit)}")
+    data = {
+        "turns": len(results), "failed": len(results) - len(ok), "wall_seconds": wall,
+        "turns_per_minute": len(results) / wall * 60 if wall else 0.0,
+        "stages": {name: dict(zip(("count", "p50_ms", "p95_ms", "p99_ms", "failed"), s)) for name, s in stages.items()},
+        "routes": core.router.stats.outcomes, "brain": core.brain.counts, "injected": stub.injected,
+        "results": results,
+    }
+    return "\n".join(lines), data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay scripted turns through a headless Brixbee core against local stubs.")
+    parser.add_argument("--script", help="JSONL file of turns (default: built-in mix)")
+    parser.add_argument("--repeat", type=int, default=3, help="Times the script is run after the warm-up")
+    parser.add_argument("--warmup", type=int, default=1, help="Rounds run first and not counted")
+    parser.add_argument("--token-delay", type=float, default=0.03)
+    parser.add_argument("--first-token-delay", type=float, default=0.8, help="Agent endpoint")
+    parser.add_argument("--brain-token-delay", type=float, default=0.02)
+    parser.add_argument("--brain-first-token-delay", type=float, default=0.4, help="Brain and vision endpoint")
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1, help="Seed for jitter and injected failures")
+    parser.add_argument("--speech-rate", type=float, default=0.0, help="Words per second of simulated speech (0 = instant)")
+    parser.add_argument("--turn-timeout", type=float, default=TURN_TIMEOUT)
+    parser.add_argument("--json", help="Also write the report as JSON to this file")
+    parser.add_argument("--keep", help="Keep traces and logs in this folder instead of a temporary one")
+    parser.add_argument("--verbose", action="store_true", help="Show the core's debug output")
+    args = parser.parse_args()
+
+    items = load_script(args.script) if args.script else DEFAULT_SCRIPT
+    if not items:
+        print("❌ No turns to replay")
+        return 1
+
+    with contextlib.ExitStack() as stack:
+        workdir = args.keep or stack.enter_context(tempfile.TemporaryDirectory(prefix="brixbee_bench_"))
+        os.makedirs(workdir, exist_ok=True)
+        log_path = os.path.join(workdir, "core.log")
+        print(f"Replaying {len(items)} turns x {args.repeat} (+{args.warmup} warm-up); core output in {log_path}")
+        with open(log_path, "w", encoding="utf-8") as log:
+            output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(log)
+            with output:
+                results, wall, core, stub = run(items, args, workdir)
+        text, data = report(results, wall, core, stub, os.environ["BRIXBEE_TRACE_PATH"])
+        print(text)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+    return 0 if data["turns"] and data["failed"] < data["turns"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
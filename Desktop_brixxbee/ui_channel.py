@@ -0,0 +1,56 @@
+"""
+Marshalling of UI updates onto the Tk thread.
+
+Tk widgets may only be touched from the thread running mainloop(). Worker
+threads and the asyncio core never call widget methods; they post callables to
+a UiChannel and the Tk loop runs them from drain(), called every few
+milliseconds with after().
+
+post_latest() coalesces updates that only matter in their newest form (the
+status circle): if the Tk loop falls behind, older statuses are skipped instead
+of replayed one by one.
+"""
+import threading
+from collections import deque
+
+DRAIN_LIMIT = 200  # Updates run per drain() call, so a flood cannot freeze the window
+
+
+class UiChannel:
+    def __init__(self):
+        self._queue = deque()
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def post(self, fn, *args):
+        """Runs fn(*args) on the Tk thread, in order with other posts. Safe from any thread."""
+        with self._lock:
+            self._queue.append((None, fn, args))
+
+    def post_latest(self, key, fn, *args):
+        """Like post(), but a newer update with the same key replaces one not yet run."""
+        with self._lock:
+            if key not in self._latest:
+                self._queue.append((key, None, None))
+            self._latest[key] = (fn, args)
+
+    def drain(self, limit=DRAIN_LIMIT):
+        """Runs pending updates. Call only from the Tk thread. Returns how many ran."""
+        ran = 0
+        while ran < limit:
+            with self._lock:
+                if not self._queue:
+                    break
+                key, fn, args = self._queue.popleft()
+                if key is not None:
+                    fn, args = self._latest.pop(key)
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"DEBUG: UI update failed: {e}")
+            ran += 1
+        return ran
+
+    def __len__(self):
+        with self._lock:
+            return len(self._queue)
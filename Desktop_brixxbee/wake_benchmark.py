@@ -0,0 +1,99 @@
+"""
+Benchmark for the local wake word engine.
+
+Feeds recorded clips through the Porcupine detector frame by frame and reports:
+  - detections and, when --wake-at is given, detection latency
+    (audio time the detector fired minus the time the wake phrase ended,
+    plus the processing time of that frame)
+  - per-frame processing time (mean / p95 / max)
+  - CPU seconds per hour of idle listening and the share of one core
+
+Usage:
+    python wake_benchmark.py clip.wav [more.wav ...] [--wake-at 1.35]
+    python wake_benchmark.py --idle-seconds 600    # synthetic room noise, CPU cost only
+"""
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from audio_input import read_wav
+from wake_word import PorcupineDetector, WAKE_MODEL_PATH, WAKE_SENSITIVITY
+
+
+def room_noise(seconds, sample_rate, level=150, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, level, int(seconds * sample_rate)).clip(-32768, 32767).astype(np.int16)
+
+
+def run_clip(detector, samples):
+    """Returns (detection times in seconds, per-frame processing times, cpu seconds, audio seconds)."""
+    n = detector.frame_length
+    detections, frame_times = [], []
+    cpu_start = time.process_time()
+    for i in range(0, len(samples) - n + 1, n):
+        frame = samples[i:i + n]
+        t0 = time.perf_counter()
+        woke = detector.process(frame)
+        frame_times.append(time.perf_counter() - t0)
+        if woke:
+            detections.append(((i + n) / detector.sample_rate, frame_times[-1]))
+    cpu = time.process_time() - cpu_start
+    return detections, frame_times, cpu, len(samples) / detector.sample_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wake word latency and CPU benchmark.")
+    parser.add_argument("clips", nargs="*", help="16-bit PCM WAV files")
+    parser.add_argument("--wake-at", type=float, help="Second at which the wake phrase ends in each clip")
+    parser.add_argument("--idle-seconds", type=float, default=0, help="Also run this much synthetic room noise")
+    parser.add_argument("--model", default=WAKE_MODEL_PATH)
+    parser.add_argument("--sensitivity", type=float, default=WAKE_SENSITIVITY)
+    args = parser.parse_args()
+    if not args.clips and not args.idle_seconds:
+        parser.error("give WAV clips and/or --idle-seconds")
+
+    try:
+        detector = PorcupineDetector(args.model, sensitivity=args.sensitivity)
+    except Exception as e:
+        print(f"❌ Cannot create detector: {e}")
+        sys.exit(1)
+
+    all_frames, total_cpu, total_audio = [], 0.0, 0.0
+    latencies = []
+    try:
+        inputs = [(path, read_wav(path, detector.sample_rate)) for path in args.clips]
+        if args.idle_seconds:
+            inputs.append((f"<room noise {args.idle_seconds:g}s>", room_noise(args.idle_seconds, detector.sample_rate)))
+        for name, samples in inputs:
+            detections, frame_times, cpu, audio_s = run_clip(detector, samples)
+            all_frames += frame_times
+            total_cpu += cpu
+            total_audio += audio_s
+            fired = ", ".join(f"{t:.2f}s" for t, _ in detections) or "none"
+            line = f"{name}: {audio_s:.1f}s audio, detections at {fired}"
+            if args.wake_at is not None and detections and not name.startswith("<"):
+                t, proc = detections[0]
+                latency = (t - args.wake_at) + proc
+                latencies.append(latency)
+                line += f", latency {latency * 1000:.0f} ms"
+            print(line)
+    finally:
+        detector.close()
+
+    ms = np.array(all_frames) * 1000
+    frame_s = detector.frame_length / detector.sample_rate
+    print(f"\nFrames: {len(ms)} x {frame_s * 1000:.0f} ms")
+    print(f"Processing per frame: mean {ms.mean():.3f} ms, p95 {np.percentile(ms, 95):.3f} ms, max {ms.max():.3f} ms")
+    cpu_share = total_cpu / total_audio if total_audio else 0.0
+    print(f"CPU: {cpu_share * 3600:.1f} s per hour of listening ({cpu_share:.2%} of one core)")
+    if latencies:
+        lat = np.array(latencies) * 1000
+        print(f"Detection latency: mean {lat.mean():.0f} ms, max {lat.max():.0f} ms over {len(lat)} clips")
+    elif args.wake_at is not None:
+        print("⚠️ No detections in the clips, latency not measured.")
+
+
+if __name__ == "__main__":
+    main()
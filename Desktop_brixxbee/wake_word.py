@@ -0,0 +1,208 @@
+"""
+Always-on local wake-word detection for "Hey Brix Bee".
+
+Frames from the shared microphone stream go into a ring buffer and through
+Porcupine (the hey-brix-bee .ppn model shipped next to this file). Nothing
+leaves the machine until the wake word fires; then the audio that follows it
+(the child's question) is cut out of the ring buffer by the VAD segmenter and
+handed to full speech recognition.
+
+Requires pvporcupine, PyAudio and a Picovoice access key (PICOVOICE_ACCESS_KEY).
+"""
+import os
+import time
+import threading
+
+import numpy as np
+
+from audio_input import NoiseFloor, VadSegmenter, PyAudioFrames, frame_rms
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# --- CONFIGURATION ---
+WAKE_MODEL_PATH = os.getenv("BRIXBEE_WAKE_MODEL") or os.path.join(
+    script_dir, "hey-brix-bee_en_mac_v4_0_0", "hey-brix-bee_en_mac_v4_0_0.ppn")
+WAKE_SENSITIVITY = float(os.getenv("BRIXBEE_WAKE_SENSITIVITY") or 0.6)
+RING_SECONDS = 12          # Audio kept in memory; bounds the longest command after the wake word
+COMMAND_MAX_SECONDS = 10   # Same phrase limit as get_audio
+COMMAND_START_TIMEOUT = 4  # Give up if nobody speaks this long after the wake word
+COMMAND_PRE_ROLL = 0.1     # Seconds before detected speech kept (the wake word itself is mostly excluded)
+
+
+class RingBuffer:
+    """Fixed-size int16 sample buffer. Positions are absolute sample counts since start."""
+
+    def __init__(self, capacity):
+        self.data = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.total = 0  # Samples ever written
+
+    def write(self, samples):
+        n = len(samples)
+        if n >= self.capacity:
+            self.data[:] = samples[-self.capacity:]
+            self.total += n
+            return
+        start = self.total % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        self.data[:n - first] = samples[first:]
+        self.total += n
+
+    def read(self, start, end):
+        """Copy of samples [start, end); the oldest part is clipped if it was overwritten."""
+        start = max(start, self.total - self.capacity, 0)
+        end = min(end, self.total)
+        if end <= start:
+            return np.zeros(0, dtype=np.int16)
+        idx = np.arange(start, end) % self.capacity
+        return self.data[idx]
+
+
+class PorcupineDetector:
+    """Porcupine keyword spotter for the shipped hey-brix-bee model."""
+
+    def __init__(self, keyword_path=WAKE_MODEL_PATH, access_key=None, sensitivity=WAKE_SENSITIVITY):
+        import pvporcupine
+        access_key = access_key or os.getenv("PICOVOICE_ACCESS_KEY")
+        if not access_key:
+            raise RuntimeError("PICOVOICE_ACCESS_KEY is not set")
+        if not os.path.exists(keyword_path):
+            raise RuntimeError(f"wake word model not found at {keyword_path}")
+        self.porcupine = pvporcupine.create(access_key=access_key, keyword_paths=[keyword_path],
+                                            sensitivities=[sensitivity])
+        self.frame_length = self.porcupine.frame_length
+        self.sample_rate = self.porcupine.sample_rate
+
+    def process(self, frame):
+        """True when the wake word ends in this frame (frame_length int16 samples)."""
+        return self.porcupine.process(frame) >= 0
+
+    def close(self):
+        self.porcupine.delete()
+
+
+class WakeWordEngine:
+    """
+    Runs the detector on every microphone frame in a background thread.
+    wait_for_wake() blocks until the wake word is heard; capture_command() then
+    returns the speech that followed it as 16-bit PCM bytes.
+    is_muted() is polled per frame so Brixbee cannot wake itself while speaking.
+    frames is any iterable of frames (a MicrophoneStream's frames(), a WAV file);
+    pass that stream's noise_floor too, otherwise the engine keeps its own.
+    """
+
+    def __init__(self, detector, frames=None, is_muted=None, noise_floor=None):
+        self.detector = detector
+        self.sample_rate = detector.sample_rate
+        self.frame_length = detector.frame_length
+        self.frames = frames if frames is not None else PyAudioFrames(self.sample_rate, self.frame_length)
+        self.is_muted = is_muted or (lambda: False)
+        self.ring = RingBuffer(self.sample_rate * RING_SECONDS)
+        self.update_floor = noise_floor is None
+        self.noise_floor = noise_floor or NoiseFloor()
+        self.wake_pos = None
+        self.wakes = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if isinstance(self.frames, PyAudioFrames):
+            self.frames.close()  # Shared streams are closed by their owner
+
+    def _run(self):
+        try:
+            for frame in self.frames:
+                if not self._running:
+                    break
+                if self.update_floor:
+                    self.noise_floor.update(frame_rms(frame))
+                with self._cond:
+                    self.ring.write(frame)
+                    if not self.is_muted() and self.detector.process(frame):
+                        self.wake_pos = self.ring.total
+                        self.wakes += 1
+                    self._cond.notify_all()
+        except Exception as e:
+            print(f"DEBUG: Wake word engine stopped: {e}")
+        finally:
+            self._running = False
+            with self._cond:
+                self._cond.notify_all()
+
+    def wait_for_wake(self, timeout=None):
+        """True once the wake word has been heard (False on timeout)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.wake_pos is not None or not self._running, timeout)
+            return self.wake_pos is not None
+
+    def capture_command(self, max_seconds=COMMAND_MAX_SECONDS, start_timeout=COMMAND_START_TIMEOUT):
+        """
+        PCM bytes of the speech after the wake word (b"" if nobody spoke), then
+        re-arms the detector.
+        """
+        with self._cond:
+            start = self.wake_pos
+        if start is None:
+            return b""
+        segmenter = VadSegmenter(self.noise_floor, self.sample_rate, self.frame_length,
+                                 pre_roll=COMMAND_PRE_ROLL, max_seconds=max_seconds, update_floor=False)
+        pos = start
+        started = time.time()
+        try:
+            while self._running:
+                with self._cond:
+                    self._cond.wait_for(lambda: self.ring.total >= pos + self.frame_length or not self._running, 0.5)
+                    chunk = self.ring.read(pos, self.ring.total)
+                usable = len(chunk) - len(chunk) % self.frame_length
+                for i in range(0, usable, self.frame_length):
+                    utterance = segmenter.feed(chunk[i:i + self.frame_length])
+                    if utterance is not None:
+                        return utterance.tobytes()
+                pos += usable
+                if not segmenter.in_speech and time.time() - started > start_timeout:
+                    return b""
+            utterance = segmenter.flush()
+            return utterance.tobytes() if utterance is not None else b""
+        finally:
+            with self._cond:
+                self.wake_pos = None
+
+
+def create_wake_engine(mic=None, is_muted=None):
+    """
+    A started WakeWordEngine reading from mic (a MicrophoneStream; its own
+    PyAudio stream if None), or None (with the reason printed) when it cannot run here.
+    """
+    try:
+        detector = PorcupineDetector()
+    except ImportError:
+        print("WARNING: pvporcupine not installed. Wake word falls back to cloud transcription.")
+        return None
+    except Exception as e:
+        print(f"WARNING: Local wake word unavailable ({e}). Falling back to cloud transcription.")
+        return None
+    if mic is not None and (mic.sample_rate, mic.frame_length) != (detector.sample_rate, detector.frame_length):
+        print(f"WARNING: Wake word needs {detector.frame_length}-sample frames at {detector.sample_rate} Hz; "
+              f"microphone gives {mic.frame_length} at {mic.sample_rate} Hz.")
+        detector.close()
+        return None
+    try:
+        if mic is not None:
+            engine = WakeWordEngine(detector, frames=mic.frames(), is_muted=is_muted, noise_floor=mic.noise_floor).start()
+        else:
+            engine = WakeWordEngine(detector, is_muted=is_muted).start()
+    except Exception as e:
+        print(f"WARNING: Could not open the microphone for wake word detection ({e}).")
+        detector.close()
+        return None
+    print("DEBUG: Local wake word engine listening for 'Hey Brix Bee'.")
+    return engine
@@ -275,6 +275,47 @@ const logInteraction = async (req, res) => {
   }
 };
 
+// @route  POST /api/ai/log/bulk
+// @desc   Batched Brixbee desktop logs. Body: { records: [{ id, query, response, type, timestamp }] }
+//         Records are upserted on their client id, so a batch resent after a timeout is stored once.
+const MAX_BULK_LOG_RECORDS = 500;
+
+const logInteractionsBulk = async (req, res) => {
+  try {
+    const { records } = req.body;
+    if (!Array.isArray(records)) {
+      return res.status(400).json({ error: 'records must be an array' });
+    }
+    if (records.length > MAX_BULK_LOG_RECORDS) {
+      return res.status(413).json({ error: `At most ${MAX_BULK_LOG_RECORDS} records per request` });
+    }
+
+    const valid = records.filter(r => r && r.query && r.response);
+    const ops = valid.map(r => {
+      const doc = {
+        query: r.query,
+        response: r.response,
+        type: r.type,
+        timestamp: r.timestamp ? new Date(r.timestamp) : new Date(),
+        clientId: r.id,
+      };
+      return r.id
+        ? { updateOne: { filter: { clientId: r.id }, update: { $setOnInsert: doc }, upsert: true } }
+        : { insertOne: { document: doc } };
+    });
+
+    let stored = 0;
+    if (ops.length) {
+      const result = await BrixbeeLog.bulkWrite(ops, { ordered: false });
+      stored = (result.upsertedCount || 0) + (result.insertedCount || 0);
+    }
+    res.json({ success: true, received: records.length, stored, skipped: records.length - valid.length });
+  } catch (error) {
+    console.error('Brixbee Bulk Logging Error:', error);
+    res.status(500).json({ error: error.message });
+  }
+};
+
 // ─── PDF Chat (Brixbee Desktop) ───────────────────────────────────────────────
 const path = require('path');
 const fs = require('fs');
@@ -337,23 +378,32 @@ const extractPdfText = async (filePath) => {
 // @desc   Brixbee desktop – answer questions using PDF books + general AI
 const pdfChat = async (req, res) => {
   try {
-    const { question, subject, studentName } = req.body;
+    const { question, subject, studentName, passages } = req.body;
     if (!question) return res.status(400).json({ error: 'question is required' });
 
     // Detect subject from question text if not provided
     const detectedSubject = subject || question;
 
-    // Find and extract PDF text
-    const pdfPath = pickPdfForSubject(detectedSubject);
-    let pdfText = '';
-    if (pdfPath) {
-      pdfText = await extractPdfText(pdfPath);
+    let pdfPath = null;
+    let pdfContext = '';
+    if (Array.isArray(passages) && passages.length) {
+      // Desktop already retrieved the relevant passages from its local index
+      const passageText = passages
+        .map(p => `(${p.book}${p.page ? ` p.${p.page}` : ''}) ${p.text}`)
+        .join('\n');
+      pdfContext = `REFERENCE BOOK PASSAGES (use these as the primary source):\n${passageText}\n\n`;
+    } else {
+      // Find and extract PDF text
+      pdfPath = pickPdfForSubject(detectedSubject);
+      let pdfText = '';
+      if (pdfPath) {
+        pdfText = await extractPdfText(pdfPath);
+      }
+      pdfContext = pdfText
+        ? `REFERENCE BOOK CONTENT (use this as the primary source):\n${pdfText}\n\n`
+        : '';
     }
 
-    const pdfContext = pdfText
-      ? `REFERENCE BOOK CONTENT (use this as the primary source):\n${pdfText}\n\n`
-      : '';
-
     const systemPrompt = `You are Brixbee, a friendly AI teacher assistant for blind children in Tamil Nadu, India.
 ${pdfContext}RULES:
 - Answer the student's question in a warm, simple, and clear way.
@@ -393,7 +443,7 @@ ${pdfContext}RULES:
 };
 
 // ─── LangGraph Agents ────────────────────────────────────────────────────────
-const { runAkkaAgent, runBrixbeeAgent, getThreadInfo, clearThread } = require('../services/aiGraph');
+const { runAkkaAgent, runBrixbeeAgent, streamBrixbeeAgent, getThreadInfo, clearThread } = require('../services/aiGraph');
 
 // @route  POST /api/ai/agent-chat
 // @desc   LangGraph-powered Akka Agent with PERSISTENT checkpointing
@@ -440,7 +490,11 @@ const agentChat = async (req, res) => {
 
 // @route  POST /api/ai/brixbee-chat
 // @desc   LangGraph Brixbee Agent with persistent session memory
+//         With { stream: true } the answer is sent as Server-Sent Events:
+//         "token" events ({ text }) while generating, then one "done" event
+//         ({ answer, toolsUsed, threadId, turnCount }) or an "error" event.
 const brixbeeChat = async (req, res) => {
+  if (req.body?.stream) return brixbeeChatStream(req, res);
   try {
     const { message, studentName = 'BrixbeeStudent', interactionType = 'assistant' } = req.body;
 
@@ -465,6 +519,53 @@ const brixbeeChat = async (req, res) => {
   }
 };
 
+const brixbeeChatStream = async (req, res) => {
+  const { message, studentName = 'BrixbeeStudent', interactionType = 'assistant' } = req.body;
+  if (!message) return res.status(400).json({ error: 'Message is required' });
+
+  res.set({
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    Connection: 'keep-alive',
+  });
+  res.flushHeaders();
+  const send = (event, data) => res.write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+
+  // A cancelled or losing desktop request closes the connection: stop the graph run so it
+  // does not keep writing to the student's LangGraph thread
+  const abort = new AbortController();
+  res.on('close', () => { if (!res.writableEnded) abort.abort(); });
+
+  try {
+    console.log(`🐝 LangGraph Brixbee (stream) — thread: brixbee_${studentName}, type: ${interactionType}`);
+
+    const result = await streamBrixbeeAgent({
+      message,
+      studentName,
+      interactionType,
+      onToken: (text) => send('token', { text }),
+      signal: abort.signal,
+    });
+
+    console.log(`✅ Brixbee stream done. Tools: [${result.stepsTaken.join(', ')}] | Turn #${result.turnCount}`);
+
+    send('done', {
+      answer:    result.response,
+      toolsUsed: result.stepsTaken,
+      threadId:  result.threadId,
+      turnCount: result.turnCount,
+    });
+  } catch (error) {
+    if (abort.signal.aborted) {
+      console.log(`🛑 Brixbee stream cancelled by the client — thread: brixbee_${studentName}`);
+      return;
+    }
+    console.error('LangGraph Brixbee Agent Stream Error:', error);
+    send('error', { error: "Brixbee is having a brain freeze. Please try again!", details: error?.message });
+  }
+  res.end();
+};
+
 // @route  GET /api/ai/session-info/:studentId
 // @desc   Returns current LangGraph thread state for a student (used by frontend to show "Session resumed")
 const getSessionInfo = async (req, res) => {
@@ -478,4 +579,4 @@ const getSessionInfo = async (req, res) => {
   }
 };
 
-module.exports = { chat, endSession, logInteraction, pdfChat, agentChat, brixbeeChat, getSessionInfo };
+module.exports = { chat, endSession, logInteraction, logInteractionsBulk, pdfChat, agentChat, brixbeeChat, getSessionInfo };
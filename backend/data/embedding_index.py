@@ -0,0 +1,294 @@
+"""
+Offline semantic search over the extracted textbooks.
+
+Passages (the same chunks the BM25 index uses) are embedded with a local model
+and stored as a memory-mapped float16 matrix (embeddings.npy) with its metadata
+in embeddings.json. A query is one matrix product against the matrix plus an
+argpartition for the top-k, and many questions can be scored in one call.
+
+The encoder is a sentence-transformers model when it is installed and cached
+locally (EMBEDDING_MODEL), otherwise a dependency-free hashing encoder. Nothing
+touches the network at query time.
+
+Usage:
+    python embedding_index.py sync [--data-dir DIR] [--model NAME]
+    python embedding_index.py query "what is a cell" "define photosynthesis" [-k 5]
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import argparse
+
+import numpy as np
+
+from search_index import tokenize, chunk_book, list_sources
+from textstore import STORE_EXT
+
+# --- CONFIGURATION ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("TEXT_OUTPUT_DIR") or os.path.join(SCRIPT_DIR, "temp_text")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL") or "sentence-transformers/all-MiniLM-L6-v2"
+MATRIX_NAME = "embeddings.npy"
+META_NAME = "embeddings.json"
+INDEX_VERSION = 1
+HASHING_DIM = 512
+ENCODE_BATCH = 256   # Passages embedded per encoder call
+BLOCK_ROWS = 8192    # Matrix rows converted to float32 at a time while scoring
+
+
+class HashingEncoder:
+    """Signed feature hashing of words, word bigrams and word stems. No model download needed."""
+
+    name = "hashing"
+
+    def __init__(self, dim=HASHING_DIM):
+        self.dim = dim
+
+    def encode(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            features += [f"~{t[:5]}" for t in tokens if len(t) > 5]
+            for feature in features:
+                h = zlib.crc32(feature.encode('utf-8'))  # Stable across runs, unlike hash()
+                out[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        np.divide(out, norms, out=out, where=norms > 0)
+        return out
+
+
+class SentenceEncoder:
+    """A sentence-transformers model run on the CPU from the local cache."""
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu", local_files_only=True)
+        self.name = model_name
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=64, normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32, copy=False)
+
+
+def get_encoder(name=None, fallback=True):
+    """Loads the named encoder; falls back to hashing if the model is not available offline."""
+    name = name or EMBEDDING_MODEL
+    if name == HashingEncoder.name:
+        return HashingEncoder()
+    try:
+        return SentenceEncoder(name)
+    except Exception as e:
+        if not fallback:
+            raise
+        print(f"⚠️ Embedding model {name} unavailable offline ({e}); using the hashing encoder.")
+        return HashingEncoder()
+
+
+def source_fingerprint(data_dir, name):
+    """Cheap change marker for a book: size and mtime of its .pages store (or .txt)."""
+    path = os.path.join(data_dir, name + STORE_EXT)
+    if not os.path.exists(path):
+        path = os.path.join(data_dir, name + ".txt")
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime}"
+
+
+class EmbeddingIndex:
+    """
+    Float16 passage matrix plus metadata. Rows belong to books so a re-extracted
+    book can be swapped in place: its rows are freed and reused by the next add.
+    """
+
+    def __init__(self, data_dir, encoder, matrix, meta, writable=False):
+        self.data_dir = data_dir
+        self.encoder = encoder
+        self.matrix = matrix
+        self.rows = meta["rows"]      # Passage dict per row, None for a free row
+        self.books = meta["books"]    # book -> {"fingerprint", "rows"}
+        self.writable = writable
+        self._refresh_mask()
+
+    @classmethod
+    def load(cls, data_dir=DATA_DIR):
+        """Opens an existing index read-only with the encoder it was built with."""
+        with open(os.path.join(data_dir, META_NAME), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"{data_dir}: unsupported embedding index version {meta.get('version')}")
+        encoder = get_encoder(meta["encoder"], fallback=False)
+        matrix = np.load(os.path.join(data_dir, MATRIX_NAME), mmap_mode="r")
+        return cls(data_dir, encoder, matrix, meta)
+
+    @classmethod
+    def open_for_update(cls, data_dir, encoder):
+        """Opens the index for incremental updates, starting fresh if the encoder changed."""
+        meta_path = os.path.join(data_dir, META_NAME)
+        matrix_path = os.path.join(data_dir, MATRIX_NAME)
+        if os.path.exists(meta_path) and os.path.exists(matrix_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("version") == INDEX_VERSION and meta.get("encoder") == encoder.name and meta.get("dim") == encoder.dim:
+                matrix = np.load(matrix_path, mmap_mode="r+")
+                return cls(data_dir, encoder, matrix, meta, writable=True)
+            print(f"Embedding index was built with {meta.get('encoder')}; rebuilding with {encoder.name}.")
+        matrix = np.lib.format.open_memmap(matrix_path, mode="w+", dtype=np.float16, shape=(0, encoder.dim))
+        return cls(data_dir, encoder, matrix, {"rows": [], "books": {}}, writable=True)
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def _refresh_mask(self):
+        self.alive = np.fromiter((r is not None for r in self.rows), dtype=bool, count=len(self.rows))
+
+    def _grow(self, needed):
+        """Reallocates the memmap with doubled capacity, copying the existing rows."""
+        capacity = max(needed, 2 * self.matrix.shape[0], 1024)
+        path = os.path.join(self.data_dir, MATRIX_NAME)
+        tmp_path = path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float16, shape=(capacity, self.encoder.dim))
+        grown[:self.matrix.shape[0]] = self.matrix
+        grown.flush()
+        del grown
+        self.matrix = None
+        os.replace(tmp_path, path)
+        self.matrix = np.load(path, mmap_mode="r+")
+
+    def remove_book(self, book):
+        entry = self.books.pop(book, None)
+        if not entry:
+            return 0
+        for row in entry["rows"]:
+            self.rows[row] = None
+        self._refresh_mask()
+        return len(entry["rows"])
+
+    def add_book(self, book, passages, fingerprint):
+        """Embeds a book's passages into free rows (appending when none are left)."""
+        if not self.writable:
+            raise RuntimeError("Embedding index was opened read-only")
+        self.remove_book(book)
+        free = [i for i, r in enumerate(self.rows) if r is None]
+        needed = max(0, len(passages) - len(free))
+        targets = free[:len(passages)] + list(range(len(self.rows), len(self.rows) + needed))
+        self.rows.extend([None] * needed)
+        if len(self.rows) > self.matrix.shape[0]:
+            self._grow(len(self.rows))
+
+        for start in range(0, len(passages), ENCODE_BATCH):
+            batch = passages[start:start + ENCODE_BATCH]
+            vectors = self.encoder.encode([p["text"] for p in batch])
+            rows = targets[start:start + len(batch)]
+            self.matrix[rows] = vectors.astype(np.float16)
+            for row, passage in zip(rows, batch):
+                self.rows[row] = passage
+
+        self.books[book] = {"fingerprint": fingerprint, "rows": targets}
+        self._refresh_mask()
+        return len(passages)
+
+    def save(self):
+        """Flushes the matrix, then atomically replaces the metadata that points into it."""
+        self.matrix.flush()
+        meta = {
+            "version": INDEX_VERSION,
+            "encoder": self.encoder.name,
+            "dim": self.encoder.dim,
+            "rows": self.rows,
+            "books": self.books,
+        }
+        path = os.path.join(self.data_dir, META_NAME)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+    def _scores(self, queries):
+        """Cosine scores of every query against every row, shape (len(queries), rows)."""
+        n = len(self.rows)
+        scores = np.empty((queries.shape[0], n), dtype=np.float32)
+        for start in range(0, n, BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, n)
+            block = np.asarray(self.matrix[start:end], dtype=np.float32)
+            np.matmul(queries, block.T, out=scores[:, start:end])
+        scores[:, ~self.alive] = -np.inf
+        return scores
+
+    def search_batch(self, questions, k=5):
+        """Top-k passages for each question, scored together in one pass over the matrix."""
+        live = len(self)
+        if not questions or live == 0:
+            return [[] for _ in questions]
+        k = min(k, live)
+        scores = self._scores(self.encoder.encode(questions))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        results = []
+        for rows, row_scores in zip(top, top_scores):
+            results.append([dict(self.rows[r], score=round(float(s), 4)) for r, s in zip(rows, row_scores)])
+        return results
+
+    def search(self, question, k=5):
+        return self.search_batch([question], k)[0]
+
+
+def sync_index(data_dir=DATA_DIR, model=None):
+    """Brings the embedding index in line with data_dir: new and changed books are embedded, removed books dropped."""
+    started = time.time()
+    index = EmbeddingIndex.open_for_update(data_dir, get_encoder(model))
+    books = list_sources(data_dir)
+    removed = 0
+    for gone in set(index.books) - set(books):
+        index.remove_book(gone)
+        removed += 1
+    added = 0
+    for name in books:
+        fingerprint = source_fingerprint(data_dir, name)
+        if index.books.get(name, {}).get("fingerprint") == fingerprint:
+            continue
+        count = index.add_book(name, chunk_book(data_dir, name), fingerprint)
+        print(f"Embedded {name} ({count} passages)")
+        added += 1
+    index.save()
+    print(f"✅ Embedding index: {len(index)} passages ({index.encoder.name}), "
+          f"{added} books updated, {removed} removed in {time.time() - started:.1f}s")
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the offline textbook embedding index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync = sub.add_parser("sync")
+    sync.add_argument("--data-dir", default=DATA_DIR)
+    sync.add_argument("--model", default=None, help=f"sentence-transformers model or 'hashing' (default {EMBEDDING_MODEL})")
+    query = sub.add_parser("query")
+    query.add_argument("questions", nargs="+")
+    query.add_argument("-k", type=int, default=5)
+    query.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "sync":
+        sync_index(args.data_dir, args.model)
+        return 0
+
+    index = EmbeddingIndex.load(args.data_dir)
+    started = time.perf_counter()
+    results = index.search_batch(args.questions, k=args.k)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    for question, hits in zip(args.questions, results):
+        print(f"Q: {question}")
+        for r in hits:
+            page = f" p.{r['page']}" if r["page"] else ""
+            print(f"  [{r['score']:.3f}] {r['book']}{page}: {r['text'][:140]}...")
+    print(f"{len(args.questions)} questions over {len(index)} passages in {elapsed_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
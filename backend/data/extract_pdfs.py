@@ -1,31 +1,392 @@
 import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pypdf
+from textstore import TextStore, TextStoreWriter, store_path_for, load_manifest, MANIFEST_NAME
+import search_index
+try:
+    import embedding_index
+except ImportError as e:
+    embedding_index = None
+    print(f"⚠️ Semantic index disabled ({e}).")
 
-def extract_text(pdf_path, text_path):
-    print(f"Extracting {pdf_path}...")
-    try:
-        reader = pypdf.PdfReader(pdf_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() + "\n"
-        
-        with open(text_path, 'w', encoding='utf-8') as f:
-            f.write(text)
-        print(f"✅ Saved to {text_path}")
-    except Exception as e:
-        print(f"❌ Error: {e}")
-
-books_dir = "/Users/navins/Documents/EduVoice_GCT/Books"
-output_dir = "/Users/navins/Documents/EduVoice_GCT/backend/data/temp_text"
-
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-if os.path.exists(books_dir):
-    for file in os.listdir(books_dir):
-        if file.endswith(".pdf") and "Class_6" in file:
-            pdf_path = os.path.join(books_dir, file)
-            text_path = os.path.join(output_dir, file.replace(".pdf", ".txt"))
-            extract_text(pdf_path, text_path)
-else:
-    print(f"Books dir not found: {books_dir}")
+# --- CONFIGURATION ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BOOKS_DIR = os.getenv("BOOKS_DIR") or os.path.join(SCRIPT_DIR, "..", "..", "Books")
+OUTPUT_DIR = os.getenv("TEXT_OUTPUT_DIR") or os.path.join(SCRIPT_DIR, "temp_text")
+PAGES_PER_TASK = 16  # Pages handed to a worker at a time (balances IPC vs. parallelism)
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# --- CLEANING ---
+HEADER_ZONE = 3              # Non-empty lines at the top and bottom of a page that can be running headers/footers
+REPEAT_MIN_PAGES = 3         # A zone line must repeat on at least this many pages...
+REPEAT_MIN_FRACTION = 0.2    # ...and on this share of the book to count as a running header/footer
+FRONT_MATTER_SCAN = 12       # Only the first pages are checked for publisher front matter
+MAX_RUNNING_LINE_CHARS = 80  # Running headers/footers are short; long repeated lines are left alone
+MIN_DUPLICATE_CHARS = 80     # Shorter pages (e.g. a lone title) are not treated as duplicates
+# InDesign slugs like "6th Science_EM_Unit 1.indd   1 12/2/2022   4:39:57 PM" and site footers
+SLUG_RE = re.compile(r"\S*\.indd\s+\d+\s+\d{1,2}/\d{1,2}/\d{4}\s+\d{1,2}:\d{2}:\d{2}(\s*[AP]M)?", re.I)
+URL_RE = re.compile(r"www\.tntextbooks\.in", re.I)
+PAGE_NUMBER_RE = re.compile(r"^\s*(\d{1,3}|[IVXLC]{1,7})\s*$")
+DIGITS_RE = re.compile(r"\d+")
+FRONT_MATTER_MARKERS = (
+    "not for sale", "printing & publishing", "content creation", "© scert",
+    "textbook and educational", "free textbook programme", "untouchability is inhuman",
+    "reviewers", "laser typeset", "wrapper design", "revised edition",
+)
+
+
+def file_sha256(path):
+    """Hashes a file in fixed-size blocks so large PDFs never sit in memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_manifest(output_dir, manifest):
+    """Writes the manifest atomically so an interrupted run never corrupts it."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def needs_extraction(pdf_path, text_path, entry):
+    """
+    Decides whether a book must be (re-)extracted.
+    Size + mtime is the fast path; the SHA-256 is only computed when they changed,
+    so touching a file without editing it does not trigger a re-extract.
+    Returns (needed, sha256_or_None).
+    """
+    if not entry or not os.path.exists(text_path) or not os.path.exists(store_path_for(text_path)):
+        return True, None
+    stat = os.stat(pdf_path)
+    if entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+        return False, entry.get("sha256")
+    sha = file_sha256(pdf_path)
+    return sha != entry.get("sha256"), sha
+
+
+def extract_page_range(pdf_path, start, end):
+    """Worker: extracts pages [start, end) of one book. Runs in a child process."""
+    reader = pypdf.PdfReader(pdf_path)
+    pages = []
+    for index in range(start, end):
+        try:
+            pages.append(reader.pages[index].extract_text() or "")
+        except Exception as e:
+            print(f"⚠️ {os.path.basename(pdf_path)} page {index + 1}: {e}")
+            pages.append("")
+    return pages
+
+
+def line_key(line):
+    """Normalises a line for frequency counting: page numbers and dates stop making lines unique."""
+    return DIGITS_RE.sub("#", " ".join(line.split())).lower()
+
+
+def zone_indexes(lines):
+    """Indexes of the first and last HEADER_ZONE non-empty lines of a page."""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    return set(filled[:HEADER_ZONE] + filled[-HEADER_ZONE:])
+
+
+def find_running_lines(store):
+    """Line keys that sit in the header/footer zone of a large share of the book's pages."""
+    counts = Counter()
+    for _, text in store.iter_pages():
+        lines = text.splitlines()
+        counts.update({line_key(lines[i]) for i in zone_indexes(lines) if len(lines[i]) <= MAX_RUNNING_LINE_CHARS})
+    threshold = max(REPEAT_MIN_PAGES, REPEAT_MIN_FRACTION * len(store))
+    return {key for key, n in counts.items() if n >= threshold and key.strip("# ")}
+
+
+def is_front_matter(page, text):
+    if page > FRONT_MATTER_SCAN:
+        return False
+    lowered = text.lower()
+    return sum(marker in lowered for marker in FRONT_MATTER_MARKERS) >= 2
+
+
+def clean_page(text, running):
+    """Strips slugs, site footers, page numbers and running headers/footers. Returns (text, lines_removed)."""
+    lines = text.splitlines()
+    zone = zone_indexes(lines)
+    kept = []
+    removed = 0
+    for i, line in enumerate(lines):
+        if i in zone and (PAGE_NUMBER_RE.match(line) or line_key(line) in running):
+            removed += 1
+            continue
+        stripped = URL_RE.sub("", SLUG_RE.sub("", line))
+        if line.strip() and not stripped.strip():
+            removed += 1
+            continue
+        kept.append(stripped.rstrip())
+    return "\n".join(kept).strip(), removed
+
+
+def clean_book(raw_path, text_path, store_path, clean=True):
+    """
+    Second pass over a book's raw page store: learns its running headers/footers,
+    then writes the cleaned .txt and .pages. Front matter and repeated pages become
+    empty pages so page numbers still match the PDF. Returns cleaning stats.
+    """
+    stats = {"removed_lines": 0, "front_matter_pages": [], "duplicate_pages": []}
+    digest = hashlib.sha256()
+    seen_pages = {}
+    tmp_text = text_path + ".part"
+    with TextStore(raw_path) as raw:
+        running = find_running_lines(raw) if clean else set()
+        store = TextStoreWriter(store_path, len(raw))
+        try:
+            with open(tmp_text, 'w', encoding='utf-8') as f:
+                for page, text in raw.iter_pages():
+                    if clean and is_front_matter(page, text):
+                        stats["front_matter_pages"].append(page)
+                        text = ""
+                    elif clean:
+                        text, removed = clean_page(text, running)
+                        stats["removed_lines"] += removed
+                        key = hashlib.sha1(" ".join(text.split()).encode('utf-8')).hexdigest()
+                        if len(text) >= MIN_DUPLICATE_CHARS and key in seen_pages:
+                            stats["duplicate_pages"].append([page, seen_pages[key]])
+                            text = ""
+                        seen_pages.setdefault(key, page)
+                    store.add_page(text)
+                    f.write(text)
+                    f.write("\n")
+                    digest.update(text.encode('utf-8'))
+            store.close()
+        except Exception:
+            store.abort()
+            if os.path.exists(tmp_text):
+                os.remove(tmp_text)
+            raise
+    os.replace(tmp_text, text_path)
+    stats["content_sha256"] = digest.hexdigest()
+    return stats
+
+
+def flag_duplicate_books(manifest):
+    """
+    Marks books whose cleaned text is identical to an earlier book (e.g. a mis-mapped PDF).
+    Returns how many books were flagged or unflagged compared to before.
+    """
+    first_seen = {}
+    changed = 0
+    for file in sorted(manifest):
+        entry = manifest[file]
+        before = entry.pop("duplicate_of", None)
+        content = entry.get("content_sha256")
+        if content and content in first_seen:
+            entry["duplicate_of"] = first_seen[content]
+            print(f"⚠️ {file} has the same content as {first_seen[content]}; check the source PDF. "
+                  f"It will be left out of the search indexes.")
+        elif content:
+            first_seen[content] = file
+        changed += entry.get("duplicate_of") != before
+    return changed
+
+
+def remove_outputs(output_dir, file, entry):
+    """Deletes the .txt and .pages a removed book left behind, so the indexes stop finding it."""
+    text_name = entry.get("output") or file[:-4] + ".txt"
+    store_name = entry.get("store") or os.path.basename(store_path_for(text_name))
+    for name in (text_name, store_name):
+        path = os.path.join(output_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class BookWriter:
+    """
+    Streams one book's pages to disk in page order while chunks complete out of order.
+    Finished chunks are parked until every earlier chunk has been written to a raw page
+    store; finish() then runs the cleaning pass into the flat .txt (used by pdf_ingest.js)
+    and the page-addressable .pages store.
+    """
+
+    def __init__(self, name, pdf_path, text_path, page_count, clean=True):
+        self.name = name
+        self.pdf_path = pdf_path
+        self.text_path = text_path
+        self.store_path = store_path_for(text_path)
+        self.raw_path = self.store_path + ".raw"
+        self.page_count = page_count
+        self.clean = clean
+        self.store = TextStoreWriter(self.raw_path, page_count)
+        self.next_start = 0
+        self.pending = {}
+        self.failed = False
+
+    def add_chunk(self, start, pages):
+        self.pending[start] = pages
+        while self.next_start in self.pending:
+            chunk = self.pending.pop(self.next_start)
+            for text in chunk:
+                self.store.add_page(text)
+            self.next_start += len(chunk)
+
+    @property
+    def done(self):
+        return self.next_start >= self.page_count
+
+    def finish(self):
+        self.store.close()
+        try:
+            return clean_book(self.raw_path, self.text_path, self.store_path, clean=self.clean)
+        finally:
+            os.remove(self.raw_path)
+
+    def abort(self):
+        self.failed = True
+        self.store.abort()
+
+
+def find_books(books_dir, match=None):
+    books = []
+    for file in sorted(os.listdir(books_dir)):
+        if not file.lower().endswith(".pdf"):
+            continue
+        if match and match not in file:
+            continue
+        books.append(file)
+    return books
+
+
+def run_pipeline(books_dir, output_dir, match=None, workers=None, force=False, clean=True):
+    """
+    Extracts every changed book in books_dir into output_dir.
+    Pages from all books are fanned out over one process pool, so a single large
+    book no longer serialises the run and unchanged books are skipped entirely.
+    Returns counts of books "extracted", "removed", "reflagged" (flagged or
+    unflagged as duplicates) and "unchanged".
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    started = time.time()
+
+    writers = {}
+    hashes = {}
+    skipped = 0
+    for file in find_books(books_dir, match):
+        pdf_path = os.path.join(books_dir, file)
+        text_path = os.path.join(output_dir, file[:-4] + ".txt")
+        needed, sha = needs_extraction(pdf_path, text_path, manifest.get(file))
+        if not needed and not force:
+            # Content is unchanged: refresh the stat info so the fast path hits next time
+            stat = os.stat(pdf_path)
+            manifest[file].update({"size": stat.st_size, "mtime": stat.st_mtime})
+            skipped += 1
+            continue
+        try:
+            page_count = len(pypdf.PdfReader(pdf_path).pages)
+        except Exception as e:
+            print(f"❌ Error opening {file}: {e}")
+            continue
+        if page_count == 0:
+            print(f"⚠️ Skipping {file}: no pages")
+            continue
+        hashes[file] = sha or file_sha256(pdf_path)
+        writers[file] = BookWriter(file, pdf_path, text_path, page_count, clean=clean)
+        print(f"Extracting {file} ({page_count} pages)...")
+
+    if writers:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for file, writer in writers.items():
+                for start in range(0, writer.page_count, PAGES_PER_TASK):
+                    end = min(start + PAGES_PER_TASK, writer.page_count)
+                    future = pool.submit(extract_page_range, writer.pdf_path, start, end)
+                    futures[future] = (file, start)
+
+            for future in as_completed(futures):
+                file, start = futures[future]
+                writer = writers[file]
+                if writer.failed:
+                    continue
+                try:
+                    writer.add_chunk(start, future.result())
+                except Exception as e:
+                    print(f"❌ Error extracting {file}: {e}")
+                    writer.abort()
+                    continue
+                if writer.done:
+                    try:
+                        stats = writer.finish()
+                    except Exception as e:
+                        print(f"❌ Error cleaning {file}: {e}")
+                        writer.failed = True
+                        continue
+                    stat = os.stat(writer.pdf_path)
+                    manifest[file] = {
+                        "sha256": hashes[file],
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime,
+                        "pages": writer.page_count,
+                        "output": os.path.basename(writer.text_path),
+                        "store": os.path.basename(writer.store_path),
+                        **stats,
+                    }
+                    # Persist progress per book so a crash never loses finished work
+                    save_manifest(output_dir, manifest)
+                    print(f"✅ Saved to {writer.text_path} ({stats['removed_lines']} boilerplate lines, "
+                          f"{len(stats['front_matter_pages'])} front-matter and "
+                          f"{len(stats['duplicate_pages'])} duplicate pages removed)")
+
+    # Forget books that were removed from the books directory, and their outputs
+    present = set(os.listdir(books_dir))
+    removed = [f for f in manifest if f not in present]
+    for file in removed:
+        remove_outputs(output_dir, file, manifest.pop(file))
+        print(f"🗑️ Removed {file}")
+    reflagged = flag_duplicate_books(manifest)
+    save_manifest(output_dir, manifest)
+
+    extracted = sum(1 for w in writers.values() if not w.failed)
+    print(f"Done in {time.time() - started:.1f}s: {extracted} extracted, {skipped} unchanged, "
+          f"{len(removed)} removed, {reflagged} duplicate flags changed.")
+    return {"extracted": extracted, "removed": len(removed), "reflagged": reflagged, "unchanged": skipped}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract textbook PDFs to plain text.")
+    parser.add_argument("--books-dir", default=BOOKS_DIR)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--match", default=None, help="Only extract PDFs whose name contains this text (e.g. Class_6)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and re-extract every book")
+    parser.add_argument("--no-index", action="store_true", help="Skip rebuilding the BM25 and embedding indexes")
+    parser.add_argument("--no-clean", action="store_true", help="Keep headers, footers, front matter and duplicate pages")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.books_dir):
+        print(f"Books dir not found: {args.books_dir}")
+        return 1
+    counts = run_pipeline(args.books_dir, args.output_dir, match=args.match, workers=args.workers,
+                          force=args.force, clean=not args.no_clean)
+    # Removed or re-flagged books change what the indexes may return just like re-extracted ones
+    changed = counts["extracted"] + counts["removed"] + counts["reflagged"]
+
+    index_path = os.path.join(args.output_dir, search_index.INDEX_NAME)
+    if not args.no_index and (changed or not os.path.exists(index_path)):
+        search_index.build_index(args.output_dir)
+
+    meta_path = os.path.join(args.output_dir, embedding_index.META_NAME) if embedding_index else None
+    if embedding_index and not args.no_index and (changed or not os.path.exists(meta_path)):
+        embedding_index.sync_index(args.output_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""
+BM25 passage search over the extracted textbooks.
+
+Books in temp_text are cut into overlapping passages (page-aware when a .pages
+store exists) and an inverted index is written to search_index.json. Loading it
+once and querying is a few dictionary lookups per query term, so Brixbee can send
+the top passages to the model instead of a whole book.
+
+Usage:
+    python search_index.py build [--data-dir DIR]
+    python search_index.py query "what is photosynthesis" [-k 5]
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import heapq
+import argparse
+from collections import Counter, defaultdict
+
+from textstore import TextStore, STORE_EXT, duplicate_books
+
+# --- CONFIGURATION ---
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.getenv("TEXT_OUTPUT_DIR") or os.path.join(SCRIPT_DIR, "temp_text")
+INDEX_NAME = "search_index.json"
+INDEX_VERSION = 1
+PASSAGE_WORDS = 120   # Words per passage
+PASSAGE_OVERLAP = 30  # Words shared with the previous passage so answers are not cut in half
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Word characters plus the Tamil block, so vowel signs don't split Tamil words
+TOKEN_RE = re.compile(r"[\w\u0B80-\u0BFF]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from had has have he her his how i if in
+into is it its me my no not of on or our she so than that the their them then there these
+they this to was we were what when where which who why will with you your tell about explain
+""".split())
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and not t.isdigit()]
+
+
+def iter_book_pages(data_dir, name):
+    """Yields (page_number, text) from the .pages store, or the whole .txt as page None."""
+    store_path = os.path.join(data_dir, name + STORE_EXT)
+    if os.path.exists(store_path):
+        with TextStore(store_path) as store:
+            yield from store.iter_pages()
+        return
+    with open(os.path.join(data_dir, name + ".txt"), 'r', encoding='utf-8') as f:
+        yield None, f.read()
+
+
+def chunk_book(data_dir, name, size=PASSAGE_WORDS, overlap=PASSAGE_OVERLAP):
+    """Splits a book into overlapping word windows, remembering the page each one starts on."""
+    words = []
+    pages = []
+    for page, text in iter_book_pages(data_dir, name):
+        page_words = text.split()
+        words.extend(page_words)
+        pages.extend([page] * len(page_words))
+
+    step = max(1, size - overlap)
+    passages = []
+    for start in range(0, len(words), step):
+        window = words[start:start + size]
+        if len(window) < overlap and passages:
+            break  # Tail already covered by the previous window's overlap
+        passages.append({"book": name, "page": pages[start], "text": " ".join(window)})
+        if start + size >= len(words):
+            break
+    return passages
+
+
+def list_sources(data_dir):
+    """Books to index, leaving out ones extract_pdfs.py flagged as duplicates of another book."""
+    names = set()
+    for file in os.listdir(data_dir):
+        if file.endswith(STORE_EXT):
+            names.add(file[:-len(STORE_EXT)])
+        elif file.endswith(".txt"):
+            names.add(file[:-4])
+    return sorted(names - duplicate_books(data_dir))
+
+
+def build_index(data_dir=DATA_DIR, index_path=None):
+    """Chunks every book in data_dir and writes the BM25 inverted index next to it."""
+    started = time.time()
+    index_path = index_path or os.path.join(data_dir, INDEX_NAME)
+
+    passages = []
+    for name in list_sources(data_dir):
+        passages.extend(chunk_book(data_dir, name))
+
+    postings = defaultdict(list)
+    doc_len = []
+    for doc_id, passage in enumerate(passages):
+        counts = Counter(tokenize(passage["text"]))
+        doc_len.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings[term].append([doc_id, tf])
+
+    index = {
+        "version": INDEX_VERSION,
+        "k1": BM25_K1,
+        "b": BM25_B,
+        "avgdl": (sum(doc_len) / len(doc_len)) if doc_len else 0.0,
+        "passages": passages,
+        "doc_len": doc_len,
+        "postings": postings,
+    }
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, index_path)
+    print(f"✅ Indexed {len(passages)} passages, {len(postings)} terms in {time.time() - started:.1f}s -> {index_path}")
+    return index_path
+
+
+class SearchIndex:
+    """In-memory BM25 index loaded from search_index.json."""
+
+    def __init__(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError(f"{path}: unsupported index version {data.get('version')}")
+        self.path = path
+        self.k1 = data["k1"]
+        self.b = data["b"]
+        self.avgdl = data["avgdl"] or 1.0
+        self.passages = data["passages"]
+        self.doc_len = data["doc_len"]
+        self.postings = data["postings"]
+        n = len(self.passages)
+        # Precompute IDF once; queries then only touch postings for their own terms
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    @classmethod
+    def load(cls, data_dir=DATA_DIR):
+        return cls(os.path.join(data_dir, INDEX_NAME))
+
+    def __len__(self):
+        return len(self.passages)
+
+    def search(self, query, k=5, book=None):
+        """Returns the top-k passages as dicts with book, page, text and score."""
+        scores = defaultdict(float)
+        k1, b, avgdl = self.k1, self.b, self.avgdl
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in plist:
+                norm = k1 * (1 - b + b * self.doc_len[doc_id] / avgdl)
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+
+        if book:
+            book = book.lower()
+            scores = {d: s for d, s in scores.items() if book in self.passages[d]["book"].lower()}
+
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [dict(self.passages[doc_id], score=round(score, 4)) for doc_id, score in top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the textbook BM25 index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build")
+    build.add_argument("--data-dir", default=DATA_DIR)
+    query = sub.add_parser("query")
+    query.add_argument("text")
+    query.add_argument("-k", type=int, default=5)
+    query.add_argument("--book", default=None)
+    query.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build_index(args.data_dir)
+        return 0
+
+    index = SearchIndex.load(args.data_dir)
+    started = time.perf_counter()
+    results = index.search(args.text, k=args.k, book=args.book)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    for r in results:
+        page = f" p.{r['page']}" if r["page"] else ""
+        print(f"[{r['score']:.2f}] {r['book']}{page}: {r['text'][:160]}...")
+    print(f"{len(results)} results in {elapsed_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+Page-addressable text store for extracted textbooks.
+
+A .pages file is a small fixed header, a table of byte offsets (one per page
+plus an end marker) and the UTF-8 text of every page concatenated:
+
+    magic "BXPG" | version u16 | reserved u16 | page_count u32
+    offsets[page_count + 1] u64      (relative to the start of the body)
+    body
+
+Readers mmap the file, so any page or page range is a single slice of the
+mapping: no scanning and no loading the whole book.
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+
+MAGIC = b"BXPG"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+OFFSET = struct.Struct("<Q")
+STORE_EXT = ".pages"
+MANIFEST_NAME = ".extract_manifest.json"  # Written by extract_pdfs.py next to the stores
+
+
+def header_size(page_count):
+    return HEADER.size + OFFSET.size * (page_count + 1)
+
+
+class TextStoreWriter:
+    """
+    Streams pages into a .pages file. The page count must be known up front so the
+    offset table can be reserved before the body is written.
+    """
+
+    def __init__(self, path, page_count):
+        self.path = path
+        self.page_count = page_count
+        self.tmp_path = path + ".part"
+        self.offsets = [0]
+        self.file = open(self.tmp_path, 'wb')
+        self.file.write(b"\0" * header_size(page_count))
+
+    def add_page(self, text):
+        if len(self.offsets) > self.page_count:
+            raise ValueError(f"{self.path}: more than {self.page_count} pages written")
+        data = (text or "").encode('utf-8')
+        self.file.write(data)
+        self.offsets.append(self.offsets[-1] + len(data))
+
+    def close(self):
+        if len(self.offsets) != self.page_count + 1:
+            self.abort()
+            raise ValueError(f"{self.path}: expected {self.page_count} pages, got {len(self.offsets) - 1}")
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, self.page_count))
+        self.file.write(struct.pack(f"<{len(self.offsets)}Q", *self.offsets))
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class TextStore:
+    """
+    Read-only, memory-mapped view of a .pages file.
+    Page numbers are 1-based, matching how students and teachers refer to pages.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path}: empty file is not a text store")
+        magic, version, _, self.page_count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: not a text store")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: unsupported text store version {version}")
+        self._body_start = header_size(self.page_count)
+
+    def __len__(self):
+        return self.page_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def _offset(self, index):
+        return OFFSET.unpack_from(self._mm, HEADER.size + OFFSET.size * index)[0]
+
+    def _check(self, page):
+        if not 1 <= page <= self.page_count:
+            raise IndexError(f"page {page} out of range 1..{self.page_count}")
+
+    def page_bytes(self, page):
+        """Zero-copy memoryview of one page's UTF-8 bytes."""
+        return self.range_bytes(page, page)
+
+    def range_bytes(self, first, last):
+        """Zero-copy memoryview of pages first..last (inclusive)."""
+        self._check(first)
+        self._check(last)
+        if last < first:
+            raise IndexError(f"page range {first}..{last} is empty")
+        start = self._body_start + self._offset(first - 1)
+        end = self._body_start + self._offset(last)
+        return memoryview(self._mm)[start:end]
+
+    def page(self, page):
+        return str(self.page_bytes(page), 'utf-8')
+
+    def pages(self, first, last):
+        """Text of pages first..last (inclusive), one page per element."""
+        return [self.page(n) for n in range(first, last + 1)]
+
+    def iter_pages(self):
+        for n in range(1, self.page_count + 1):
+            yield n, self.page(n)
+
+
+def store_path_for(text_path):
+    base, _ = os.path.splitext(text_path)
+    return base + STORE_EXT
+
+
+def load_manifest(data_dir):
+    """The extraction manifest for data_dir, or {} when there is none (or it is unreadable)."""
+    path = os.path.join(data_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring unreadable manifest {path} ({e})")
+        return {}
+
+
+def duplicate_books(data_dir):
+    """File stems of books the manifest flags as duplicates of another book."""
+    return {os.path.splitext(entry["output"])[0]
+            for entry in load_manifest(data_dir).values()
+            if entry.get("duplicate_of") and entry.get("output")}
+
+
+def list_books(data_dir):
+    """Names of every book with a text store in data_dir."""
+    return sorted(f[:-len(STORE_EXT)] for f in os.listdir(data_dir) if f.endswith(STORE_EXT))
+
+
+def open_book(name, data_dir):
+    """Opens a book by its file stem, or by a case-insensitive substring of it."""
+    path = os.path.join(data_dir, name + STORE_EXT)
+    if os.path.exists(path):
+        return TextStore(path)
+    matches = [b for b in list_books(data_dir) if name.lower() in b.lower()]
+    if len(matches) != 1:
+        raise KeyError(f"{name!r} matches {len(matches)} books in {data_dir}")
+    return TextStore(os.path.join(data_dir, matches[0] + STORE_EXT))
+
+
+if __name__ == "__main__":
+    # Usage: python textstore.py BOOK.pages PAGE [LAST_PAGE]
+    if len(sys.argv) < 3:
+        print("Usage: python textstore.py BOOK.pages PAGE [LAST_PAGE]")
+        sys.exit(1)
+    first = int(sys.argv[2])
+    last = int(sys.argv[3]) if len(sys.argv) > 3 else first
+    with TextStore(sys.argv[1]) as store:
+        for n in range(first, last + 1):
+            print(f"--- Page {n} / {len(store)} ---")
+            print(store.page(n))
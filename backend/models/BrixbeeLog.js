@@ -5,7 +5,8 @@ const BrixbeeLogSchema = new mongoose.Schema({
   response: { type: String, required: true },
   type: { type: String, enum: ['teacher', 'assistant'], default: 'assistant' },
   timestamp: { type: Date, default: Date.now },
-  device: { type: String, default: 'Desktop' }
+  device: { type: String, default: 'Desktop' },
+  clientId: { type: String, unique: true, sparse: true }  // Desktop-generated id; makes bulk resends idempotent
 });
 
 module.exports = mongoose.model('BrixbeeLog', BrixbeeLogSchema);
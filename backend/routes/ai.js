@@ -1,6 +1,6 @@
 const express = require('express');
 const router = express.Router();
-const { chat, endSession, logInteraction, pdfChat, agentChat, brixbeeChat, getSessionInfo } = require('../controllers/aiController');
+const { chat, endSession, logInteraction, logInteractionsBulk, pdfChat, agentChat, brixbeeChat, getSessionInfo } = require('../controllers/aiController');
 
 // POST /api/ai/chat - Legacy AI teacher (prompt-based)
 router.post('/chat', chat);
@@ -11,6 +11,9 @@ router.post('/session-end', endSession);
 // POST /api/ai/log - Log Brixbee desktop interactions
 router.post('/log', logInteraction);
 
+// POST /api/ai/log/bulk - Batched Brixbee desktop logs (idempotent on record id)
+router.post('/log/bulk', logInteractionsBulk);
+
 // POST /api/ai/pdf-chat - PDF-powered Q&A (legacy fallback)
 router.post('/pdf-chat', pdfChat);
 
@@ -22,7 +25,8 @@ router.post('/pdf-chat', pdfChat);
 router.post('/agent-chat', agentChat);
 
 // POST /api/ai/brixbee-chat — LangGraph Brixbee Agent (Desktop AI)
-//   Body: { message, studentName, interactionType }
+//   Body: { message, studentName, interactionType, stream? }
+//   stream: true → Server-Sent Events ("token" ... "done")
 router.post('/brixbee-chat', brixbeeChat);
 
 // GET /api/ai/session-info/:studentId — Query thread checkpoint state
@@ -438,6 +438,65 @@ async function runBrixbeeAgent({ message, studentName = "BrixbeeStudent", intera
 
   perInvokeSteps.delete(threadId);
 
+  return summarizeBrixbeeResult(result, threadId);
+}
+
+/**
+ * Streaming variant of runBrixbeeAgent for the desktop client.
+ * onToken(text) receives the answer as the model produces it. A model turn may end
+ * in tool calls (e.g. brixbee_log_interaction next to its text), so each turn's text
+ * is held until the turn ends and only sent if it called no tools; it is cleaned with
+ * stripForTTS like the final answer, so what is spoken matches what is remembered.
+ * Aborting signal (the client went away) stops the graph run.
+ * Resolves with the same summary as runBrixbeeAgent.
+ */
+async function streamBrixbeeAgent({ message, studentName = "BrixbeeStudent", interactionType = "assistant", onToken, signal }) {
+  const threadId = `brixbee_${studentName.replace(/\s+/g, "_")}`;
+  const config   = { configurable: { thread_id: threadId } };
+
+  hydratedThreads.add(threadId);
+  perInvokeSteps.set(threadId, 0);
+
+  const userMsg = new HumanMessage(`[student: ${studentName}] ${message}`);
+
+  try {
+    const events = compiledGraph.streamEvents(
+      {
+        messages: [userMsg],
+        agentType: "brixbee",
+        learningMode: "general",
+        turnCount: 1,
+      },
+      { ...config, version: "v2", signal }
+    );
+
+    const turns = new Map(); // model run id -> { text, tools } until the turn ends
+    for await (const event of events) {
+      if (event.event === "on_chat_model_stream") {
+        const chunk = event.data?.chunk;
+        if (!chunk) continue;
+        const turn = turns.get(event.run_id) || { text: "", tools: false };
+        if (chunk.tool_call_chunks?.length) turn.tools = true;
+        else if (typeof chunk.content === "string") turn.text += chunk.content;
+        turns.set(event.run_id, turn);
+      } else if (event.event === "on_chat_model_end") {
+        const turn = turns.get(event.run_id);
+        turns.delete(event.run_id);
+        if (!turn || turn.tools || event.data?.output?.tool_calls?.length) continue;
+        const text = stripForTTS(turn.text);
+        if (text) onToken(text);
+      }
+    }
+  } finally {
+    perInvokeSteps.delete(threadId);
+  }
+  signal?.throwIfAborted();
+
+  const state = await compiledGraph.getState(config);
+  return summarizeBrixbeeResult(state.values, threadId);
+}
+
+function summarizeBrixbeeResult(result, threadId) {
   const finalMsg = [...result.messages]
     .reverse()
     .find(m => m instanceof AIMessage && (!m.tool_calls || m.tool_calls.length === 0));
@@ -505,4 +564,4 @@ function stripForTTS(text) {
     .trim();
 }
 
-module.exports = { runAkkaAgent, runBrixbeeAgent, getThreadInfo, clearThread };
+module.exports = { runAkkaAgent, runBrixbeeAgent, streamBrixbeeAgent, getThreadInfo, clearThread };